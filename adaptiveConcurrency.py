@@ -0,0 +1,142 @@
+"""
+adaptiveConcurrency.py
+-----------------------
+AIMD (additive-increase / multiplicative-decrease) concurrency limits for the
+two remote services the pipeline talks to.
+
+    FETCH_LIMIT   screener.in page requests   (stockFetch)
+    AI_LIMIT      DeepSeek chat completions   (aiAnalysis)
+
+Each request runs inside `with LIMIT.slot():`. A healthy response (latency
+within LATENCY_SLACK × the best smoothed latency seen) raises the limit by
+1/limit, i.e. about +1 per limit's worth of successes. A 429/5xx, timeout or
+connection error cuts it by BACKOFF and pauses new requests for COOLDOWN
+seconds (or the server's Retry-After); cuts are spaced by CUT_INTERVAL so a
+burst of errors from requests already in flight counts once.
+
+Every change is logged ("[AIMD] fetch: concurrency 6 → 3 (HTTP 429)") and
+counted in concurrency_changes_total{path,direction}.
+
+Environment:
+    FETCH_CONCURRENCY   "initial,max"   default "5,16"
+    AI_CONCURRENCY      "initial,max"   default "5,16"
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from pipelineMetrics import METRICS
+from timeBudget import bounded
+
+BACKOFF = 0.5
+LATENCY_SLACK = 3.0
+LATENCY_FLOOR = 0.5   # Seconds; latencies below this are always healthy
+COOLDOWN = 5.0
+CUT_INTERVAL = 2.0
+OVERLOAD_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def env_range(name: str, default: tuple[float, float]) -> tuple[float, float]:
+    """Reads a "low,high" (or single "value") seconds range from the environment."""
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    parts = [float(p) for p in raw.split(",")]
+    return (parts[0], parts[-1])
+
+
+def _env_limits(name: str, default: tuple[int, int]) -> tuple[int, int]:
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    parts = [int(p) for p in raw.split(",")]
+    return parts[0], parts[-1]
+
+
+class AIMDLimiter:
+    """Blocking concurrency limit that adapts to success, latency and overload."""
+
+    def __init__(self, name: str, initial: int = 5, maximum: int = 16, minimum: int = 1):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.in_flight = 0
+        self.peak = int(self.limit)
+        self.cuts = 0
+        self._best_latency: float | None = None
+        self._ewma: float | None = None
+        self._last_cut = 0.0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                # Waiting for a slot counts against the caller's deadline (timeBudget)
+                self._cond.wait(timeout=bounded(wait if wait > 0 else None, f"{self.name} slot"))
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify()
+
+    def _log(self, old: int, new: int, reason: str) -> None:
+        direction = "up" if new > old else "down"
+        METRICS.inc("concurrency_changes_total", path=self.name, direction=direction)
+        print(f"  [AIMD] {self.name}: concurrency {old} → {new} ({reason})")
+
+    def on_success(self, latency: float) -> None:
+        with self._cond:
+            self._ewma = latency if self._ewma is None else 0.8 * self._ewma + 0.2 * latency
+            if self._best_latency is None or self._ewma < self._best_latency:
+                self._best_latency = self._ewma
+            healthy = latency <= max(LATENCY_FLOOR, LATENCY_SLACK * self._best_latency)
+            if not healthy or self.limit >= self.maximum:
+                return
+            old = int(self.limit)
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            new = int(self.limit)
+            if new > old:
+                self.peak = max(self.peak, new)
+                self._log(old, new, f"healthy, {latency:.2f}s")
+                self._cond.notify()
+
+    def on_overload(self, reason: str, retry_after: float | None = None) -> None:
+        with self._cond:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + (retry_after or COOLDOWN))
+            if now - self._last_cut < CUT_INTERVAL:
+                return
+            self._last_cut = now
+            old = int(self.limit)
+            self.limit = max(float(self.minimum), self.limit * BACKOFF)
+            if int(self.limit) < old:
+                self.cuts += 1
+                self._log(old, int(self.limit), reason)
+
+    def describe(self) -> str:
+        return (
+            f"{self.name}: concurrency {int(self.limit)} "
+            f"(peak {self.peak}, max {self.maximum}, {self.cuts} cuts)"
+        )
+
+
+def retry_after_seconds(headers) -> float | None:
+    """Parses a numeric Retry-After header (HTTP-date values are ignored)."""
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+FETCH_LIMIT = AIMDLimiter("fetch", *_env_limits("FETCH_CONCURRENCY", (5, 16)))
+AI_LIMIT = AIMDLimiter("ai", *_env_limits("AI_CONCURRENCY", (5, 16)))
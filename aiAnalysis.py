@@ -7,13 +7,23 @@ when the API key is unavailable.
 
 Environment:
     DEEPSEEK_API_KEY  –  Set in .env file at the project root.
+    DEEPSEEK_API_URL  –  Optional base URL override (e.g. the local stand-in server).
+
+Under a timeBudget deadline the slot wait and request timeout are capped at
+the time left, and running out raises DeadlineExceeded instead of falling
+back to the default scores.
 """
 
 import json
 import os
+import time
 
 import requests
 
+from adaptiveConcurrency import AI_LIMIT, OVERLOAD_STATUSES, retry_after_seconds
+from pipelineMetrics import METRICS
+from timeBudget import DeadlineExceeded, bounded, expired
+
 # Load .env manually (avoids requiring python-dotenv)
 def _load_env(path: str = ".env") -> dict:
     env = {}
@@ -30,7 +40,10 @@ def _load_env(path: str = ".env") -> dict:
 
 
 _ENV = _load_env()
-_API_KEY = _ENV.get("DEEPSEEK_API_KEY", "")
+_API_KEY = _ENV.get("DEEPSEEK_API_KEY") or os.environ.get("DEEPSEEK_API_KEY", "")
+_API_URL = (
+    _ENV.get("DEEPSEEK_API_URL") or os.environ.get("DEEPSEEK_API_URL", "https://api.deepseek.com")
+).rstrip("/")
 
 _SYSTEM_PROMPT = (
     "You are a cynical and extremely conservative hedge fund analyst. "
@@ -109,36 +122,65 @@ def get_ai_analysis(symbol: str) -> dict:
     """
     # Hard-coded overrides take priority
     if symbol.upper() in _KNOWLEDGE_BASE:
+        METRICS.inc("ai_requests_total", source="knowledge_base")
         return _KNOWLEDGE_BASE[symbol.upper()]
 
     if not _API_KEY:
+        METRICS.inc("ai_requests_total", source="no_api_key")
         print(f"  [AI] No API key – using defaults for {symbol}.")
         return dict(_DEFAULT_SCORES)
 
     try:
-        response = requests.post(
-            "https://api.deepseek.com/chat/completions",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {_API_KEY}",
-            },
-            json={
-                "model": "deepseek-chat",
-                "messages": [
-                    {"role": "system", "content": _SYSTEM_PROMPT},
-                    {"role": "user", "content": _USER_PROMPT_TEMPLATE.format(symbol=symbol)},
-                ],
-                "response_format": {"type": "json_object"},
-            },
-            timeout=30,
-        )
+        with AI_LIMIT.slot():
+            start = time.perf_counter()
+            response = _post_completion(symbol)
+            latency = time.perf_counter() - start
+            if response.status_code in OVERLOAD_STATUSES:
+                AI_LIMIT.on_overload(
+                    f"HTTP {response.status_code}", retry_after_seconds(response.headers)
+                )
+            else:
+                AI_LIMIT.on_success(latency)
+        METRICS.observe("ai_seconds", latency)
+        METRICS.inc("ai_http_total", status=response.status_code)
 
         if response.status_code == 200:
             content = response.json()["choices"][0]["message"]["content"]
-            return json.loads(content)
+            result = json.loads(content)
+            METRICS.inc("ai_requests_total", source="api")
+            return result
 
         print(f"  [AI] API error {response.status_code} for {symbol}. Using defaults.")
+    except DeadlineExceeded:
+        raise  # The symbol's deadline (timeBudget) passed: not worth a default score
+    except requests.exceptions.RequestException as e:
+        if expired():
+            raise DeadlineExceeded("ai") from e
+        AI_LIMIT.on_overload(type(e).__name__)
+        METRICS.inc("ai_errors_total", reason=type(e).__name__)
+        print(f"  [AI] Exception for {symbol}: {e}. Using defaults.")
     except Exception as e:
+        METRICS.inc("ai_errors_total", reason=type(e).__name__)
         print(f"  [AI] Exception for {symbol}: {e}. Using defaults.")
 
+    METRICS.inc("ai_requests_total", source="default")
     return dict(_DEFAULT_SCORES)
+
+
+def _post_completion(symbol: str) -> requests.Response:
+    return requests.post(
+        f"{_API_URL}/chat/completions",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {_API_KEY}",
+        },
+        json={
+            "model": "deepseek-chat",
+            "messages": [
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": _USER_PROMPT_TEMPLATE.format(symbol=symbol)},
+            ],
+            "response_format": {"type": "json_object"},
+        },
+        timeout=bounded(30, "ai"),
+    )
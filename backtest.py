@@ -0,0 +1,290 @@
+"""
+backtest.py
+------------
+Vectorized backtest of the allocation rules in portfolioOptimizer.py.
+
+Replays the run snapshots in history/ (see scoreHistory.py) against a local
+daily price file and rebuilds the portfolio at every snapshot date:
+
+    prices.csv   one row per (date, symbol): date,symbol,close
+
+Each rule combination is evaluated with whole-array NumPy operations over
+[snapshots × symbols] and [days × symbols] matrices. Price-derived matrices
+are built once and ranking orders are shared between combinations that only
+differ in max_holdings / weight_power, so hundreds of combinations over years
+of daily prices run in seconds to minutes on one machine.
+
+Rules (defaults mirror allocate_portfolio):
+    score_floor        final_score minimum                     (SCORE_FLOOR)
+    overvaluation_cap  drop if price > intrinsic × cap         (OVERVALUATION_CAP)
+    max_holdings       top-N by allocation score               (MAX_PORTFOLIO)
+    weight_power       weight ∝ alloc_score ** power           (2 = score²)
+    dcf_scale          DCF discount → bonus multiplier         (40)
+    bonus_weight       scale on all _allocation_score bonuses  (0 = final_score only)
+
+Usage:
+    python backtest.py --prices prices.csv
+    python backtest.py --prices prices.csv --cost-bps 20 \\
+        --grid score_floor=30,40,50 overvaluation_cap=1.0,1.15,1.3 \\
+               max_holdings=50,100,150 weight_power=1,2 bonus_weight=0,1
+"""
+
+import argparse
+import csv
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from portfolioOptimizer import MAX_PORTFOLIO, OVERVALUATION_CAP, SCORE_FLOOR
+from scoreHistory import HISTORY_DIR, universe_series
+
+DEFAULT_RULES: dict[str, float] = {
+    "score_floor": SCORE_FLOOR,
+    "overvaluation_cap": OVERVALUATION_CAP,
+    "max_holdings": MAX_PORTFOLIO,
+    "weight_power": 2.0,
+    "dcf_scale": 40.0,
+    "bonus_weight": 1.0,
+}
+SNAPSHOT_FIELDS = (
+    "final_score", "current_price", "intrinsic_price", "roce", "de", "fii", "dii",
+)
+TRADING_DAYS = 252
+RESULTS_FILE = "backtest_results.csv"
+
+
+# ── Inputs ───────────────────────────────────────────────────────────────────
+
+def load_snapshots(history_dir: str = HISTORY_DIR) -> tuple[np.ndarray, list[str], dict]:
+    """Returns (run dates, symbols, {field: matrix[runs × symbols]})."""
+    fields = {}
+    for name in SNAPSHOT_FIELDS:
+        dates, symbols, matrix = universe_series(name, history_dir)
+        fields[name] = matrix.astype(np.float64)
+    return np.array(dates, dtype="datetime64[D]"), symbols, fields
+
+
+def load_prices(path: str, symbols: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reads a long-format price file into (days, matrix[days × symbols]) with
+    columns aligned to `symbols`. Prices are forward-filled, so a symbol that
+    stops trading holds its last close.
+    """
+    df = pd.read_csv(path)
+    df.columns = [c.strip().lower() for c in df.columns]
+    missing = {"date", "symbol", "close"} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path}: missing column(s) {sorted(missing)}")
+    df["date"] = pd.to_datetime(df["date"])
+    wide = (
+        df.pivot_table(index="date", columns="symbol", values="close", aggfunc="last")
+        .sort_index()
+        .reindex(columns=symbols)
+        .ffill()
+    )
+    return wide.index.values.astype("datetime64[D]"), wide.to_numpy(dtype=np.float64)
+
+
+# ── Rules (vectorized portfolioOptimizer) ────────────────────────────────────
+
+def allocation_scores(f: dict, dcf_scale: float, bonus_weight: float) -> np.ndarray:
+    """_allocation_score over a whole [runs × symbols] snapshot matrix."""
+    cur, intr = f["current_price"], f["intrinsic_price"]
+    priced = (intr > 0) & (cur > 0)
+    discount = np.where(priced, (intr - cur) / np.where(priced, intr, 1.0), 0.0)
+    dcf_bonus = np.clip(discount * dcf_scale, -10.0, 25.0)
+
+    roce_pts = np.minimum(10.0, np.nan_to_num(f["roce"]) / 4)
+    de = np.where(np.isnan(f["de"]), 1.0, f["de"])
+    de_pts = np.clip((1 - de) * 5, -5.0, 5.0)
+    inst_bonus = np.minimum(10.0, (np.nan_to_num(f["fii"]) + np.nan_to_num(f["dii"])) / 5)
+
+    return f["final_score"] + bonus_weight * (dcf_bonus + roce_pts + de_pts + inst_bonus)
+
+
+def eligibility(f: dict, score_floor: float, overvaluation_cap: float) -> np.ndarray:
+    score, cur, intr = f["final_score"], f["current_price"], f["intrinsic_price"]
+    overvalued = (intr > 0) & (cur > intr * overvaluation_cap)
+    return ~np.isnan(score) & (score >= score_floor) & ~overvalued
+
+
+def target_weights(
+    alloc: np.ndarray, order: np.ndarray, eligible: np.ndarray, max_holdings: int, power: float
+) -> np.ndarray:
+    """Top-`max_holdings` eligible names per run, weighted by |alloc| ** power."""
+    held = np.zeros_like(eligible)
+    rows = np.arange(len(order))[:, None]
+    held[rows, order[:, :max_holdings]] = True
+    held &= eligible
+    raw = np.where(held, np.abs(alloc) ** power, 0.0)
+    total = raw.sum(axis=1, keepdims=True)
+    return raw / np.where(total > 0, total, 1.0)
+
+
+# ── Engine ───────────────────────────────────────────────────────────────────
+
+class Backtest:
+    """Price-side matrices shared by every rule combination."""
+
+    def __init__(self, run_dates, fields: dict, days: np.ndarray, prices: np.ndarray):
+        # Each run rebalances at the close of the first trading day on/after it
+        idx = np.searchsorted(days, run_dates)
+        usable = idx < len(days)
+        idx = idx[usable]
+        last_of_day = np.r_[idx[1:] != idx[:-1], True]  # same day: later run wins
+        keep = np.flatnonzero(usable)[last_of_day]
+        if len(keep) == 0:
+            raise ValueError("No snapshot falls inside the price history.")
+
+        self.fields = {k: v[keep] for k, v in fields.items()}
+        self.starts = idx[last_of_day]
+        self.ends = np.r_[self.starts[1:], len(days) - 1]
+        self.days = days[self.starts[0]:]
+        self.tradable = ~np.isnan(prices[self.starts])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            start_px = prices[self.starts]
+            # Period-end growth per symbol, and daily growth since period start
+            self.end_rel = np.nan_to_num(prices[self.ends] / start_px, nan=1.0, posinf=1.0)
+            t = np.arange(self.starts[0] + 1, len(days))
+            self.period_of_day = np.searchsorted(self.starts, t, side="left") - 1
+            self.day_rel = np.nan_to_num(
+                prices[t] / start_px[self.period_of_day], nan=1.0, posinf=1.0
+            )
+
+        self._alloc: dict[tuple, np.ndarray] = {}
+        self._order: dict[tuple, tuple[np.ndarray, np.ndarray]] = {}
+
+    def weights(self, rules: dict) -> np.ndarray:
+        akey = (rules["dcf_scale"], rules["bonus_weight"])
+        if akey not in self._alloc:
+            self._alloc[akey] = allocation_scores(self.fields, *akey)
+        alloc = self._alloc[akey]
+
+        okey = akey + (rules["score_floor"], rules["overvaluation_cap"])
+        if okey not in self._order:
+            eligible = eligibility(self.fields, rules["score_floor"], rules["overvaluation_cap"])
+            eligible &= self.tradable
+            order = np.argsort(-np.where(eligible, alloc, -np.inf), axis=1, kind="stable")
+            self._order[okey] = (order, eligible)
+        order, eligible = self._order[okey]
+
+        return target_weights(
+            alloc, order, eligible, int(rules["max_holdings"]), rules["weight_power"]
+        )
+
+    def run(self, rules: dict, cost_bps: float = 0.0) -> dict:
+        w = self.weights(rules)
+        cash = 1.0 - w.sum(axis=1)
+
+        gross = cash + (w * self.end_rel).sum(axis=1)  # period growth factors
+        drifted = np.vstack([np.zeros(w.shape[1]), (w * self.end_rel)[:-1]])
+        drift_cash = np.r_[1.0, cash[:-1]]
+        prior = np.r_[1.0, gross[:-1]]
+        turnover = 0.5 * (
+            np.abs(w - drifted / prior[:, None]).sum(axis=1)
+            + np.abs(cash - drift_cash / prior)
+        )
+        keep = 1.0 - turnover * cost_bps / 10_000
+
+        net = keep * gross
+        carried = np.r_[1.0, np.cumprod(net)[:-1]]
+        pod = self.period_of_day
+        within = cash[pod] + np.einsum("dn,dn->d", self.day_rel, w[pod])
+        equity = np.r_[1.0, carried[pod] * keep[pod] * within]
+
+        daily = equity[1:] / equity[:-1] - 1
+        years = max(len(daily), 1) / TRADING_DAYS
+        vol = daily.std() * np.sqrt(TRADING_DAYS) if len(daily) > 1 else 0.0
+        drawdown = equity / np.maximum.accumulate(equity) - 1
+        return {
+            "total_return": equity[-1] - 1,
+            "cagr": equity[-1] ** (1 / years) - 1,
+            "volatility": vol,
+            "sharpe": daily.mean() * TRADING_DAYS / vol if vol else 0.0,
+            "max_drawdown": drawdown.min(),
+            "avg_turnover": turnover[1:].mean() if len(turnover) > 1 else 0.0,
+            "avg_holdings": (w > 0).sum(axis=1).mean(),
+        }
+
+
+def sweep(bt: Backtest, grid: dict[str, list], cost_bps: float = 0.0) -> list[dict]:
+    """Runs every combination in `grid` (unlisted rules keep their defaults)."""
+    names = list(grid)
+    rows = []
+    for values in itertools.product(*(grid[n] for n in names)):
+        rules = {**DEFAULT_RULES, **dict(zip(names, values))}
+        rows.append({**rules, **bt.run(rules, cost_bps)})
+    rows.sort(key=lambda r: r["sharpe"], reverse=True)
+    return rows
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def _parse_grid(items: list[str]) -> dict[str, list]:
+    grid = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if name not in DEFAULT_RULES or not values:
+            raise argparse.ArgumentTypeError(
+                f"bad --grid entry {item!r}; expected one of {sorted(DEFAULT_RULES)}=v1,v2,..."
+            )
+        cast = int if name == "max_holdings" else float
+        grid[name] = [cast(v) for v in values.split(",")]
+    return grid
+
+
+def _write_results(rows: list[dict], path: str) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        for r in rows:
+            writer.writerow({k: round(float(v), 6) for k, v in r.items()})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backtest portfolio allocation rules")
+    parser.add_argument("--prices", required=True, help="CSV with date,symbol,close columns")
+    parser.add_argument("--history", default=HISTORY_DIR, help="Snapshot directory")
+    parser.add_argument("--grid", nargs="*", default=[], metavar="RULE=V1,V2")
+    parser.add_argument("--cost-bps", type=float, default=10.0, help="Cost per unit turnover")
+    parser.add_argument("--top", type=int, default=10, help="Combinations to print")
+    parser.add_argument("--out", default=RESULTS_FILE)
+    args = parser.parse_args()
+    try:
+        grid = _parse_grid(args.grid)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    run_dates, symbols, fields = load_snapshots(args.history)
+    if not len(run_dates):
+        print(f"No snapshots in {args.history}/ – run the pipeline first.")
+        return
+    days, prices = load_prices(args.prices, symbols)
+    bt = Backtest(run_dates, fields, days, prices)
+    loaded = time.perf_counter()
+    print(
+        f"{len(bt.starts)} rebalances, {len(bt.days)} trading days, {len(symbols)} symbols "
+        f"(loaded in {loaded - start:.1f}s)"
+    )
+
+    rows = sweep(bt, grid, args.cost_bps)
+    print(f"{len(rows)} combination(s) in {time.perf_counter() - loaded:.1f}s\n")
+
+    header = list(grid) or ["score_floor"]
+    print("  " + "  ".join(f"{h:>17}" for h in header)
+          + f"  {'CAGR':>8} {'Sharpe':>7} {'MaxDD':>8} {'Turnover':>9} {'Holdings':>9}")
+    for r in rows[:args.top]:
+        print("  " + "  ".join(f"{r[h]:>17g}" for h in header)
+              + f"  {r['cagr']:>8.2%} {r['sharpe']:>7.2f} {r['max_drawdown']:>8.2%}"
+              f" {r['avg_turnover']:>9.2%} {r['avg_holdings']:>9.1f}")
+
+    _write_results(rows, args.out)
+    print(f"\nAll results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Benchmark suite: synthetic fixtures and stage timings (python -m benchmarks.run)."""
@@ -0,0 +1,239 @@
+"""
+benchmarks/run.py
+------------------
+Times every pipeline stage over recorded/synthetic fixtures and compares the
+result against a stored baseline.
+
+Stages:
+    parse_page              stockFetch.parse_page per fixture page
+    getRatios               processData.getRatios over N raw dicts
+    calculate_dcf           calcEngine.calculate_dcf × N
+    calculate_weighted_score calcEngine.calculate_weighted_score × N
+    allocate_portfolio      portfolioOptimizer.allocate_portfolio(universe)
+    rebalance               main._rebalance(universe)
+    save                    main._save(universe) into a temp directory: stockData.json
+                            plus the per-view dashboard slices (webExport)
+    save_store              one --store sqlite commit: ResultStore.upsert_many(universe,
+                            dirty) after a single record changed (WAL, dirty rows only)
+
+Page fixtures: no recorded pages ship with the repo (fixtures/ is empty), so
+parse_page runs on synthetic screener.in-shaped pages (benchmarks.synthetic).
+Pages recorded with --record are used first; re-baseline after recording.
+
+Usage (from the project root):
+    python -m benchmarks.run                       # 500, 2200, 10000 symbols
+    python -m benchmarks.run --sizes 500 --repeat 3
+    python -m benchmarks.run --update-baseline     # accept current numbers
+    python -m benchmarks.run --record TCS INFY     # save live pages as fixtures
+
+Exit code is 1 when any stage's median is slower than the baseline by more
+than --tolerance (default 25%).
+"""
+
+import argparse
+import copy
+import glob
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_raw, make_universe, render_page, symbols
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+REPORT_FILE = os.path.join(BENCH_DIR, "results", "latest.json")
+
+DEFAULT_SIZES = (500, 2200, 10000)
+PAGE_SAMPLE = 25
+
+
+# ── Fixtures ────────────────────────────────────────────────────────────────
+
+def load_pages(count: int = PAGE_SAMPLE) -> list[tuple[str, str]]:
+    """Recorded fixture pages first, topped up with synthetic ones."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))[:count]:
+        with open(path, encoding="utf-8") as f:
+            pages.append((os.path.splitext(os.path.basename(path))[0], f.read()))
+    for sym in symbols(count - len(pages)):
+        pages.append((sym, render_page(sym)))
+    return pages
+
+
+def record_fixtures(symbol_list: list[str]) -> None:
+    from stockFetch import _fetch_html
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for sym in symbol_list:
+        html = _fetch_html(sym)
+        path = os.path.join(FIXTURE_DIR, f"{sym}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"  Recorded {path} ({len(html) / 1024:.0f} KiB)")
+
+
+# ── Timing ──────────────────────────────────────────────────────────────────
+
+def _time(fn, setup, repeat: int) -> list[float]:
+    """Runs fn(setup()) `repeat` times; setup cost is excluded."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _entry(samples: list[float], items: int) -> dict:
+    median = statistics.median(samples)
+    return {
+        "items": items,
+        "repeat": len(samples),
+        "min_s": round(min(samples), 6),
+        "median_s": round(median, 6),
+        "per_item_us": round(median / items * 1e6, 3) if items else None,
+    }
+
+
+def run_benchmarks(sizes: list[int], repeat: int) -> dict:
+    import main
+    import webExport
+    from calcEngine import calculate_dcf, calculate_weighted_score
+    from portfolioOptimizer import allocate_portfolio
+    from processData import getRatios
+    from resultStore import ResultStore
+    from stockFetch import parse_page
+
+    results = {}
+
+    pages = load_pages()
+    results["parse_page"] = _entry(
+        _time(lambda ps: [parse_page(s, h) for s, h in ps], lambda: pages, repeat),
+        len(pages),
+    )
+    print(f"  parse_page                         {results['parse_page']['per_item_us']:>12.1f} µs/page")
+
+    tmp = tempfile.mkdtemp(prefix="quant-bench-")
+    saved_paths = (main.DATA_FILE, webExport.WEBSITE_DIR, webExport.DATA_DIR, webExport.INSIGHT_DIR)
+    main.DATA_FILE = os.path.join(tmp, "stockData.json")
+    webExport.WEBSITE_DIR = tmp
+    webExport.DATA_DIR = os.path.join(tmp, "data")
+    webExport.INSIGHT_DIR = os.path.join(tmp, "insights")
+
+    try:
+        for n in sizes:
+            raws = [make_raw(s) for s in symbols(n)]
+            universe = make_universe(n)
+            fcfs = [max(0.0, r["FCF (Cr)"]) for r in universe]
+            score_dicts = [r["scores"] for r in universe]
+            store = ResultStore(os.path.join(tmp, f"stockData-{n}.db"))
+            store.upsert_many(universe)
+            committed, sequence = copy.deepcopy(universe), itertools.count()
+
+            def one_commit() -> tuple[list[dict], set[str]]:
+                # A fetch commit: one record re-scored, every row offered to the store
+                record = committed[next(sequence) % n]
+                record["final_score"] += 0.5
+                return committed, {record["symbol"]}
+
+            stages = {
+                "getRatios": (lambda rs: [getRatios(r) for r in rs], lambda: raws),
+                "calculate_dcf": (lambda fs: [calculate_dcf(f, 0.12) for f in fs], lambda: fcfs),
+                "calculate_weighted_score": (
+                    lambda ss: [calculate_weighted_score(s) for s in ss], lambda: score_dicts,
+                ),
+                "allocate_portfolio": (allocate_portfolio, lambda: copy.deepcopy(universe)),
+                "rebalance": (main._rebalance, lambda: copy.deepcopy(universe)),
+                "save": (main._save, lambda: universe),
+                "save_store": (lambda job: store.upsert_many(*job), one_commit),
+            }
+            for name, (fn, setup) in stages.items():
+                key = f"{name}[n={n}]"
+                results[key] = _entry(_time(fn, setup, repeat), n)
+                print(f"  {key:<34} {results[key]['median_s'] * 1000:>12.2f} ms")
+    finally:
+        main.DATA_FILE, webExport.WEBSITE_DIR, webExport.DATA_DIR, webExport.INSIGHT_DIR = saved_paths
+
+    return results
+
+
+# ── Baseline Comparison ─────────────────────────────────────────────────────
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Returns human-readable regression lines (empty when within tolerance)."""
+    regressions = []
+    for key, entry in current.items():
+        base = baseline.get(key)
+        if not base or not base.get("median_s"):
+            continue
+        ratio = entry["median_s"] / base["median_s"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"  {key}: {base['median_s'] * 1000:.2f} ms → "
+                f"{entry['median_s'] * 1000:.2f} ms ({ratio:.2f}×)"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pipeline stage benchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--report", default=REPORT_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--record", nargs="+", metavar="SYMBOL", help="Save live pages as fixtures")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+        return
+
+    print("Running benchmarks...")
+    results = run_benchmarks(args.sizes, args.repeat)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    os.makedirs(os.path.dirname(args.report), exist_ok=True)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    except FileNotFoundError:
+        print("No baseline found; run with --update-baseline to create one.")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%}:")
+        print("\n".join(regressions))
+        sys.exit(1)
+    print(f"No regressions beyond {args.tolerance:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
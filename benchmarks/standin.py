@@ -0,0 +1,260 @@
+"""
+benchmarks/standin.py
+----------------------
+Local stand-in for screener.in, the NSE archive CSVs and the DeepSeek API,
+for deterministic offline load tests of workers, rate limiting and retries.
+
+Routes:
+    GET  /company/<SYMBOL>/consolidated/         recorded benchmarks/fixtures/<SYMBOL>.html,
+                                                 else a synthetic page (ETag / 304 supported)
+    GET  /content/equities/EQUITY_L.csv          from fixtures/EQUITY_L.csv or listOfStocks.json (ETag / 304)
+    GET  /content/indices/ind_nifty500list.csv   from fixtures/ind_nifty500list.csv or nifty500Stocks.json (ETag / 304)
+    POST /chat/completions                       canned DeepSeek-style JSON scores
+    GET  /_stats                                 request / injected-fault counters
+
+Fault injection:
+    --latency-ms / --latency-dist   fixed | uniform | lognormal response delay
+    --p429 / --p5xx                 probability of an injected 429 / 503
+    --retry-after                   Retry-After seconds sent with injected errors
+    --rate-limit                    token-bucket requests/second; excess → 429
+
+Usage:
+    python -m benchmarks.standin --port 8765 --latency-ms 300 --p429 0.05
+    SCREENER_HOST=http://127.0.0.1:8765 NSE_ARCHIVE_HOST=http://127.0.0.1:8765 \\
+    DEEPSEEK_API_URL=http://127.0.0.1:8765 DEEPSEEK_API_KEY=local \\
+    SCREENER_FETCH_DELAY=0 PIPELINE_DELAY=0 python main.py
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import render_page, symbols
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+_COMPANY_RE = re.compile(r"^/company/([^/]+)/(?:consolidated/)?$")
+
+
+class StandInConfig:
+    def __init__(self, args: argparse.Namespace):
+        self.latency_ms = args.latency_ms
+        self.latency_dist = args.latency_dist
+        self.p429 = args.p429
+        self.p5xx = args.p5xx
+        self.retry_after = args.retry_after
+        self.rate_limit = args.rate_limit
+        self.unknown = args.unknown
+        self.seed = args.seed
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.stats: dict[str, int] = {}
+        self._tokens = float(args.rate_limit or 0)
+        self._refilled = time.monotonic()
+
+    def bump(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def delay(self) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        with self.lock:
+            if self.latency_dist == "uniform":
+                ms = self.rng.uniform(0, 2 * self.latency_ms)
+            elif self.latency_dist == "lognormal":
+                # Median = latency_ms with a heavy right tail
+                ms = self.rng.lognormvariate(math.log(self.latency_ms), 0.6)
+            else:
+                ms = self.latency_ms
+        return ms / 1000
+
+    def fault(self) -> int | None:
+        """Returns an injected status code, or None to serve normally."""
+        with self.lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                self._tokens = min(
+                    float(self.rate_limit),
+                    self._tokens + (now - self._refilled) * self.rate_limit,
+                )
+                self._refilled = now
+                if self._tokens < 1:
+                    return 429
+                self._tokens -= 1
+            roll = self.rng.random()
+        if roll < self.p429:
+            return 429
+        if roll < self.p429 + self.p5xx:
+            return 503
+        return None
+
+
+def _read_fixture(name: str) -> str | None:
+    path = os.path.join(FIXTURE_DIR, name)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _load_symbols(path: str, fallback: int) -> list[str]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return symbols(fallback)
+
+
+def equity_csv() -> str:
+    recorded = _read_fixture("EQUITY_L.csv")
+    if recorded is not None:
+        return recorded
+    rows = ["SYMBOL,NAME OF COMPANY, SERIES, DATE OF LISTING, PAID UP VALUE, MARKET LOT, ISIN NUMBER, FACE VALUE"]
+    for i, sym in enumerate(_load_symbols("listOfStocks.json", 2200)):
+        rows.append(f"{sym},{sym.title()} Limited,EQ,01-JAN-2000,10,1,INE{i:06d}01,10")
+    return "\n".join(rows) + "\n"
+
+
+def nifty500_csv() -> str:
+    recorded = _read_fixture("ind_nifty500list.csv")
+    if recorded is not None:
+        return recorded
+    rows = ["Company Name,Industry,Symbol,Series,ISIN Code"]
+    for i, sym in enumerate(_load_symbols("nifty500Stocks.json", 500)):
+        rows.append(f"{sym.title()} Limited,Diversified,{sym},EQ,INE{i:06d}01")
+    return "\n".join(rows) + "\n"
+
+
+def _ai_reply(symbol: str, seed: int) -> dict:
+    rng = random.Random(f"{symbol}:{seed}")
+    content = {
+        "customer_satisfaction": rng.randint(30, 80),
+        "moat": rng.randint(25, 80),
+        "tailwind": rng.randint(35, 80),
+        "management_quality": rng.randint(35, 85),
+        "notes": f"Stand-in analysis for {symbol}.",
+    }
+    return {"choices": [{"message": {"role": "assistant", "content": json.dumps(content)}}]}
+
+
+def make_handler(config: StandInConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # keep load tests quiet
+            pass
+
+        def _send(self, status: int, body: bytes = b"", ctype: str = "text/html", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", f"{ctype}; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if body and self.command != "HEAD":
+                self.wfile.write(body)
+            config.bump(f"status_{status}")
+
+        def _inject(self) -> bool:
+            time.sleep(config.delay())
+            status = config.fault()
+            if status is None:
+                return False
+            config.bump(f"injected_{status}")
+            self._send(status, b"injected", headers={"Retry-After": str(config.retry_after)})
+            return True
+
+        def do_GET(self):
+            config.bump("requests")
+            path = self.path.split("?", 1)[0]
+            if path == "/_stats":
+                with config.lock:
+                    body = json.dumps(config.stats).encode()
+                return self._send(200, body, "application/json")
+            if self._inject():
+                return
+
+            match = _COMPANY_RE.match(path)
+            if match:
+                return self._company(match.group(1))
+            if path.endswith("/EQUITY_L.csv"):
+                return self._csv(equity_csv())
+            if path.endswith("/ind_nifty500list.csv"):
+                return self._csv(nifty500_csv())
+            self._send(404, b"not found")
+
+        def _csv(self, content: str):
+            body = content.encode()
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                config.bump("not_modified")
+                return self._send(304, headers={"ETag": etag})
+            self._send(200, body, "text/csv", headers={"ETag": etag})
+
+        def _company(self, symbol: str):
+            recorded = _read_fixture(f"{symbol}.html")
+            if recorded is None and config.unknown == "404":
+                return self._send(404, b"not found")
+            etag = '"%s"' % hashlib.sha1(f"{symbol}:{config.seed}".encode()).hexdigest()[:16]
+            if recorded is None and self.headers.get("If-None-Match") == etag:
+                config.bump("not_modified")
+                return self._send(304, headers={"ETag": etag})
+            html = recorded if recorded is not None else render_page(symbol, config.seed)
+            headers = {} if recorded is not None else {"ETag": etag}
+            self._send(200, html.encode("utf-8"), headers=headers)
+
+        def do_POST(self):
+            config.bump("requests")
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = self.rfile.read(length) if length else b""
+            if self._inject():
+                return
+            if not self.path.endswith("/chat/completions"):
+                return self._send(404, b"not found")
+            try:
+                prompt = json.loads(payload)["messages"][-1]["content"]
+                symbol = re.search(r"stock '([^']+)'", prompt).group(1)
+            except (ValueError, KeyError, AttributeError):
+                symbol = "UNKNOWN"
+            body = json.dumps(_ai_reply(symbol, config.seed)).encode()
+            self._send(200, body, "application/json")
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local screener.in / NSE / DeepSeek stand-in server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-dist", choices=("fixed", "uniform", "lognormal"), default="fixed")
+    parser.add_argument("--p429", type=float, default=0.0, help="Probability of an injected 429")
+    parser.add_argument("--p5xx", type=float, default=0.0, help="Probability of an injected 503")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on injected errors")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests/second before 429s (0 = off)")
+    parser.add_argument("--unknown", choices=("synthetic", "404"), default="synthetic",
+                        help="Response for symbols without a recorded fixture")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(StandInConfig(args)))
+    print(f"Stand-in server on http://{args.host}:{args.port}  (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
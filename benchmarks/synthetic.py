@@ -0,0 +1,232 @@
+"""
+benchmarks/synthetic.py
+------------------------
+Deterministic synthetic data for benchmarks and offline load tests.
+
+    render_page(symbol, seed)  – screener.in-shaped HTML (same ids/classes the
+                                 stockFetch parsers read)
+    make_raw(symbol, seed)     – stockFetch.getStockData()-shaped dict
+    make_universe(n, seed)     – stockData.json-shaped list of scored records
+
+Everything is derived from (symbol, seed) so two runs produce identical data.
+"""
+
+import random
+import zlib
+
+SECTORS = [
+    "Consumer Discretionary", "Industrials", "Commodities", "Financial Services",
+    "Healthcare", "Fast Moving Consumer Goods", "Information Technology",
+    "Services", "Utilities", "Energy", "Telecommunication", "Diversified",
+]
+
+_YEARS = [f"Mar {y}" for y in range(2013, 2025)] + ["TTM"]
+_QUARTERS = [f"{m} {y}" for y in range(2022, 2025) for m in ("Mar", "Jun", "Sep", "Dec")]
+
+_ABOUT = (
+    "The company is engaged in the manufacture and distribution of {what} across "
+    "domestic and export markets, with {n} plants and a dealer network spanning "
+    "{m} districts. Key Points: diversified customer base, rising capacity "
+    "utilisation, ongoing capex programme."
+)
+_WHAT = ["specialty chemicals", "auto components", "packaged foods", "power cables",
+         "generic formulations", "enterprise software", "steel tubes", "textiles"]
+
+
+def _rng(symbol: str, seed: int) -> random.Random:
+    return random.Random(zlib.crc32(symbol.encode()) ^ seed)
+
+
+def symbols(n: int) -> list[str]:
+    """n stable, distinct NSE-looking symbols."""
+    return [f"SYM{i:05d}" for i in range(n)]
+
+
+# ── Raw (getStockData-shaped) ────────────────────────────────────────────────
+
+def _series(rng: random.Random, start: float, growth: float, n: int) -> list[float]:
+    values, v = [], start
+    for _ in range(n):
+        v *= 1 + rng.gauss(growth, 0.12)
+        values.append(round(v, 2))
+    return values
+
+
+def _table(metric_values: dict[str, list[float]], headers: list[str]) -> list[dict]:
+    rows = []
+    for metric, values in metric_values.items():
+        row = {"Metric": metric}
+        row.update({h: f"{v:.2f}".rstrip("0").rstrip(".") for h, v in zip(headers, values)})
+        rows.append(row)
+    return rows
+
+
+def make_raw(symbol: str, seed: int = 0) -> dict:
+    """Returns a dict shaped like stockFetch.getStockData() output."""
+    rng = _rng(symbol, seed)
+    sales = _series(rng, rng.uniform(50, 20_000), rng.uniform(-0.02, 0.18), len(_YEARS))
+    margin = rng.uniform(0.02, 0.25)
+    profit = [round(s * margin * rng.uniform(0.7, 1.3), 2) for s in sales]
+    equity = round(rng.uniform(5, 500), 2)
+    reserves = _series(rng, rng.uniform(50, 10_000), 0.08, len(_YEARS) - 1)
+    borrowings = _series(rng, rng.uniform(0, 5_000), 0.03, len(_YEARS) - 1)
+    cfo = [round(p * rng.uniform(0.6, 1.4), 2) for p in profit[:-1]]
+    capex = [round(-c * rng.uniform(0.2, 0.9), 2) for c in cfo]
+    fii = round(rng.uniform(0, 35), 2)
+    dii = round(rng.uniform(0, 30), 2)
+    promoters = round(rng.uniform(25, 75), 2)
+    price = round(rng.uniform(20, 5_000), 1)
+    mcap = round(max(10.0, profit[-1] * rng.uniform(5, 60)), 0)
+
+    return {
+        "symbol": symbol,
+        "Company Name": f"{symbol.title()} Industries Limited",
+        "About": _ABOUT.format(what=rng.choice(_WHAT), n=rng.randint(2, 30), m=rng.randint(40, 600)),
+        "ratios": {
+            "Market Cap": f"{mcap:,.0f}",
+            "Current Price": f"{price:,.1f}",
+            "High / Low": f"{price * 1.3:,.0f} / {price * 0.7:,.0f}",
+            "Stock P/E": f"{rng.uniform(5, 80):.1f}",
+            "Book Value": f"{price / rng.uniform(0.5, 8):,.1f}",
+            "Dividend Yield": f"{rng.uniform(0, 4):.2f}",
+            "ROCE": f"{rng.uniform(-5, 45):.1f}",
+            "ROE": f"{rng.uniform(-5, 40):.1f}",
+            "Face Value": "10.0",
+            "Sector": rng.choice(SECTORS),
+        },
+        "pnl": _table({
+            "Sales": sales,
+            "Expenses": [round(s * (1 - margin), 2) for s in sales],
+            "Operating Profit": [round(s * margin * 1.4, 2) for s in sales],
+            "Interest": [round(b * 0.09, 2) for b in borrowings] + [0],
+            "Net Profit": profit,
+            "EPS in Rs": [round(p / equity * 10, 2) for p in profit],
+        }, _YEARS),
+        "balance_sheet": _table({
+            "Equity Capital": [equity] * (len(_YEARS) - 1),
+            "Reserves": reserves,
+            "Borrowings": borrowings,
+            "Total Liabilities": [round(equity + r + b, 2) for r, b in zip(reserves, borrowings)],
+        }, _YEARS[:-1]),
+        "cash_flow": _table({
+            "Cash from Operating Activity": cfo,
+            "Fixed assets purchased": capex,
+            "Cash from Investing Activity": [round(c * 1.1, 2) for c in capex],
+            "Net Cash Flow": [round(c * 0.1, 2) for c in cfo],
+        }, _YEARS[:-1]),
+        "shareholding": _table({
+            "Promoters": [promoters] * len(_QUARTERS),
+            "FIIs": [fii] * len(_QUARTERS),
+            "DIIs": [dii] * len(_QUARTERS),
+            "Public": [round(100 - promoters - fii - dii, 2)] * len(_QUARTERS),
+        }, _QUARTERS),
+    }
+
+
+# ── HTML (screener.in-shaped) ────────────────────────────────────────────────
+
+def _html_table(section_id: str, rows: list[dict]) -> str:
+    headers = [h for h in rows[0] if h != "Metric"] if rows else []
+    out = [f'<section id="{section_id}" class="card card-large">',
+           '<div class="responsive-holder"><table class="data-table"><thead><tr><th class="text"></th>']
+    out += [f"<th>{h}</th>" for h in headers]
+    out.append("</tr></thead><tbody>")
+    for row in rows:
+        out.append(f'<tr><td class="text">{row["Metric"]}&nbsp;<span class="blue-icon">+</span></td>')
+        for h in headers:
+            v = row.get(h, "")
+            try:
+                v = f"{float(v):,}"
+            except ValueError:
+                pass
+            out.append(f"<td>{v}</td>")
+        out.append("</tr>")
+    out.append("</tbody></table></div></section>")
+    return "".join(out)
+
+
+def render_page(symbol: str, seed: int = 0) -> str:
+    """Renders a screener.in-like company page for the synthetic raw record."""
+    raw = make_raw(symbol, seed)
+    ratios = dict(raw["ratios"])
+    sector = ratios.pop("Sector")
+    top = "".join(
+        f'<li class="flex flex-space-between"><span class="name">{k}</span>'
+        f'<span class="nowrap value">₹ <span class="number">{v}</span></span></li>'
+        for k, v in ratios.items()
+    )
+    filler = "".join(
+        f'<div class="sidebar-item"><a href="/company/PEER{i}/">Peer {i}</a></div>'
+        for i in range(60)
+    )
+    # The CSRF token differs on every render, like the live site.
+    csrf = f"{random.getrandbits(32):08x}"
+    return (
+        f"<!DOCTYPE html><html><head><title>{raw['Company Name']} share price</title>"
+        f'<meta name="csrf-token" content="{csrf}"></head><body>'
+        '<nav class="breadcrumb"></nav><p class="breadcrumb"><a href="/">Home</a>'
+        f'<a href="/market/IN01/">{sector}</a></p>'
+        f'<div class="flex-row"><h1 class="margin-0">{raw["Company Name"]}</h1></div>'
+        f'<div class="company-profile"><div class="title">About</div><p>{raw["About"]}</p>'
+        '<div class="title">Key Points</div><a>Read More</a></div>'
+        f'<ul id="top-ratios">{top}</ul>'
+        f'<section id="peers"><a href="/market/IN01/IN0101/">{sector}</a>{filler}</section>'
+        + _html_table("profit-loss", raw["pnl"])
+        + _html_table("balance-sheet", raw["balance_sheet"])
+        + _html_table("cash-flow", raw["cash_flow"])
+        + _html_table("shareholding", raw["shareholding"])
+        + "</body></html>"
+    )
+
+
+# ── Processed universe (stockData.json-shaped) ──────────────────────────────
+
+def make_record(symbol: str, seed: int = 0) -> dict:
+    """A scored record with the same keys main.py writes to stockData.json."""
+    rng = _rng(symbol, seed)
+    price = round(rng.uniform(20, 5_000), 1)
+    mcap = round(rng.lognormvariate(7.8, 1.6), 0)
+    shares = round(mcap / price, 2)
+    intrinsic_total = round(mcap * rng.lognormvariate(0, 0.9), 2)
+    scores = {
+        "dcf_score": round(min(100.0, intrinsic_total / mcap * 25), 4),
+        "growth_score": round(rng.uniform(0, 100), 4),
+        "roce_score": round(rng.uniform(0, 90), 4),
+        "fii_dii_de_score": round(rng.uniform(10, 90), 4),
+        "moat_score": rng.choice([37.5, 42.5, 55.0, 67.5, 80.0]),
+        "tailwind_score": rng.choice([40, 50, 60, 70]),
+        "management_score": rng.choice([45, 55, 65, 75]),
+    }
+    final = round(
+        0.30 * scores["dcf_score"] + 0.20 * scores["growth_score"]
+        + 0.10 * scores["roce_score"] + 0.15 * scores["moat_score"]
+        + 0.05 * scores["fii_dii_de_score"] + 0.10 * scores["tailwind_score"]
+        + 0.10 * scores["management_score"], 2,
+    )
+    return {
+        "symbol": symbol,
+        "Sector": rng.choice(SECTORS),
+        "Market Cap (Cr)": mcap,
+        "Current Price": price,
+        "Intrinsic Value (Total Cr)": intrinsic_total,
+        "Shares Outstanding (Cr)": shares,
+        "Intrinsic Price Per Share": round(intrinsic_total / shares, 2) if shares > 0 else 0,
+        "ROCE (%)": round(rng.uniform(-5, 45), 1),
+        "PE": round(rng.uniform(5, 80), 2),
+        "PB": round(rng.uniform(0.3, 12), 2),
+        "D/E": round(max(0.0, rng.gauss(0.5, 0.6)), 2),
+        "Rev CAGR (%)": round(rng.uniform(-10, 40), 2),
+        "FCF (Cr)": round(mcap * rng.uniform(0.01, 0.08), 2),
+        "FII (%)": round(rng.uniform(0, 35), 2),
+        "DII (%)": round(rng.uniform(0, 30), 2),
+        "scores": scores,
+        "final_score": final,
+        "ai_notes": "MOAT: Weak or undefined. CUSTOMER SAT: Unremarkable. MGMT: Standard compliance.",
+        "Broad Sector": "Others",
+        "portfolio_weight": 0.0,
+        "Company Name": f"{symbol.title()} Industries Limited",
+    }
+
+
+def make_universe(n: int, seed: int = 0) -> list[dict]:
+    return [make_record(s, seed) for s in symbols(n)]
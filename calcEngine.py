@@ -60,6 +60,35 @@ def calculate_dcf(
     return sum(discounted) + discounted_tv
 
 
+def intrinsic_value(fcf: float, rev_cagr: float) -> float:
+    """DCF value using revenue CAGR as the initial growth rate (5% if not positive)."""
+    value = calculate_dcf(
+        max(0, fcf),
+        growth_rate=float(rev_cagr) / 100 if rev_cagr > 0 else 0.05,
+    )
+    return value.real if isinstance(value, complex) else value
+
+
+# ── Sub-scores (0–100) ───────────────────────────────────────────────────────
+
+def dcf_score(intrinsic: float, market_cap: float) -> float:
+    """Intrinsic value vs market cap: 4x undervalued (or more) scores 100."""
+    if market_cap <= 0:
+        return 0.0
+    return min(100.0, max(0.0, (intrinsic / market_cap) * 25))
+
+
+def roce_score(roce: float) -> float:
+    return min(100.0, max(0.0, roce * 2))
+
+
+def fii_dii_de_score(de: float, fii: float, dii: float) -> float:
+    """Average of leverage (D/E 0 → 100, 2+ → 0) and institutional ownership."""
+    de_score = max(0.0, 100.0 - (de * 50))
+    fii_dii_score = min(100.0, fii + dii)
+    return (de_score + fii_dii_score) / 2
+
+
 def calculate_weighted_score(metrics: dict) -> float:
     """
     Computes the final composite quant score (0–100) from individual sub-scores.
@@ -0,0 +1,114 @@
+"""
+circuitBreaker.py
+------------------
+Pauses all requests to a host after a burst of host-level errors (timeouts,
+connection errors, 429/5xx), instead of letting every worker keep hammering
+a host that is down or throttling us.
+
+    closed     normal operation; errors are counted in a sliding window
+    open       THRESHOLD errors within WINDOW seconds: every caller of wait()
+               blocks for the cooldown (doubling on repeated trips, capped)
+    half-open  cooldown over: one probe request goes through; success closes
+               the breaker, failure re-opens it
+
+Per-symbol outcomes (404, missing data) are not host errors and count as
+successes here; those go to the negative cache in main.py instead.
+"""
+
+import threading
+import time
+from collections import deque
+
+from pipelineMetrics import METRICS
+from timeBudget import bounded
+
+THRESHOLD = 5
+WINDOW = 60.0
+COOLDOWN = 60.0
+MAX_COOLDOWN = 900.0
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        threshold: int = THRESHOLD,
+        window: float = WINDOW,
+        cooldown: float = COOLDOWN,
+        max_cooldown: float = MAX_COOLDOWN,
+    ):
+        self.name = name
+        self.threshold = threshold
+        self.window = window
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = "closed"
+        self.trips = 0
+        self._cooldown = cooldown
+        self._errors: deque[float] = deque()
+        self._open_until = 0.0
+        self._probing = False
+        self._cond = threading.Condition()
+
+    def wait(self) -> None:
+        """
+        Blocks while the breaker is open (or another caller is probing), at
+        most until the caller's deadline (timeBudget.DeadlineExceeded).
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.state == "open":
+                    if now < self._open_until:
+                        self._cond.wait(bounded(self._open_until - now, "circuit breaker"))
+                        continue
+                    self.state = "half-open"
+                if self.state == "half-open":
+                    if self._probing:
+                        self._cond.wait(bounded(None, "circuit breaker"))
+                        continue
+                    self._probing = True
+                return
+
+    def abandon(self) -> None:
+        """The caller gave up mid-request (deadline): free the probe without a verdict."""
+        with self._cond:
+            if self.state == "half-open" and self._probing:
+                self._probing = False
+                self._cond.notify_all()
+
+    def success(self) -> None:
+        with self._cond:
+            if self.state == "half-open":
+                print(f"  [BREAKER] {self.name}: probe succeeded, closing")
+                self.state = "closed"
+                self._cooldown = self.base_cooldown
+                self._errors.clear()
+            self._probing = False
+            self._cond.notify_all()
+
+    def failure(self, reason: str) -> None:
+        with self._cond:
+            now = time.monotonic()
+            if self.state == "half-open":
+                self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+                self._open(now, f"probe failed ({reason})")
+            elif self.state == "closed":
+                self._errors.append(now)
+                while self._errors and self._errors[0] < now - self.window:
+                    self._errors.popleft()
+                if len(self._errors) >= self.threshold:
+                    self._open(now, f"{len(self._errors)} host errors in {self.window:g}s, last: {reason}")
+            self._probing = False
+            self._cond.notify_all()
+
+    def _open(self, now: float, why: str) -> None:
+        self.state = "open"
+        self.trips += 1
+        self._open_until = now + self._cooldown
+        self._errors.clear()
+        METRICS.inc("circuit_open_total", host=self.name)
+        print(f"  [BREAKER] {self.name}: open for {self._cooldown:g}s – {why}")
+
+
+FETCH_BREAKER = CircuitBreaker("screener.in")
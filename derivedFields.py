@@ -0,0 +1,208 @@
+"""
+derivedFields.py
+-----------------
+Declared dependency graph for the fields derived from a record's inputs, so a
+change to one input recomputes only what depends on it.
+
+    FCF (Cr), Rev CAGR (%) ──► Intrinsic Value (Total Cr) ──► scores.dcf_score ─┐
+    Market Cap, Current Price ──► Shares Outstanding ──► Intrinsic Price/Share  │
+    ROCE (%) ──► scores.roce_score ─────────────────────────────────────────────┤
+    D/E, FII (%), DII (%) ──► scores.fii_dii_de_score ──────────────────────────┼─► final_score
+    scores.growth_score, moat/tailwind/management (AI) ─────────────────────────┘
+    Sector ──► Broad Sector
+
+Nested fields use dotted paths ("scores.dcf_score"). Recomputation stops at
+nodes whose value did not change (early cutoff). The universe-level portfolio
+allocation is not a per-record node: needs_rebalance() reports whether any
+changed field feeds allocate_portfolio.
+
+Stored inputs are rounded (DECIMALS, as getRatios() writes them), so
+re-deriving a field from them can land a few rounding steps away from the
+stored value even though nothing changed. A forced recompute (recompute_all,
+a full recalc in patch_stockdata) therefore keeps a stored number when the
+difference is within what rounding explains for that node: one step of its
+own rounding plus how far half a step of each rounded input moves it.
+update_record, where an input really changed, always writes the new value.
+
+Usage:
+    from derivedFields import update_record, needs_rebalance
+    changed = update_record(record, {"D/E": 0.42})
+    # → {"D/E", "scores.fii_dii_de_score", "final_score"}
+    if needs_rebalance(changed): ...
+"""
+
+from collections.abc import Callable
+from graphlib import TopologicalSorter
+
+from calcEngine import (
+    calculate_weighted_score,
+    dcf_score,
+    fii_dii_de_score,
+    intrinsic_value,
+    roce_score,
+)
+from portfolioOptimizer import get_broad_sector
+
+# Decimal places getRatios() rounds each field to; other inputs are stored as scraped
+DECIMALS: dict[str, int] = {
+    "FCF (Cr)": 2, "Rev CAGR (%)": 2, "D/E": 2,
+    "Intrinsic Value (Total Cr)": 2, "Shares Outstanding (Cr)": 2, "Intrinsic Price Per Share": 2,
+    "scores.dcf_score": 4, "scores.growth_score": 4, "scores.roce_score": 4,
+    "scores.fii_dii_de_score": 4, "final_score": 2,
+}
+
+
+def _get(record: dict, path: str, default=None):
+    head, _, rest = path.partition(".")
+    if not rest:
+        return record.get(head, default)
+    return (record.get(head) or {}).get(rest, default)
+
+
+def _set(record: dict, path: str, value) -> None:
+    head, _, rest = path.partition(".")
+    if not rest:
+        record[head] = value
+        return
+    if record.get(head) is None:
+        record[head] = {}  # Re-read below: a StockRecord stores its own Scores copy
+    record[head][rest] = value
+
+
+def _num(record: dict, path: str) -> float:
+    value = _get(record, path, 0)
+    return float(value) if isinstance(value, (int, float)) else 0.0
+
+
+def _shares(r: dict) -> float:
+    price = _num(r, "Current Price")
+    return round(_num(r, "Market Cap (Cr)") / price, 2) if price > 0 else 0.0
+
+
+def _intrinsic_price(r: dict) -> float:
+    shares = _num(r, "Shares Outstanding (Cr)")
+    return round(_num(r, "Intrinsic Value (Total Cr)") / shares, 2) if shares > 0 else 0
+
+
+def _step(field: str) -> float:
+    return 10.0 ** -DECIMALS[field] if field in DECIMALS else 0.0
+
+
+# ── Graph ───────────────────────────────────────────────────────────────────
+
+# node → (input fields, compute(record) → value); rounding matches getRatios()
+NODES: dict[str, tuple[tuple[str, ...], Callable[[dict], object]]] = {
+    "Intrinsic Value (Total Cr)": (
+        ("FCF (Cr)", "Rev CAGR (%)"),
+        lambda r: round(float(intrinsic_value(_num(r, "FCF (Cr)"), _num(r, "Rev CAGR (%)"))), 2),
+    ),
+    "Shares Outstanding (Cr)": (("Market Cap (Cr)", "Current Price"), _shares),
+    "Intrinsic Price Per Share": (
+        ("Intrinsic Value (Total Cr)", "Shares Outstanding (Cr)"),
+        _intrinsic_price,
+    ),
+    "scores.dcf_score": (
+        ("Intrinsic Value (Total Cr)", "Market Cap (Cr)"),
+        lambda r: round(
+            float(dcf_score(_num(r, "Intrinsic Value (Total Cr)"), _num(r, "Market Cap (Cr)"))), 4
+        ),
+    ),
+    "scores.roce_score": (("ROCE (%)",), lambda r: round(float(roce_score(_num(r, "ROCE (%)"))), 4)),
+    "scores.fii_dii_de_score": (
+        ("D/E", "FII (%)", "DII (%)"),
+        lambda r: round(
+            float(fii_dii_de_score(_num(r, "D/E"), _num(r, "FII (%)"), _num(r, "DII (%)"))), 4
+        ),
+    ),
+    "final_score": (
+        (
+            "scores.dcf_score", "scores.growth_score", "scores.roce_score", "scores.moat_score",
+            "scores.fii_dii_de_score", "scores.tailwind_score", "scores.management_score",
+        ),
+        lambda r: calculate_weighted_score(r.get("scores") or {}),
+    ),
+    "Broad Sector": (("Sector",), lambda r: get_broad_sector(r.get("Sector", "Other"))),
+}
+
+ORDER: tuple[str, ...] = tuple(
+    n for n in TopologicalSorter({n: set(NODES[n][0]) for n in NODES}).static_order()
+    if n in NODES
+)
+
+# Stored inputs no node computes; dirtying all of them recomputes every node
+ROOT_INPUTS = frozenset(i for inputs, _ in NODES.values() for i in inputs) - NODES.keys()
+
+# Record fields read by portfolioOptimizer.allocate_portfolio / _allocation_score
+ALLOCATION_INPUTS = frozenset({
+    "final_score", "Current Price", "Intrinsic Price Per Share",
+    "ROCE (%)", "D/E", "FII (%)", "DII (%)", "Sector", "Broad Sector",
+})
+
+
+# ── Recompute ───────────────────────────────────────────────────────────────
+
+def _settled(record: dict, node: str, stored, value) -> bool:
+    """True when the recomputed `value` differs from the stored one by rounding alone."""
+    if not isinstance(stored, (int, float)) or not isinstance(value, (int, float)):
+        return stored == value
+    inputs, compute = NODES[node]
+    tolerance = _step(node) + 1e-9
+    for field in inputs:
+        x = _get(record, field)
+        if field not in DECIMALS or not isinstance(x, (int, float)):
+            continue
+        moved = 0.0
+        for bumped in (x - _step(field) / 2, x + _step(field) / 2):
+            _set(record, field, bumped)
+            try:
+                moved = max(moved, abs(compute(record) - value))
+            finally:
+                _set(record, field, x)
+        tolerance += moved
+    return abs(value - stored) <= tolerance
+
+
+def recompute(record: dict, dirty: set[str], forced: bool = False) -> set[str]:
+    """
+    Recomputes the nodes downstream of the `dirty` fields, in dependency
+    order, skipping branches whose inputs ended up unchanged. Returns the
+    derived fields whose values changed.
+
+    forced=True means the dirty fields are not known to have changed: stored
+    values within rounding distance of the recomputed ones are kept.
+    """
+    dirty = set(dirty)
+    changed = set()
+    for node in ORDER:
+        inputs, compute = NODES[node]
+        if dirty.isdisjoint(inputs):
+            continue
+        value = compute(record)
+        stored = _get(record, node)
+        if stored != value and not (forced and _settled(record, node, stored, value)):
+            _set(record, node, value)
+            dirty.add(node)
+            changed.add(node)
+    return changed
+
+
+def recompute_all(record: dict) -> set[str]:
+    """Recomputes every derived field from the stored inputs (e.g. after a formula change)."""
+    return recompute(record, ROOT_INPUTS, forced=True)
+
+
+def update_record(record: dict, updates: dict) -> set[str]:
+    """
+    Applies input updates (dotted keys allowed) and recomputes dependents.
+    Returns every field that changed, inputs included.
+    """
+    changed = set()
+    for path, value in updates.items():
+        if _get(record, path) != value:
+            _set(record, path, value)
+            changed.add(path)
+    return changed | recompute(record, changed) if changed else changed
+
+
+def needs_rebalance(changed: set[str]) -> bool:
+    return not ALLOCATION_INPUTS.isdisjoint(changed)
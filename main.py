@@ -9,106 +9,438 @@ Workflow per stock:
     3. Get AI qualitative scores                   (aiAnalysis)
     4. Compute final composite score               (calcEngine)
     5. Optimise portfolio allocation               (portfolioOptimizer)
-    6. Save incrementally to stockData.json
+    6. Save incrementally to stockData.json + dashboard slices (webExport)
+
+Commands (fetch is the default, so flags-only invocations work as before):
+    python main.py fetch [flags]   # The pipeline below
+    python main.py rebalance       # Re-run allocation over stored records      (offline)
+    python main.py rescore         # Recompute derived fields + scores, rebalance (offline)
+    python main.py export          # Rewrite dashboard slices / stockData.json  (offline)
+    python main.py revalue CSV     # Reprice from an NSE bhavcopy, rescore, rebalance (offline)
+    python main.py patch [flags]   # patch_stockdata.py
+    python main.py serve [flags]   # In-memory JSON query service on localhost (queryService)
+    python main.py diff [OLD NEW]  # Change report between two runs / snapshots (runDiff)
+
+Offline commands never import requests or bs4: stockFetch, aiAnalysis,
+parsePool, scoreHistory and riskModel (numpy) are imported where they are used.
 
 Run:
-    python main.py
+    python main.py             # Process symbols not yet in stockData.json
+    python main.py --refresh   # Re-check every symbol with conditional requests
+    python main.py --profile   # Per-stage cProfile dumps + tracemalloc peaks
+    python main.py --shard 0/4 # Process one hash-stable quarter of the universe
+    python main.py --merge 4   # Combine shard outputs, rebalance, write outputs
+    python main.py --store sqlite  # Keep results in stockData.db (WAL, per-row upserts)
+    python main.py --prune-delisted  # Drop records whose symbol left listOfStocks.json
+    python main.py --refresh --early-stop  # Stop once the top-150 weights settle
+    python main.py --retry-failed  # Also attempt symbols still in their failure backoff
+    python main.py --time-budget 240  # Stop starting new symbols after 4 hours
+    python main.py rebalance --scoring sector  # Allocate on sector-relative percentiles
 
 Resumable: Already-processed symbols are skipped automatically.
-To re-run everything, clear stockData.json first.
+To re-run everything, clear stockData.json first. --refresh re-fetches
+processed symbols too, but reuses the stored record whenever screener.in
+reports the page unchanged (HTTP 304 or identical section digest).
+
+Scheduling: pending symbols run highest expected impact first (Nifty 500
+members, held names, prior score / market cap, staleness; see priorityScheduler).
+With --early-stop the run ends once the top-MAX_PORTFOLIO weights have moved by
+at most --stop-tolerance over --stop-patience consecutive re-scored commits
+(unchanged pages do not count).
+
+Failures: a failed symbol is recorded in failureCache.json with a reason code
+(http_404, no_data, timeout, ...) and skipped until an exponentially growing
+retry time (see negativeCache); --retry-failed ignores those times. A burst of
+host-level errors trips the fetch circuit breaker, which pauses all page
+requests instead of failing symbol after symbol (see circuitBreaker).
+
+Scoring: --scoring sector ranks the quantitative metrics as percentiles within
+each record's Sector (Broad Sector for thin sectors) and allocates on the
+resulting sector_final_score; final_score stays absolute (see sectorScoring).
+During a fetch run only the peer groups a commit touches are re-ranked.
+
+Time limits: each symbol gets --symbol-deadline seconds across all of its
+stages (delays, limiter waits, request + retries, parse, DeepSeek); past it the
+symbol fails with reason "deadline" and its worker moves on. --time-budget caps
+the whole run: no new symbol starts once it is spent, symbols in flight are
+cut off at its end, finished ones are already committed, and the skipped
+symbols stay pending for the next run (see timeBudget).
+
+Run diff: fetch, rebalance, rescore and revalue end by comparing the records
+before and after (portfolio entries / exits, weight changes, score and
+intrinsic-value jumps, added / removed / failed symbols), print a summary and
+write the changes to runDiff.jsonl (see runDiff).
+
+Revalue: "main.py revalue <bhavcopy.csv>" moves Current Price / Market Cap /
+PE / PB to the day's closes for the whole universe, recomputes the price-
+dependent scores from stored fundamentals and rebalances (see priceRevalue).
+Each bhavcopy's closes are also appended to priceHistory.csv.
+
+Risk: once priceHistory.csv exists, fetch, rebalance, rescore and revalue
+also print the portfolio's annualized volatility from a shrinkage covariance
+of daily returns, with the risk share of each Broad Sector next to its weight
+and the largest single-name contributors (see riskModel).
+
+Universe changes: only symbols added to listOfStocks.json are scheduled.
+When the list is the full NSE equity list (listOfStocks.meta.json, written by
+updateStockList.py, or --full-list), records whose symbol was removed get
+"delisted_on" (first date noticed) and are excluded from allocation;
+--prune-delisted deletes them instead, unless more than 5% would go at once.
+A narrowed list (--nifty500) only limits what is fetched.
+
+Sharding: symbols are assigned by crc32(symbol) % N, so every host agrees on
+the split without coordination. Each shard writes shards/stockData.shard-i-of-N.json
+(plus its own fetch cache, failure cache and metrics file); --merge N folds those files over
+the existing stockData.json, runs one final rebalance and writes the usual outputs.
 """
 
+import argparse
+import glob
 import json
+import os
 import random
+import sys
 import threading
 import time
+import zlib
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from aiAnalysis import get_ai_analysis
-from calcEngine import calculate_weighted_score
-from portfolioOptimizer import allocate_portfolio, get_broad_sector
-from processData import getRatios
-from stockFetch import getStockData
+from adaptiveConcurrency import AI_LIMIT, FETCH_LIMIT, env_range
+from derivedFields import recompute_all, update_record
+from negativeCache import NEGATIVE_CACHE_FILE, NegativeCache
+from pipelineMetrics import METRICS, METRICS_FILE
+from portfolioOptimizer import MAX_PORTFOLIO, OTHER_BROAD_SECTOR, allocate_portfolio, get_broad_sector
+from priorityScheduler import ConvergenceMonitor, order_pending
+from resultStore import STORE_FILE, ResultStore, open_store
+from runDiff import iter_changes, print_report, snapshot_records, snapshot_row, write_report
+from stageProfiler import PROFILER
+from stockRecord import StockRecord, load_records, write_records
+from timeBudget import DeadlineExceeded, RunBudget, deadline, sleep
+from webExport import export_views
 
 # ── Configuration ────────────────────────────────────────────────────────────
 
 DATA_FILE = "stockData.json"
-WEBSITE_DATA_FILE = "website/data/stockData.json"
 STOCK_LIST_FILE = "listOfStocks.json"
-MAX_WORKERS = 5
+STOCK_LIST_META_FILE = "listOfStocks.meta.json"  # {"source": "nse_all" | "nifty500", ...}
+FULL_LIST_SOURCE = "nse_all"  # Only a full exchange list says a missing symbol was delisted
+PRUNE_MAX_SHARE = 0.05  # --prune-delisted refuses to delete more of the records at once
+SHARD_DIR = "shards"
+EXPORT_EVERY = 25  # --store sqlite: refresh stockData.json + dashboard every N commits
+
+STORE: ResultStore | None = None  # Set by --store sqlite
+SCORING = "absolute"  # Set by --scoring
+# Worker threads only bound the pool; requests in flight are set per service
+# by the AIMD limiters (adaptiveConcurrency), which back off on 429/5xx.
+MAX_WORKERS = max(FETCH_LIMIT.maximum, AI_LIMIT.maximum)
+PROCESS_DELAY = env_range("PIPELINE_DELAY", (2, 5))            # Per-stock buffer
+SYMBOL_DEADLINE = 180.0  # Seconds per symbol across all stages (--symbol-deadline)
 
 # ── Persistence ─────────────────────────────────────────────────────────────
 
-def _load_existing() -> list[dict]:
+def _load_existing(path: str | None = None) -> list[StockRecord]:
+    if path is None and STORE is not None:
+        return STORE.load_all()
     try:
-        with open(DATA_FILE) as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        return load_records(path or DATA_FILE)
+    except json.JSONDecodeError:
         return []
 
 
-def _save(results: list[dict]) -> None:
-    """Writes results to stockData.json and the website data mirror."""
-    with open(DATA_FILE, "w") as f:
-        json.dump(results, f, indent=4)
+def _save(
+    results: list[dict],
+    path: str | None = None,
+    mirror: bool = True,
+    export: bool = True,
+    dirty: set[str] | None = None,
+) -> None:
+    """
+    Writes results to stockData.json (or `path`) and the dashboard data slices.
+
+    With the SQLite store, only changed rows are upserted (only the `dirty`
+    symbols are compared when given); the JSON file and dashboard slices are
+    refreshed only when `export` is set.
+    """
+    if path is None and STORE is not None:
+        STORE.upsert_many(results, dirty)
+        if not export:
+            return
+    write_records(path or DATA_FILE, results)
+    if mirror:
+        export_views(results)
+
+
+def _load_universe() -> list[str] | None:
     try:
-        with open(WEBSITE_DATA_FILE, "w") as f:
-            json.dump(results, f, indent=4)
+        with open(STOCK_LIST_FILE) as f:
+            return json.load(f)
     except FileNotFoundError:
-        pass  # Website data directory may not exist yet
+        return None
 
 
-# ── Per-stock Processing ─────────────────────────────────────────────────────
+def _universe_source(universe: list[str]) -> str | None:
+    """
+    Where listOfStocks.json came from, as recorded by updateStockList.py;
+    None when unrecorded or when the list no longer has the recorded length
+    (edited by hand since).
+    """
+    try:
+        with open(STOCK_LIST_META_FILE) as f:
+            meta = json.load(f)
+        return meta["source"] if meta.get("count") == len(universe) else None
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError, KeyError):
+        return None
+
 
-def _process_stock(symbol: str) -> dict | None:
-    """Fetches, processes, and scores a single stock. Returns None on failure."""
-    time.sleep(random.uniform(2, 5))  # Polite rate-limit buffer
-    print(f"  Analysing {symbol}...")
+def _reconcile_universe(
+    records: list[dict], universe: list[str], prune: bool, full_list: bool = False
+) -> list[dict]:
+    """
+    Marks (or prunes) records whose symbol left the stock list and unmarks
+    symbols that came back. Returns the records to keep.
+
+    A narrowed list (updateStockList.py --nifty500, a hand-made subset) is a
+    filter, not a delisting signal: records outside it are only marked when
+    the list is the full NSE list (listOfStocks.meta.json) or `full_list`
+    (--full-list) vouches for it. Pruning more than PRUNE_MAX_SHARE of the
+    records in one go is refused; they are marked instead.
+    """
+    listed = set(universe)
+    source = _universe_source(universe)
+    complete = full_list or source == FULL_LIST_SOURCE
+    missing = sum(1 for r in records if r["symbol"] not in listed)
+    if not complete:
+        if missing:
+            print(
+                f"Universe: {STOCK_LIST_FILE} is not the full NSE list (source: {source or 'unknown'}); "
+                f"{missing} records outside it are not marked delisted (--full-list to override)"
+            )
+    elif prune and missing > PRUNE_MAX_SHARE * len(records):
+        print(
+            f"  [WARN] {missing} of {len(records)} records left {STOCK_LIST_FILE}; refusing to prune "
+            f"more than {PRUNE_MAX_SHARE:.0%} at once, marking them delisted instead"
+        )
+        prune = False
+    today = time.strftime("%Y-%m-%d")
+    kept, dropped, marked, restored = [], [], 0, 0
+    for r in records:
+        if r["symbol"] in listed:
+            if r.pop("delisted_on", None):
+                restored += 1
+            kept.append(r)
+        elif not complete:
+            kept.append(r)
+        elif prune:
+            dropped.append(r["symbol"])
+        else:
+            if not r.get("delisted_on"):
+                r["delisted_on"] = today
+                r["portfolio_weight"] = 0.0
+                marked += 1
+            kept.append(r)
+
+    if dropped and STORE is not None:
+        STORE.delete(dropped)
+    if dropped or marked or restored:
+        print(
+            f"Universe: {len(dropped)} pruned, {marked} marked delisted, "
+            f"{restored} re-listed (vs {STOCK_LIST_FILE})"
+        )
+    return kept
+
+
+def _record_history(results: list[dict]) -> None:
+    """Appends today's scores/values/weights to the columnar history store."""
+    from scoreHistory import append_snapshot  # numpy
 
     try:
-        raw = getStockData(symbol)
-        if not raw:
-            return None
+        with METRICS.timer("history_seconds"):
+            path = append_snapshot(results)
+        print(f"  History snapshot → {path}")
+    except OSError as e:
+        print(f"  [WARN] Could not write history snapshot: {e}")
 
-        processed = getRatios(raw)
-        if not processed:
-            return None
 
-        ai = get_ai_analysis(symbol)
+def _report_changes(baseline: dict, records: list[dict], failed: dict[str, str] | None = None) -> None:
+    """Writes and prints the run diff of `records` against the `baseline` snapshot."""
+    try:
+        with METRICS.timer("diff_seconds"):
+            changes = write_report(
+                iter_changes(baseline, ((r["symbol"], snapshot_row(r)) for r in records), failed)
+            )
+    except OSError as e:
+        print(f"  [WARN] Could not write run diff: {e}")
+        return
+    print_report(changes)
+
 
-        # Merge AI qualitative scores into the scores dict
-        scores = processed["scores"]
-        scores["moat_score"] = (ai.get("customer_satisfaction", 50) + ai.get("moat", 50)) / 2
-        scores["tailwind_score"] = ai.get("tailwind", 50)
-        scores["management_score"] = ai.get("management_quality", 50)
+def _report_risk(records: list[dict]) -> None:
+    """Prints the portfolio's volatility and risk contributions when a price history exists."""
+    from riskModel import PRICE_HISTORY_FILE, load_model  # numpy
 
-        processed["final_score"] = calculate_weighted_score(scores)
+    weights = {r["symbol"]: r.get("portfolio_weight") or 0 for r in records}
+    if not os.path.exists(PRICE_HISTORY_FILE) or not any(weights.values()):
+        return
+    try:
+        with METRICS.timer("risk_seconds"):
+            risk = load_model().portfolio_risk(weights)
+    except (OSError, ValueError) as e:
+        print(f"  [WARN] Could not update risk model: {e}")
+        return
+    contributions = risk["contributions"]
+    if not contributions:
+        print(f"  Risk: not enough price history yet ({risk['days']} days in {PRICE_HISTORY_FILE})")
+        return
+
+    print(
+        f"  Risk: annualized volatility {risk['volatility']:.1%} over {risk['covered_weight']:.1%} "
+        f"of the weight ({risk['days']} days to {risk['as_of']}, shrinkage {risk['shrinkage']:.2f})"
+    )
+    sectors: dict[str, list[float]] = {}
+    for r in records:
+        if r["symbol"] in contributions:
+            share = sectors.setdefault(r.get("Broad Sector") or OTHER_BROAD_SECTOR, [0.0, 0.0])
+            share[0] += weights[r["symbol"]]
+            share[1] += contributions[r["symbol"]]
+    for sector, (weight, share) in sorted(sectors.items(), key=lambda kv: -kv[1][1])[:5]:
+        print(f"    {sector:<28} weight {weight:6.1%}   risk {share:6.1%}")
+    top = sorted(contributions.items(), key=lambda kv: -kv[1])[:5]
+    print("    top risk: " + ", ".join(f"{s} {c:.1%}" for s, c in top))
+    if risk["uncovered"]:
+        print(f"    no price history: {len(risk['uncovered'])} held names")
+
+
+# ── Per-stock Processing ─────────────────────────────────────────────────────
+
+def _process_stock(symbol: str, previous: dict | None = None) -> tuple[dict | None, str | None]:
+    """
+    Fetches, processes, and scores a single stock. Returns (record, None), or
+    (None, reason) on failure with a negativeCache reason code.
+
+    When a previous record is given, the page is fetched conditionally and
+    that record is returned as-is if the page has not changed.
+    """
+    from aiAnalysis import get_ai_analysis
+    from parsePool import PARSE_POOL, parse_and_score
+    from stockFetch import NOT_MODIFIED, FetchError, fetch_page
+
+    try:
+        sleep(random.uniform(*PROCESS_DELAY), "delay")  # Polite rate-limit buffer
+        print(f"  Analysing {symbol}...")
+        try:
+            html = fetch_page(symbol, conditional=previous is not None)
+        except FetchError as e:
+            METRICS.inc("stock_failures_total", stage="fetch")
+            print(f"  [FETCH ERROR] {symbol}: {e}")
+            return None, e.reason
+        if html is NOT_MODIFIED:
+            METRICS.inc("stocks_total", outcome="unchanged")
+            return previous, None
+
+        # Parse + getRatios run in the process pool; only the record comes back
+        try:
+            processed, parse_s, ratios_s = PARSE_POOL.run(parse_and_score, symbol, html)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            METRICS.inc("stock_failures_total", stage="parse")
+            print(f"  [PARSE ERROR] {symbol}: {e}")
+            return None, "parse_error"
+        METRICS.observe("parse_seconds", parse_s)
+        METRICS.observe("ratios_seconds", ratios_s)
+        if not processed:
+            METRICS.inc("stock_failures_total", stage="ratios")
+            return None, "no_data"
+
+        with PROFILER.stage("ai"):
+            ai = get_ai_analysis(symbol)
+
+        # Merge AI qualitative scores; the derived-field graph fills final_score
+        update_record(processed, {
+            "scores.moat_score": (ai.get("customer_satisfaction", 50) + ai.get("moat", 50)) / 2,
+            "scores.tailwind_score": ai.get("tailwind", 50),
+            "scores.management_score": ai.get("management_quality", 50),
+        })
         processed["ai_notes"] = ai.get("notes", "")
 
-        return processed
+        METRICS.inc("stocks_total", outcome="processed")
+        return StockRecord.from_dict(processed), None
 
+    except DeadlineExceeded as e:
+        METRICS.inc("stock_failures_total", stage="deadline")
+        print(f"  [DEADLINE] {symbol}: {e}")
+        return None, "deadline"
     except Exception as e:
+        METRICS.inc("stock_failures_total", stage="exception")
         print(f"  [ERROR] {symbol}: {e}")
-        return None
+        return None, "error"
+
+
+def _report_metrics(path: str = METRICS_FILE, limits: bool = True) -> None:
+    """Writes metrics.prom and prints the end-of-run summary."""
+    try:
+        METRICS.write_prometheus(path)
+    except OSError as e:
+        print(f"  [WARN] Could not write {path}: {e}")
+    print("-" * 60)
+    print("  Run metrics")
+    print(METRICS.summary() or "  (none recorded)")
+    if limits:
+        print(f"  {FETCH_LIMIT.describe()}; {AI_LIMIT.describe()}")
+    if PROFILER.enabled:
+        print("-" * 60)
+        print("  Stage profile")
+        print(PROFILER.report())
 
 
 # ── Portfolio Rebalance ──────────────────────────────────────────────────────
 
-def _rebalance(results: list[dict]) -> list[dict]:
-    """Reassigns portfolio weights and broad sectors to all results."""
+def _sector_score(valid: list[dict], changed: list[dict] | None = None) -> None:
+    """
+    Refreshes sector_scores / sector_final_score over the live records; with
+    `changed` (old and new versions of the committed records) only their peer
+    groups are re-ranked.
+    """
+    from sectorScoring import apply_sector_scores, dirty_labels
+
+    live = [r for r in valid if not r.get("delisted_on")]
+    dirty = None if changed is None else dirty_labels(*changed)
+    with METRICS.timer("sector_score_seconds"):
+        apply_sector_scores(live, dirty)
+
+
+def _rebalanced_fields(r: dict) -> tuple:
+    """The fields _rebalance rewrites, to find the rows a commit touched."""
+    return (
+        r.get("portfolio_weight"), r.get("Broad Sector"),
+        r.get("sector_final_score"), r.get("sector_scores"),
+    )
+
+
+def _rebalance(results: list[dict], changed: list[dict] | None = None) -> list[dict]:
+    """
+    Reassigns portfolio weights and broad sectors to all results. `changed`
+    limits sector re-ranking (--scoring sector) to the peer groups it touches.
+    """
     valid = [r for r in results if "final_score" in r]
 
     # Assign broad sector classification
     for r in valid:
         r["Broad Sector"] = get_broad_sector(r.get("Sector", "Other"))
 
+    score_key = "final_score"
+    if SCORING == "sector":
+        _sector_score(valid, changed)
+        score_key = "sector_final_score"
+
     # Reset weights, then assign from optimizer
     for r in valid:
         r["portfolio_weight"] = 0.0
 
     try:
-        for alloc in allocate_portfolio(valid):
-            match = next((r for r in valid if r["symbol"] == alloc["symbol"]), None)
+        by_symbol = {r["symbol"]: r for r in valid}
+        for alloc in allocate_portfolio(valid, score_key):
+            match = by_symbol.get(alloc["symbol"])
             if match:
                 match["portfolio_weight"] = alloc["final_weight"]
     except Exception as e:
@@ -118,65 +450,542 @@ def _rebalance(results: list[dict]) -> list[dict]:
     return valid
 
 
-# ── Main ─────────────────────────────────────────────────────────────────────
+def _rebalance_and_save(records: list[dict]) -> list[dict]:
+    """Rebalances, saves and records the history snapshot; returns the saved list."""
+    with METRICS.timer("rebalance_seconds"), PROFILER.stage("rebalance"):
+        final = _rebalance(records)
+    with METRICS.timer("save_seconds"), PROFILER.stage("save"):
+        _save(final)
+    _record_history(final)
+    return final
 
-def main() -> None:
-    print("=" * 60)
-    print("  Quant Stock Analysis Pipeline")
-    print("=" * 60)
 
+# ── Sharding ─────────────────────────────────────────────────────────────────
+
+def _parse_shard(spec: str) -> tuple[int, int]:
+    """Parses "i/N" into (index, count), validating 0 <= i < N."""
     try:
-        with open(STOCK_LIST_FILE) as f:
-            all_symbols: list[str] = json.load(f)
-    except FileNotFoundError:
+        index, count = (int(p) for p in spec.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, got {spec!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must satisfy 0 <= i < N, got {spec!r}")
+    return index, count
+
+
+def shard_of(symbol: str, count: int) -> int:
+    """Hash-stable shard assignment (unlike hash(), crc32 is not salted per process)."""
+    return zlib.crc32(symbol.encode("utf-8")) % count
+
+
+def _shard_path(index: int, count: int, kind: str = "stockData", ext: str = "json") -> str:
+    return os.path.join(SHARD_DIR, f"{kind}.shard-{index}-of-{count}.{ext}")
+
+
+def merge_shards(count: int, prune: bool = False, full_list: bool = False) -> list[dict]:
+    """
+    Folds every shard file for an N-way split over the existing stockData.json
+    (shard records win), then rebalances once and writes the usual outputs.
+    Symbols are sorted before rebalancing so the merge is order-independent.
+    """
+    merged = {r["symbol"]: r for r in _load_existing()}
+    found = 0
+    for index in range(count):
+        path = _shard_path(index, count)
+        if not os.path.exists(path):
+            print(f"  [WARN] Missing shard output: {path}")
+            continue
+        found += 1
+        records = _load_existing(path)
+        merged.update((r["symbol"], r) for r in records)
+        print(f"  Shard {index}/{count}: {len(records)} records")
+
+    stray = set(glob.glob(os.path.join(SHARD_DIR, "stockData.shard-*.json")))
+    stray -= {_shard_path(i, count) for i in range(count)}
+    if stray:
+        print(f"  [WARN] Ignoring outputs from other shard counts: {sorted(stray)}")
+
+    ordered = [merged[s] for s in sorted(merged)]
+    universe = _load_universe()
+    if universe is not None:
+        ordered = _reconcile_universe(ordered, universe, prune, full_list)
+    final = _rebalance_and_save(ordered)
+    print(f"  Merged {found}/{count} shards → {len(final)} stocks in universe.")
+    return final
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+def _build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--store",
+        choices=("json", "sqlite"),
+        default="json",
+        help=f"Result backend: rewrite {DATA_FILE} per commit, or upsert into {STORE_FILE}",
+    )
+    common.add_argument(
+        "--prune-delisted",
+        action="store_true",
+        help=f"Delete records for symbols no longer in {STOCK_LIST_FILE} (default: mark them)",
+    )
+    common.add_argument(
+        "--full-list",
+        action="store_true",
+        help=f"Treat {STOCK_LIST_FILE} as the full exchange list even if {STOCK_LIST_META_FILE} "
+        "does not say so (enables delisting)",
+    )
+    common.add_argument(
+        "--scoring",
+        choices=("absolute", "sector"),
+        default="absolute",
+        help="Allocate on final_score, or on percentiles within each sector (sectorScoring)",
+    )
+
+    parser = argparse.ArgumentParser(description="Quant Stock Analysis Pipeline")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+    fetch = commands.add_parser(
+        "fetch", parents=[common], help="Fetch, score and allocate pending symbols (default)"
+    )
+    fetch.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-check already-processed symbols (unchanged pages are reused)",
+    )
+    fetch.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile each stage (cProfile + tracemalloc) and write a hotspot report",
+    )
+    fetch.add_argument("--profile-dir", default="profiles", help="Output directory for --profile")
+    fetch.add_argument("--profile-top", type=int, default=25, help="Hotspots listed per stage")
+    fetch.add_argument(
+        "--parse-workers",
+        type=int,
+        default=None,
+        help="Parser processes (default $PARSE_WORKERS or one per core; 0 = parse in worker threads)",
+    )
+    fetch.add_argument(
+        "--shard",
+        type=_parse_shard,
+        metavar="i/N",
+        help="Process only symbols with crc32(symbol) %% N == i, writing per-shard outputs",
+    )
+    fetch.add_argument(
+        "--merge",
+        type=int,
+        metavar="N",
+        help="Merge the outputs of an N-way sharded run, rebalance and save",
+    )
+    fetch.add_argument(
+        "--order",
+        choices=("priority", "alpha"),
+        default="priority",
+        help="Work order for pending symbols (default: expected portfolio impact first)",
+    )
+    fetch.add_argument(
+        "--early-stop",
+        action="store_true",
+        help=f"Stop once the top-{MAX_PORTFOLIO} weights stop changing",
+    )
+    fetch.add_argument(
+        "--stop-tolerance",
+        type=float,
+        default=0.01,
+        help="Max one-way weight turnover per commit that counts as stable (default 0.01)",
+    )
+    fetch.add_argument(
+        "--stop-patience",
+        type=int,
+        default=25,
+        help="Consecutive stable re-scored commits required for --early-stop (default 25)",
+    )
+    fetch.add_argument(
+        "--symbol-deadline",
+        type=float,
+        default=SYMBOL_DEADLINE,
+        help=f"Seconds one symbol may take across all stages (default {SYMBOL_DEADLINE:g}; 0 = none)",
+    )
+    fetch.add_argument(
+        "--time-budget",
+        type=float,
+        default=None,
+        help="Minutes for the whole run; then no new symbols start (default: unlimited)",
+    )
+    fetch.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help=f"Ignore {NEGATIVE_CACHE_FILE} retry times and attempt every pending symbol",
+    )
+    commands.add_parser(
+        "rebalance", parents=[common], help="Re-run the allocation over the stored records (offline)"
+    )
+    commands.add_parser(
+        "rescore",
+        parents=[common],
+        help="Recompute derived fields and final scores from stored inputs, then rebalance (offline)",
+    )
+    revalue = commands.add_parser(
+        "revalue",
+        parents=[common],
+        help="Move prices / market caps to a bhavcopy's closes, rescore and rebalance (offline)",
+    )
+    revalue.add_argument("bhavcopy", help="NSE bhavcopy CSV (CM, full bhavdata or UDiFF layout)")
+    revalue.add_argument(
+        "--series",
+        default="EQ",
+        help="Comma-separated series to take closes from, in order of preference (default EQ)",
+    )
+    commands.add_parser(
+        "export",
+        parents=[common],
+        help=f"Rewrite the dashboard slices (and {DATA_FILE} from --store sqlite) (offline)",
+    )
+    commands.add_parser(
+        "patch", add_help=False, help="Fill names and re-scrape zero D/E (see: main.py patch --help)"
+    )
+    commands.add_parser(
+        "serve", add_help=False, help="Local in-memory JSON query service (see: main.py serve --help)"
+    )
+    commands.add_parser(
+        "diff", add_help=False, help="Change report between two runs (see: main.py diff --help)"
+    )
+    return parser
+
+
+# ── Fetch Pipeline ───────────────────────────────────────────────────────────
+
+def _cmd_fetch(args: argparse.Namespace) -> None:
+    from parsePool import PARSE_POOL, DEFAULT_WORKERS as DEFAULT_PARSE_WORKERS
+    from stockFetch import commit_fetch, discard_fetch, save_fetch_cache, use_fetch_cache
+
+    budget = RunBudget(args.time_budget * 60 if args.time_budget else None)
+    if args.profile:
+        PROFILER.enable(args.profile_dir, args.profile_top)
+
+    if args.merge:
+        merge_shards(args.merge, args.prune_delisted, args.full_list)
+        _report_metrics(limits=False)
+        return
+
+    all_symbols = _load_universe()
+    if all_symbols is None:
         print(f"Stock list not found: {STOCK_LIST_FILE}")
         print("Run:  python updateStockList.py")
         return
-
-    existing = _load_existing()
-    processed_symbols = {r["symbol"] for r in existing}
-    pending = [s for s in all_symbols if s not in processed_symbols]
+    universe = list(all_symbols)
+
+    shard_file = None
+    metrics_file = METRICS_FILE
+    failures_file = NEGATIVE_CACHE_FILE
+    if args.shard:
+        index, count = args.shard
+        all_symbols = [s for s in all_symbols if shard_of(s, count) == index]
+        os.makedirs(SHARD_DIR, exist_ok=True)
+        shard_file = _shard_path(index, count)
+        metrics_file = _shard_path(index, count, "metrics", "prom")
+        use_fetch_cache(_shard_path(index, count, "fetchCache"))
+        failures_file = _shard_path(index, count, "failureCache")
+        print(f"Shard {index}/{count}: {len(all_symbols)} symbols → {shard_file}")
+
+    existing = _load_existing(shard_file)
+    baseline = snapshot_records(existing)  # Before reconciling, so pruned symbols show as removed
+    if not shard_file:
+        existing = _reconcile_universe(existing, universe, args.prune_delisted, args.full_list)
+    if shard_file:
+        # Symbols already in the last merged run count as done for this shard
+        known = {r["symbol"]: r for r in _load_existing()}
+        mine = {r["symbol"] for r in existing}
+        existing += [known[s] for s in all_symbols if s in known and s not in mine]
+    previous = {r["symbol"]: r for r in existing}
+    processed_symbols = STORE.symbols() if STORE and not shard_file else set(previous)
+    if args.refresh:
+        pending = list(all_symbols)
+    else:
+        pending = [s for s in all_symbols if s not in processed_symbols]
+    failures = NegativeCache(failures_file)
+    held = {}
+    if not args.retry_failed:
+        pending, held = failures.split(pending)
+        if held:
+            reasons = ", ".join(f"{r}: {n}" for r, n in sorted(held.items()))
+            print(f"Negative cache:   {sum(held.values())} held back until retry time ({reasons})")
+    if args.order == "priority":
+        pending = order_pending(pending, previous)
+
+    if not pending and shard_file:
+        print("Shard already complete. Run --merge to combine shards.")
+        return
 
     if not pending:
-        print("All stocks already processed. Re-balancing portfolio...")
-        final = _rebalance(existing)
-        _save(final)
+        if held:
+            print("No symbols due (the rest are in failure backoff). Re-balancing portfolio...")
+        else:
+            print("All stocks already processed. Re-balancing portfolio...")
+        final = _rebalance_and_save(existing)
+        _report_changes(baseline, final)
+        _report_risk(final)
+        _report_metrics()
         print(f"Done. {len(final)} stocks in universe.")
         return
 
     print(f"Total stocks:     {len(all_symbols)}")
     print(f"Already done:     {len(processed_symbols)}")
-    print(f"Remaining:        {len(pending)}")
+    print(f"Remaining:        {len(pending)}  ({args.order} order)")
     print("-" * 60)
 
     results = list(existing)  # mutable copy
+    failed: dict[str, str] = {}
+    skipped: list[str] = []  # Not attempted (or cut off) because the time budget ran out
+    symbol_deadline = args.symbol_deadline or None
+    if SCORING == "sector" and not shard_file:
+        # Per-commit rebalances only re-rank the touched peer groups
+        _sector_score([r for r in results if "final_score" in r])
     save_lock = threading.Lock()
-
-    def worker(symbol: str) -> None:
-        result = _process_stock(symbol)
+    commits = 0
+    # Shards never rebalance, so convergence is only tracked on full runs
+    monitor = (
+        ConvergenceMonitor(args.stop_tolerance, args.stop_patience)
+        if args.early_stop and not shard_file else None
+    )
+
+    def attempt(symbol: str) -> None:
+        if monitor and monitor.converged.is_set():
+            METRICS.inc("stocks_skipped_total")
+            return
+        if budget.expired():
+            METRICS.inc("stocks_skipped_total")
+            skipped.append(symbol)
+            return
+        prior = previous.get(symbol)
+        with METRICS.timer("stock_seconds"), deadline(budget.cap(symbol_deadline)):
+            result, reason = _process_stock(symbol, prior)
+        if reason == "deadline" and budget.expired():
+            # Cut off by the run budget, not by its own deadline: no failure entry
+            METRICS.inc("stocks_skipped_total")
+            skipped.append(symbol)
+            return
+        # Failure bookkeeping stays outside save_lock: a failed symbol is
+        # retried on a later run, not slept on while other commits wait
+        if reason:
+            entry = failures.record_failure(symbol, reason)
+            failed[symbol] = reason
+        else:
+            failures.clear(symbol)
+        nonlocal commits
+        wait_start = time.perf_counter()
         with save_lock:
-            if result:
+            METRICS.observe("lock_wait_seconds", time.perf_counter() - wait_start)
+            if result is not None and result is prior:
+                print(f"  = {symbol} | unchanged, reusing stored record")
+                commit_fetch(symbol)
+                save_fetch_cache()  # Not re-scored: says nothing about convergence
+            elif result and shard_file:
+                # Shards only persist records; weights are assigned at merge time
+                results[:] = [r for r in results if r["symbol"] != symbol]
                 results.append(result)
                 print(f"  ✓ {symbol} | Score: {result.get('final_score')}")
-                balanced = _rebalance(results)
-                _save(balanced)
+                with METRICS.timer("save_seconds"), PROFILER.stage("save"):
+                    _save(results, shard_file, mirror=False)
+                commit_fetch(symbol)
+                save_fetch_cache()
+            elif result:
+                results[:] = [r for r in results if r["symbol"] != symbol]
+                results.append(result)
+                print(f"  ✓ {symbol} | Score: {result.get('final_score')}")
+                before = {r["symbol"]: _rebalanced_fields(r) for r in results}
+                with METRICS.timer("rebalance_seconds"), PROFILER.stage("rebalance"):
+                    balanced = _rebalance(results, [r for r in (prior, result) if r])
+                commits += 1
+                # The first commit compares every row: it also carries what
+                # changed before the loop (reconcile, initial sector scores)
+                dirty = None if commits == 1 else {symbol} | {
+                    r["symbol"] for r in balanced if before.get(r["symbol"]) != _rebalanced_fields(r)
+                }
+                with METRICS.timer("save_seconds"), PROFILER.stage("save"):
+                    _save(balanced, export=commits % EXPORT_EVERY == 0, dirty=dirty)
+                commit_fetch(symbol)
+                save_fetch_cache()
                 # Reflect rebalanced weights back into results list
                 results.clear()
                 results.extend(balanced)
+                if monitor:
+                    monitor.observe(balanced)
             else:
-                print(f"  ✗ {symbol} – skipped")
-                time.sleep(random.uniform(8, 15))  # Extra backoff on failure
+                print(
+                    f"  ✗ {symbol} – {reason} (failure {entry['failures']}, "
+                    f"retry after {entry['retry_at']})"
+                )
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
-        futures = {pool.submit(worker, s): s for s in pending}
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as exc:
-                print(f"  [THREAD ERROR] {futures[future]}: {exc}")
+    def worker(symbol: str) -> None:
+        # Fetched validators only reach fetchCache.json with a saved record;
+        # otherwise the next --refresh would take the stale record as unchanged
+        try:
+            attempt(symbol)
+        finally:
+            discard_fetch(symbol)
+
+    # Profiles are only collected in-process, so --profile parses inline by default
+    parse_workers = args.parse_workers
+    if parse_workers is None:
+        parse_workers = 0 if args.profile else DEFAULT_PARSE_WORKERS
+    PARSE_POOL.start(parse_workers)
+
+    stopped = budget_spent = False
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = {pool.submit(worker, s): s for s in pending}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                try:
+                    future.result()
+                except Exception as exc:
+                    print(f"  [THREAD ERROR] {futures[future]}: {exc}")
+                if monitor and monitor.converged.is_set() and not stopped:
+                    stopped = True
+                    METRICS.inc("stocks_skipped_total", sum(f.cancel() for f in futures))
+                    print(
+                        f"  Converged: top-{MAX_PORTFOLIO} weights moved ≤ {args.stop_tolerance:.2%} "
+                        f"for {args.stop_patience} commits; skipping the remaining symbols."
+                    )
+                if budget.expired() and not budget_spent:
+                    budget_spent = True
+                    cancelled = [futures[f] for f in futures if f.cancel()]
+                    skipped.extend(cancelled)
+                    METRICS.inc("stocks_skipped_total", len(cancelled))
+                    print(
+                        f"  Time budget of {args.time_budget:g} min spent; starting no new "
+                        f"symbols ({len(cancelled)} queued ones cancelled)."
+                    )
+    finally:
+        PARSE_POOL.shutdown()
+
+    if STORE is not None and not shard_file and commits % EXPORT_EVERY:
+        with METRICS.timer("save_seconds"), PROFILER.stage("save"):
+            _save(results)  # final JSON + dashboard export
+    if not shard_file:
+        _record_history(results)
+        _report_changes(baseline, results, failed)
+        _report_risk(results)
+
+    _report_metrics(metrics_file)
+    print("=" * 60)
+    if skipped:
+        shown = ", ".join(sorted(skipped)[:20]) + (f" … (+{len(skipped) - 20} more)" if len(skipped) > 20 else "")
+        print(f"Time budget: {len(skipped)} symbols skipped, left pending for the next run: {shown}")
+    if shard_file:
+        print(f"Shard complete. {len(results)} stocks in {shard_file}.")
+        print(f"When all shards finish:  python main.py --merge {args.shard[1]}")
+    elif stopped or budget_spent:
+        total = METRICS.counter_value("stocks_skipped_total")
+        print(f"Pipeline stopped early: {len(results)} stocks in universe, {total:g} skipped.")
+    else:
+        print(f"Pipeline complete. {len(results)} stocks in universe.")
+
+
+# ── Offline Commands ─────────────────────────────────────────────────────────
+
+def _cmd_rebalance(
+    args: argparse.Namespace,
+    records: list[StockRecord] | None = None,
+    baseline: dict | None = None,
+) -> None:
+    if records is None:
+        records = _load_existing()
+    if baseline is None:
+        baseline = snapshot_records(records)
+    universe = _load_universe()
+    if universe is not None:
+        records = _reconcile_universe(records, universe, args.prune_delisted, args.full_list)
+    final = _rebalance_and_save(records)
+    _report_changes(baseline, final)
+    _report_risk(final)
+    _report_metrics(limits=False)
+    print(f"Done. {len(final)} stocks in universe.")
+
+
+def _cmd_rescore(args: argparse.Namespace) -> None:
+    records = _load_existing()
+    baseline = snapshot_records(records)
+    with METRICS.timer("rescore_seconds"):
+        changed = sum(1 for r in records if recompute_all(r))
+    print(f"Rescored {len(records)} records from stored inputs ({changed} changed).")
+    _cmd_rebalance(args, records, baseline)
+
+
+def _cmd_revalue(args: argparse.Namespace) -> None:
+    from priceRevalue import read_bhavcopy, revalue  # numpy
 
+    try:
+        prices, trade_date = read_bhavcopy(args.bhavcopy, tuple(args.series.split(",")))
+    except (OSError, ValueError) as e:
+        print(f"Cannot read bhavcopy: {e}")
+        return
+    records = _load_existing()
+    baseline = snapshot_records(records)
+    with METRICS.timer("revalue_seconds"):
+        changed, missing = revalue(records, prices, trade_date)
+    if trade_date:
+        from riskModel import PRICE_HISTORY_FILE, append_prices
+
+        try:
+            append_prices(trade_date, prices)
+        except OSError as e:
+            print(f"  [WARN] Could not append to {PRICE_HISTORY_FILE}: {e}")
+    print(
+        f"Revalued {len(records) - len(missing)} records to the {trade_date or args.bhavcopy} closes "
+        f"({len(changed)} changed, {len(missing)} without a price kept as stored)."
+    )
+    _cmd_rebalance(args, records, baseline)
+
+
+def _cmd_export(args: argparse.Namespace) -> None:
+    records = _load_existing()
+    if STORE is not None:
+        write_records(DATA_FILE, records)
+    export_views(records)
+    print(f"Exported {len(records)} records.")
+
+
+_COMMANDS = {
+    "fetch": _cmd_fetch,
+    "rebalance": _cmd_rebalance,
+    "rescore": _cmd_rescore,
+    "revalue": _cmd_revalue,
+    "export": _cmd_export,
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "fetch")  # Flags-only invocations predate the subcommands
+    if argv[0] == "patch":
+        from patch_stockdata import main as patch_main
+
+        patch_main(argv[1:])
+        return
+    if argv[0] == "serve":
+        from queryService import main as serve_main
+
+        serve_main(argv[1:])
+        return
+    if argv[0] == "diff":
+        from runDiff import main as diff_main
+
+        diff_main(argv[1:])
+        return
+    args = _build_parser().parse_args(argv)
+    global STORE, SCORING
+    SCORING = args.scoring
+    if args.store == "sqlite":
+        STORE = open_store(STORE_FILE, seed_json=DATA_FILE)
+
+    print("=" * 60)
+    print("  Quant Stock Analysis Pipeline")
     print("=" * 60)
-    print(f"Pipeline complete. {len(results)} stocks in universe.")
+    _COMMANDS[args.command](args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+"""
+negativeCache.py
+-----------------
+Persistent record of symbols that failed, so a resume does not retry them
+immediately.
+
+failureCache.json:
+    {"SYMBOL": {"reason": "http_404", "failures": 3,
+                "last_failed": "2026-01-05T10:00:00", "retry_at": "2026-01-09T10:00:00"}}
+
+Reason codes: http_<status>, timeout, connection, retries_exhausted,
+parse_error, no_data (getRatios found no market cap / price), deadline
+(the per-symbol time limit ran out), error.
+Each consecutive failure doubles the wait before the symbol is scheduled
+again: from 30 minutes for transient host errors, from one day for
+symbol-level ones, capped at 30 days. A success removes the entry.
+"""
+
+import json
+import os
+import threading
+import time
+
+NEGATIVE_CACHE_FILE = "failureCache.json"
+
+TRANSIENT_REASONS = frozenset({
+    "timeout", "connection", "retries_exhausted", "error", "deadline",
+    "http_429", "http_500", "http_502", "http_503", "http_504",
+})
+TRANSIENT_BASE = 30 * 60
+PERMANENT_BASE = 24 * 3600
+MAX_BACKOFF = 30 * 24 * 3600
+_FMT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _parse(stamp: str) -> float:
+    try:
+        return time.mktime(time.strptime(stamp, _FMT))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class NegativeCache:
+    def __init__(self, path: str = NEGATIVE_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self._entries: dict[str, dict] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+
+    def record_failure(self, symbol: str, reason: str) -> dict:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(symbol, {})
+            failures = entry.get("failures", 0) + 1
+            base = TRANSIENT_BASE if reason in TRANSIENT_REASONS else PERMANENT_BASE
+            wait = min(MAX_BACKOFF, base * 2 ** (failures - 1))
+            entry = {
+                "reason": reason,
+                "failures": failures,
+                "last_failed": time.strftime(_FMT, time.localtime(now)),
+                "retry_at": time.strftime(_FMT, time.localtime(now + wait)),
+            }
+            self._entries[symbol] = entry
+        self.save()
+        return entry
+
+    def clear(self, symbol: str) -> None:
+        with self._lock:
+            if self._entries.pop(symbol, None) is None:
+                return
+        self.save()
+
+    def blocked(self, symbol: str, now: float | None = None) -> bool:
+        """True while the symbol's retry_at is in the future."""
+        with self._lock:
+            entry = self._entries.get(symbol)
+        return bool(entry) and _parse(entry.get("retry_at")) > (now or time.time())
+
+    def split(self, symbols: list[str]) -> tuple[list[str], dict[str, int]]:
+        """Returns (symbols due for an attempt, {reason: count} of those held back)."""
+        now = time.time()
+        due, held = [], {}
+        for s in symbols:
+            if self.blocked(s, now):
+                reason = self._entries[s]["reason"]
+                held[reason] = held.get(reason, 0) + 1
+            else:
+                due.append(s)
+        return due, held
+
+    def failed_since(self, since: float) -> dict[str, str]:
+        """{symbol: reason} for entries whose last failure is at or after `since`."""
+        with self._lock:
+            return {
+                s: e["reason"] for s, e in self._entries.items()
+                if _parse(e.get("last_failed")) >= since
+            }
+
+    def save(self) -> None:
+        with self._lock:
+            snapshot = dict(self._entries)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(snapshot, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
@@ -0,0 +1,97 @@
+"""
+parsePool.py
+-------------
+Process pool for the CPU-bound half of the pipeline.
+
+BeautifulSoup parsing is pure Python and holds the GIL, so the fetch threads
+in main.py / patch_stockdata.py cannot parse in parallel. PARSE_POOL.run()
+ships the page HTML to a worker process and returns only the compact result
+(the scored record from getRatios, or the patch tuple) – never soup objects.
+
+With workers=0 (or if the pool breaks) calls run inline in the calling thread,
+which is also what --profile uses so stage profiles stay meaningful. Workers
+are spawned rather than forked: the parent has live fetch threads and locks.
+Under a timeBudget deadline the caller stops waiting for the worker at the
+deadline (the task is cancelled if it has not started yet).
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pipelineMetrics import METRICS
+from processData import getRatios
+from stageProfiler import PROFILER
+from timeBudget import DeadlineExceeded, bounded, expired
+
+DEFAULT_WORKERS = int(os.environ.get("PARSE_WORKERS", os.cpu_count() or 1))
+
+
+def parse_and_score(symbol: str, html: str) -> tuple[dict | None, float, float]:
+    """
+    Worker entry point: parses a page and runs getRatios on it.
+
+    Returns (processed_record_or_None, parse_seconds, ratios_seconds) so the
+    parent can record timings; the raw tables never leave the worker.
+    """
+    from stockFetch import parse_page  # bs4/requests load in the workers, not at import
+
+    start = time.perf_counter()
+    with PROFILER.stage("parse"):
+        raw = parse_page(symbol, html)
+    parsed = time.perf_counter()
+    with PROFILER.stage("getRatios"):
+        processed = getRatios(raw)
+    return processed, parsed - start, time.perf_counter() - parsed
+
+
+class ParsePool:
+    """Lazily started ProcessPoolExecutor with an inline fallback."""
+
+    def __init__(self):
+        self.workers = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def start(self, workers: int = DEFAULT_WORKERS) -> None:
+        with self._lock:
+            self.workers = max(0, workers)
+            if self.workers and self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def run(self, fn, *args):
+        """Runs fn(*args) in a worker process (or inline when the pool is off)."""
+        executor = self._executor
+        if executor is None:
+            return fn(*args)
+        try:
+            future = executor.submit(fn, *args)
+            try:
+                return future.result(timeout=bounded(None, "parse"))
+            except TimeoutError as e:  # futures.TimeoutError, or DeadlineExceeded from bounded()
+                future.cancel()
+                if isinstance(e, DeadlineExceeded) or not expired():
+                    raise
+                raise DeadlineExceeded("parse") from e
+        except BrokenProcessPool:
+            print("  [WARN] Parse pool broke; falling back to in-process parsing.")
+            METRICS.inc("parse_pool_broken_total")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            return fn(*args)
+
+
+PARSE_POOL = ParsePool()
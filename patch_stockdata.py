@@ -2,78 +2,66 @@
 patch_stockdata.py
 -------------------
 One-shot patch for existing stockData.json to:
-  1. Fill Company Name from NSE official list (fast, no scraping)
+  1. Fill Company Name from NSE official list (cached CSV, no scraping)
   2. Re-scrape D/E + About for stocks with D/E == 0 (targeted scrape)
-  3. Recalculate fii_dii_de_score using corrected D/E
-  4. Recalculate final_score
-  5. Re-run portfolio allocation
-  6. Save to both output locations
+  3. Recompute the fields downstream of the corrected D/E (derivedFields graph:
+     fii_dii_de_score → final_score) for the patched records only
+  4. Re-run portfolio allocation if any allocation input changed
+  5. Save to both output locations
 
 Usage:
     python patch_stockdata.py              # Names + D/E re-scrape + recalc
     python patch_stockdata.py --names-only # Only fill missing Company Names
+    python patch_stockdata.py --profile    # Per-stage cProfile dumps + tracemalloc peaks
+    python patch_stockdata.py --store sqlite  # Read/write stockData.db instead of the JSON file
+    python patch_stockdata.py --max-age 0     # Revalidate every cached page (default: reuse <24h)
+    python patch_stockdata.py --scoring sector  # Rebalance on sector_final_score, as main.py --scoring sector
+    python main.py patch [options]            # Same, via the main CLI
+
+Pages come from stockFetch's shared session and, with SCREENER_PAGE_CACHE set,
+its page cache, so a patch right after a pipeline run re-reads cached pages
+instead of re-downloading them. Only the h1, company profile and balance-sheet
+regions are parsed.
 """
 
 import argparse
-import csv
-import io
-import json
-import random
-import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
-from bs4 import BeautifulSoup
-
-from calcEngine import calculate_weighted_score
-from portfolioOptimizer import allocate_portfolio, get_broad_sector
+from adaptiveConcurrency import FETCH_LIMIT
+from derivedFields import needs_rebalance, recompute, update_record
+from parsePool import PARSE_POOL, DEFAULT_WORKERS as DEFAULT_PARSE_WORKERS
+from portfolioOptimizer import allocate_portfolio
+from resultStore import STORE_FILE, ResultStore, open_store
+from scoreHistory import append_snapshot
+from stageProfiler import PROFILER
+from stockFetch import extract_sections, fetch_cached_page, parse_fragment, save_fetch_cache
+from stockRecord import StockRecord, load_records, write_records
+from updateStockList import nse_name_map
+from webExport import export_views
 
 DATA_FILE = "stockData.json"
-WEBSITE_DATA_FILE = "website/data/stockData.json"
-NSE_CSV_URL = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
-
-USER_AGENTS = [
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/119.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 Chrome/118.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/119.0.0.0 Safari/537.36",
-]
+DE_SECTIONS = ("name", "profile", "balance-sheet")
+PAGE_MAX_AGE = 24 * 3600  # Seconds a cached page is reused without revalidation
 
+STORE: ResultStore | None = None  # Set by --store sqlite
 
 # ── Helpers ─────────────────────────────────────────────────────────────────
 
-def _load() -> list[dict]:
-    with open(DATA_FILE) as f:
-        return json.load(f)
+def _load() -> list[StockRecord]:
+    if STORE is not None:
+        return STORE.load_all()
+    return load_records(DATA_FILE)
 
 
 def _save(data: list[dict]) -> None:
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-    try:
-        with open(WEBSITE_DATA_FILE, "w") as f:
-            json.dump(data, f, indent=4)
-    except FileNotFoundError:
-        pass
+    if STORE is not None:
+        written = STORE.upsert_many(data)
+        print(f"  Upserted {written} changed rows into {STORE_FILE}.")
+    write_records(DATA_FILE, data)
+    export_views(data)
     print(f"  Saved {len(data)} records.")
 
 
-def _get_nse_name_map() -> dict[str, str]:
-    """Fetches symbol → full company name mapping from NSE's equity list CSV."""
-    print("  Fetching NSE name list...")
-    res = requests.get(
-        NSE_CSV_URL,
-        headers={"User-Agent": USER_AGENTS[0]},
-        timeout=15,
-    )
-    res.raise_for_status()
-    reader = csv.DictReader(io.StringIO(res.content.decode("utf-8")))
-    return {
-        row["SYMBOL"].strip(): row["NAME OF COMPANY"].strip()
-        for row in reader
-        if row.get("SYMBOL")
-    }
-
-
 def _clean_float(val, default=0.0) -> float:
     try:
         return float(str(val).replace(",", "").replace("%", "").strip())
@@ -103,82 +91,61 @@ def _scrape_de_and_about(symbol: str) -> tuple[float, str, str]:
     Returns (de_ratio, about_text, company_name) from screener.in.
     Falls back gracefully on any error.
     """
-    time.sleep(random.uniform(5, 10))
-    url = f"https://www.screener.in/company/{symbol}/consolidated/"
-    headers = {"User-Agent": random.choice(USER_AGENTS)}
-
+    html = fetch_cached_page(symbol, max_age=PAGE_MAX_AGE)
+    if html is None:
+        return 0.0, "", ""
     try:
-        res = requests.get(url, headers=headers, timeout=20)
-        if res.status_code != 200:
-            return 0.0, "", ""
-
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        # Company name
-        name = ""
-        try:
-            name = soup.find("h1").text.strip()
-        except Exception:
-            pass
-
-        # About
-        about = ""
-        try:
-            prof = soup.find("div", class_="company-profile")
-            if prof:
-                raw = prof.text
-                for token in ("About", "Key Points", "Read More"):
-                    raw = raw.replace(token, "")
-                about = raw.strip()
-        except Exception:
-            pass
-
-        # D/E from balance sheet table
-        de = 0.0
-        try:
-            bs_section = soup.find("section", {"id": "balance-sheet"})
-            if bs_section:
-                rows = bs_section.find_all("tr")
-                borrowings = equity = reserves = 0.0
-                for tr in rows:
-                    cells = [td.text.strip().replace(",", "") for td in tr.find_all("td")]
-                    if not cells:
-                        continue
-                    label = cells[0].lower()
-                    values = [_clean_float(c) for c in cells[1:] if c]
-                    if not values:
-                        continue
-                    last = values[-1]
-                    if "borrowings" in label:
-                        borrowings = last
-                    elif "equity capital" in label:
-                        equity = last
-                    elif "reserves" in label:
-                        reserves = last
-
-                net_worth = equity + reserves
-                if net_worth > 0:
-                    de = round(borrowings / net_worth, 2)
-        except Exception:
-            pass
-
-        return de, about, name
-
+        with PROFILER.stage("parse"):
+            # Only the needed regions cross the process boundary
+            return PARSE_POOL.run(_parse_de_and_about, extract_sections(html, DE_SECTIONS))
     except Exception as e:
         print(f"    [SCRAPE ERROR] {symbol}: {e}")
         return 0.0, "", ""
 
 
-def fix_zero_de(data: list[dict], name_map: dict[str, str], workers: int = 5) -> int:
-    """Re-scrapes D/E for all records with D/E == 0."""
+def _parse_de_and_about(fragment: str) -> tuple[float, str, str]:
+    """Extracts (de_ratio, about_text, company_name) from the page's DE_SECTIONS regions."""
+    data = parse_fragment("", fragment, DE_SECTIONS)
+    name, about = data["Company Name"], data["About"]
+
+    # D/E from balance sheet table
+    borrowings = equity = reserves = 0.0
+    for row in data["balance_sheet"]:
+        label = row["Metric"].lower()
+        values = [_clean_float(v) for k, v in row.items() if k != "Metric" and v]
+        if not values:
+            continue
+        last = values[-1]
+        if "borrowings" in label:
+            borrowings = last
+        elif "equity capital" in label:
+            equity = last
+        elif "reserves" in label:
+            reserves = last
+
+    de = 0.0
+    net_worth = equity + reserves
+    if net_worth > 0:
+        de = round(borrowings / net_worth, 2)
+    return de, about, name
+
+
+def fix_zero_de(
+    data: list[dict], name_map: dict[str, str], workers: int = 5
+) -> dict[str, set[str]]:
+    """
+    Re-scrapes D/E for all records with D/E == 0. Dependent scores are
+    recomputed through the derivedFields graph; returns {symbol: changed fields}.
+    Requests in flight are capped by FETCH_LIMIT, not by `workers`.
+    """
     targets = [r for r in data if r.get("D/E", 0) == 0]
     if not targets:
         print("  No zero D/E records found.")
-        return 0
+        return {}
 
     print(f"  Re-scraping D/E + About for {len(targets)} zero-D/E stocks...")
     index = {r["symbol"]: r for r in data}
-    changed = 0
+    changed: dict[str, set[str]] = {}
 
     def worker(rec):
         sym = rec["symbol"]
@@ -186,13 +153,6 @@ def fix_zero_de(data: list[dict], name_map: dict[str, str], workers: int = 5) ->
         updates = {}
         if de > 0:
             updates["D/E"] = de
-            # Recalculate fii_dii_de_score
-            fii = rec.get("FII (%)", 0)
-            dii = rec.get("DII (%)", 0)
-            de_score = max(0.0, 100.0 - de * 50)
-            fii_dii_score = min(100.0, fii + dii)
-            updates["scores"] = dict(rec.get("scores", {}))
-            updates["scores"]["fii_dii_de_score"] = round((de_score + fii_dii_score) / 2, 4)
         if about and about != "N/A":
             updates["About"] = about
         if scraped_name and scraped_name != sym and rec.get("Company Name", sym) == sym:
@@ -207,10 +167,10 @@ def fix_zero_de(data: list[dict], name_map: dict[str, str], workers: int = 5) ->
         for i, future in enumerate(as_completed(futures)):
             sym, updates = future.result()
             if updates:
-                rec = index[sym]
-                rec.update(updates)
+                fields = update_record(index[sym], updates)
+                if fields:
+                    changed[sym] = fields
                 if "D/E" in updates:
-                    changed += 1
                     print(f"    [{i+1}/{len(targets)}] {sym} → D/E={updates['D/E']}")
                 else:
                     print(f"    [{i+1}/{len(targets)}] {sym} → D/E still 0 (debt-free?)")
@@ -222,20 +182,49 @@ def fix_zero_de(data: list[dict], name_map: dict[str, str], workers: int = 5) ->
 
 # ── 3. Recalculate Scores + Rebalance Portfolio ──────────────────────────────
 
-def recalculate_and_rebalance(data: list[dict]) -> list[dict]:
-    """Recomputes final_score from existing sub-scores and re-runs allocation."""
-    print("  Recalculating scores and rebalancing portfolio...")
+_FULL_RECALC = {
+    "scores.dcf_score", "scores.growth_score", "scores.roce_score", "scores.moat_score",
+    "scores.fii_dii_de_score", "scores.tailwind_score", "scores.management_score", "Sector",
+}
+
+
+def recalculate_and_rebalance(
+    data: list[dict], changed: dict[str, set[str]] | None = None, scoring: str = "absolute"
+) -> list[dict]:
+    """
+    Re-runs allocation after a patch. `changed` ({symbol: fields} from
+    update_record) means those records are already recomputed and the
+    universe is only rebalanced if an allocation input moved; without it,
+    final_score and Broad Sector are recomputed for every record first.
+    scoring="sector" allocates on sector_final_score like main.py --scoring
+    sector, re-ranking the peer groups of the changed records first.
+    """
+    if changed is None:
+        print("  Recalculating scores and rebalancing portfolio...")
+        for rec in data:
+            recompute(rec, _FULL_RECALC, forced=True)
+    elif not any(needs_rebalance(fields) for fields in changed.values()):
+        print(f"  {len(changed)} records changed; no allocation inputs moved, keeping weights.")
+        return data
+    else:
+        print(f"  {len(changed)} records recomputed; rebalancing portfolio...")
 
     for rec in data:
-        scores = rec.get("scores", {})
-        rec["final_score"] = calculate_weighted_score(scores)
-        rec["Broad Sector"] = get_broad_sector(rec.get("Sector", "Other"))
         rec["portfolio_weight"] = 0.0
 
+    score_key = "final_score"
+    if scoring == "sector":
+        from sectorScoring import SCORE_KEY, apply_sector_scores, dirty_labels  # numpy
+
+        live = [r for r in data if "final_score" in r and not r.get("delisted_on")]
+        patched = [r for r in live if changed is not None and r["symbol"] in changed]
+        apply_sector_scores(live, None if changed is None else dirty_labels(*patched))
+        score_key = SCORE_KEY
+
     data.sort(key=lambda x: x.get("final_score", 0), reverse=True)
 
     try:
-        allocs = allocate_portfolio(data)
+        allocs = allocate_portfolio(data, score_key)
         alloc_map = {a["symbol"]: a["final_weight"] for a in allocs}
         for rec in data:
             rec["portfolio_weight"] = alloc_map.get(rec["symbol"], 0.0)
@@ -247,15 +236,49 @@ def recalculate_and_rebalance(data: list[dict]) -> list[dict]:
 
 # ── Main ─────────────────────────────────────────────────────────────────────
 
-def main():
+def main(argv: list[str] | None = None) -> None:
+    global PAGE_MAX_AGE
     parser = argparse.ArgumentParser()
     parser.add_argument("--names-only", action="store_true", help="Only fill missing Company Names")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile each stage (cProfile + tracemalloc) and write a hotspot report",
+    )
+    parser.add_argument("--profile-dir", default="profiles", help="Output directory for --profile")
+    parser.add_argument("--profile-top", type=int, default=25, help="Hotspots listed per stage")
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=None,
+        help=f"Parser processes (default {DEFAULT_PARSE_WORKERS}; 0 = parse in worker threads)",
+    )
+    parser.add_argument("--store", choices=("json", "sqlite"), default="json", help="Result backend")
+    parser.add_argument(
+        "--scoring",
+        choices=("absolute", "sector"),
+        default="absolute",
+        help="Allocate on final_score, or on percentiles within each sector (sectorScoring)",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=PAGE_MAX_AGE / 3600,
+        help="Hours a cached page is reused without revalidation",
+    )
+    args = parser.parse_args(argv)
+    PAGE_MAX_AGE = args.max_age * 3600
+    if args.profile:
+        PROFILER.enable(args.profile_dir, args.profile_top)
+    if args.store == "sqlite":
+        global STORE
+        STORE = open_store(STORE_FILE, seed_json=DATA_FILE)
 
     data = _load()
     print(f"Loaded {len(data)} records from {DATA_FILE}\n")
 
-    name_map = _get_nse_name_map()
+    print("  Loading NSE name list...")
+    name_map = nse_name_map()
 
     # Step 1: Fill names
     n = fill_company_names(data, name_map)
@@ -263,13 +286,27 @@ def main():
 
     if not args.names_only:
         # Step 2: Fix D/E
-        changed = fix_zero_de(data, name_map, workers=5)
-        print(f"\n  Fixed D/E for {changed} records.\n")
-
-        # Step 3: Recalculate scores + rebalance
-        data = recalculate_and_rebalance(data)
-
-    _save(data)
+        parse_workers = args.parse_workers
+        if parse_workers is None:
+            parse_workers = 0 if args.profile else DEFAULT_PARSE_WORKERS
+        PARSE_POOL.start(parse_workers)
+        try:
+            changed = fix_zero_de(data, name_map, workers=FETCH_LIMIT.maximum)
+        finally:
+            PARSE_POOL.shutdown()
+            save_fetch_cache()
+        fixed = sum("D/E" in fields for fields in changed.values())
+        print(f"\n  Fixed D/E for {fixed} records.\n")
+
+        # Step 3: Rebalance (dependent scores were recomputed per record)
+        with PROFILER.stage("rebalance"):
+            data = recalculate_and_rebalance(data, changed, args.scoring)
+
+    with PROFILER.stage("save"):
+        _save(data)
+    print(f"  History snapshot → {append_snapshot(data)}")
+    if PROFILER.enabled:
+        print(PROFILER.report())
     print("\nDone.")
 
 
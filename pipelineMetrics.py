@@ -0,0 +1,175 @@
+"""
+pipelineMetrics.py
+-------------------
+Thread-safe counters and histograms for pipeline runs.
+
+Every stage records into the shared METRICS registry:
+    fetch_seconds, fetch_http_total{status}, fetch_retries_total,
+    fetch_rate_limited_total, fetch_not_modified_total, parse_seconds,
+    ai_seconds, ai_requests_total{source}, lock_wait_seconds, save_seconds,
+    stock_failures_total{stage} ...
+
+At the end of a run the registry is exported in Prometheus text format
+(metrics.prom, readable by node_exporter's textfile collector) and a short
+human-readable summary is printed.
+
+Usage:
+    from pipelineMetrics import METRICS
+    METRICS.inc("fetch_http_total", status="200")
+    with METRICS.timer("parse_seconds"):
+        ...
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FILE = "metrics.prom"
+
+# Seconds; covers sub-millisecond parses up to multi-retry fetches.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count", "max")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound containing the q-th observation (Prometheus-style)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return self.max
+
+
+class MetricsRegistry:
+    """Collects labelled counters and histograms from any thread."""
+
+    def __init__(self, prefix: str = "quant_"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, _Histogram]] = {}
+        self._started = time.time()
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(DEFAULT_BUCKETS)
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observes the wall time of the enclosed block into a histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._started = time.time()
+
+    # ── Export ──────────────────────────────────────────────────────────────
+
+    def to_prometheus(self) -> str:
+        """Renders all series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                full = self.prefix + name
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{full}{_format_labels(key)} {value:g}")
+            for name in sorted(self._histograms):
+                full = self.prefix + name
+                lines.append(f"# TYPE {full} histogram")
+                for key, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, n in zip(hist.buckets, hist.counts):
+                        cumulative += n
+                        le = (("le", f"{bound:g}"),)
+                        lines.append(f"{full}_bucket{_format_labels(key, le)} {cumulative}")
+                    inf = (("le", "+Inf"),)
+                    lines.append(f"{full}_bucket{_format_labels(key, inf)} {hist.count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {hist.total:.6f}")
+                    lines.append(f"{full}_count{_format_labels(key)} {hist.count}")
+            lines.append(f"# TYPE {self.prefix}run_seconds gauge")
+            lines.append(f"{self.prefix}run_seconds {time.time() - self._started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str = METRICS_FILE) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+    def summary(self) -> str:
+        """Short end-of-run report: counters, then histogram count/mean/p95/max."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                for key, value in sorted(self._counters[name].items()):
+                    label = name + _format_labels(key)
+                    lines.append(f"  {label:<56} {value:>10g}")
+            for name in sorted(self._histograms):
+                for key, h in sorted(self._histograms[name].items()):
+                    mean = h.total / h.count if h.count else 0.0
+                    label = name + _format_labels(key)
+                    lines.append(
+                        f"  {label:<56} n={h.count:<6} "
+                        f"mean={mean:.3f}s p95≤{h.quantile(0.95):g}s max={h.max:.3f}s"
+                    )
+        return "\n".join(lines)
+
+
+METRICS = MetricsRegistry()
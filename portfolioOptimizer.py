@@ -4,7 +4,8 @@ portfolioOptimizer.py
 Sector classification and portfolio allocation engine.
 
 Allocation Logic:
-  1. Filter: Drop stocks >15% above DCF intrinsic value OR final_score < 40.
+  1. Filter: Drop delisted stocks, stocks >15% above DCF intrinsic value
+     OR final_score < 40.
   2. Apply composite allocation score that rewards:
        a. High final_score (capture moat/quality)
        b. DCF undervaluation: stocks trading well below intrinsic get a bonus
@@ -45,6 +46,8 @@ _SECTOR_MAP: dict[str, str] = {
     "Real Estate": "Real Estate", "Realty": "Real Estate",
 }
 
+OTHER_BROAD_SECTOR = "Others"  # Broad Sector of anything _SECTOR_MAP doesn't match
+
 
 def get_broad_sector(sector: str) -> str:
     """Maps a granular NSE sector string to one of the broad categories above."""
@@ -52,24 +55,25 @@ def get_broad_sector(sector: str) -> str:
     for key, broad in _SECTOR_MAP.items():
         if key.lower() in s:
             return broad
-    return "Others"
+    return OTHER_BROAD_SECTOR
 
 
 # ── Allocation Score ─────────────────────────────────────────────────────────
 
-def _allocation_score(stock: dict) -> float:
+def _allocation_score(stock: dict, score_key: str = "final_score") -> float:
     """
     Composite score used for weighting, beyond just final_score.
 
     Components:
-        base      – final_score (0–100), primary driver
+        base      – final_score (0–100), primary driver; `score_key` swaps in
+                    another 0–100 composite (sectorScoring's sector_final_score)
         dcf_bonus – discount to intrinsic value. Trading below DCF = bonus.
         quality   – ROCE and D/E reward for financially strong businesses.
         inst      – FII+DII ownership as a proxy for institutional conviction.
 
     All components normalised to additive boosts on top of base.
     """
-    base = stock.get("final_score", 0)
+    base = stock.get(score_key, 0)
 
     # DCF discount bonus (up to +25 pts for deeply undervalued stocks)
     current = stock.get("Current Price", 0)
@@ -97,14 +101,17 @@ def _allocation_score(stock: dict) -> float:
 
 # ── Portfolio Allocation ─────────────────────────────────────────────────────
 
-MAX_PORTFOLIO = 150  # Target maximum holdings
+MAX_PORTFOLIO = 150       # Target maximum holdings
+SCORE_FLOOR = 40          # Minimum final_score to be considered
+OVERVALUATION_CAP = 1.15  # Exclude if price > intrinsic × this
 
-def allocate_portfolio(stocks_data: list[dict]) -> list[dict]:
+def allocate_portfolio(stocks_data: list[dict], score_key: str = "final_score") -> list[dict]:
     """
     Filters, scores, ranks, and weights stocks for the portfolio.
 
     Args:
         stocks_data: Full universe of processed stock dicts.
+        score_key:   Composite used for the floor and the base of alloc_score.
 
     Returns:
         List of dicts: {symbol, final_weight, broad_sector, alloc_score}
@@ -120,16 +127,20 @@ def allocate_portfolio(stocks_data: list[dict]) -> list[dict]:
     # ── Filter ──────────────────────────────────────────────────────────────
     candidates = []
     for s in stocks_data:
-        score = s.get("final_score", 0)
+        # No longer in listOfStocks.json (see main._reconcile_universe)
+        if s.get("delisted_on"):
+            continue
+
+        score = s.get(score_key, 0)
         current = s.get("Current Price", 0)
         intrinsic = s.get("Intrinsic Price Per Share", 0)
 
         # Quality floor
-        if score < 40:
+        if score < SCORE_FLOOR:
             continue
 
         # Overvaluation cap: exclude if trading >15% above DCF intrinsic
-        if intrinsic > 0 and current > intrinsic * 1.15:
+        if intrinsic > 0 and current > intrinsic * OVERVALUATION_CAP:
             continue
 
         candidates.append(s)
@@ -139,7 +150,7 @@ def allocate_portfolio(stocks_data: list[dict]) -> list[dict]:
 
     # ── Score & Rank ─────────────────────────────────────────────────────────
     for s in candidates:
-        s["_alloc_score"] = _allocation_score(s)
+        s["_alloc_score"] = _allocation_score(s, score_key)
 
     candidates.sort(key=lambda x: x["_alloc_score"], reverse=True)
     top = candidates[:MAX_PORTFOLIO]
@@ -147,7 +158,7 @@ def allocate_portfolio(stocks_data: list[dict]) -> list[dict]:
     # ── Weight (score² for conviction-proportional allocation) ───────────────
     total_sq = sum(s["_alloc_score"] ** 2 for s in top)
     if total_sq == 0:
-        return []
+        top = []
 
     result = []
     for s in top:
@@ -158,7 +169,9 @@ def allocate_portfolio(stocks_data: list[dict]) -> list[dict]:
             "broad_sector": s["Broad Sector"],
             "alloc_score": round(s["_alloc_score"], 2),
         })
-        # Clean up temp key
+
+    # Clean up temp key (candidates past the cut-off too, or it gets saved)
+    for s in candidates:
         del s["_alloc_score"]
 
     return result
@@ -0,0 +1,131 @@
+"""
+priceRevalue.py
+----------------
+Price-only revaluation from an NSE bhavcopy CSV: every record's Current Price
+and Market Cap (and the price ratios PE / PB) move to the day's close in one
+vectorized pass, and dcf_score / final_score are recomputed from the stored
+fundamentals through the derivedFields graph. No screener.in page is fetched,
+so a daily revalue takes seconds instead of a full scrape.
+
+    new market cap = stored market cap × new price / stored price
+
+(shares outstanding, and so Intrinsic Price Per Share, stay as stored up to
+rounding; PE and PB scale with the price). Symbols missing from the file, or
+with a zero / unparseable close, keep their stored values.
+
+Accepted layouts (header names are matched after stripping spaces):
+    CM bhavcopy          SYMBOL, SERIES, CLOSE, TIMESTAMP
+    full bhavdata        SYMBOL, SERIES, CLOSE_PRICE, DATE1
+    UDiFF bhavcopy       TckrSymb, SctySrs, ClsPric, TradDt
+Only the EQ series is used unless --series says otherwise.
+
+Run:
+    python main.py revalue cm19OCT2026bhav.csv
+    python main.py revalue BhavCopy_NSE_CM_20261019.csv --series EQ,BE --scoring sector
+"""
+
+import csv
+import datetime as dt
+
+import numpy as np
+
+from derivedFields import update_record
+
+SYMBOL_COLUMNS = ("SYMBOL", "TckrSymb")
+SERIES_COLUMNS = ("SERIES", "SctySrs")
+CLOSE_COLUMNS = ("CLOSE", "CLOSE_PRICE", "ClsPric")
+DATE_COLUMNS = ("TIMESTAMP", "DATE1", "TradDt")
+DEFAULT_SERIES = ("EQ",)
+_DATE_FORMATS = ("%d-%b-%Y", "%Y-%m-%d", "%d-%m-%Y", "%Y%m%d")
+
+
+def _column(header: list[str], names: tuple[str, ...], path: str, required: bool = True) -> int | None:
+    for name in names:
+        if name in header:
+            return header.index(name)
+    if required:
+        raise ValueError(f"{path}: none of the columns {', '.join(names)} found")
+    return None
+
+
+def _iso_date(value: str) -> str:
+    for fmt in _DATE_FORMATS:
+        try:
+            return dt.datetime.strptime(value.strip(), fmt).date().isoformat()
+        except ValueError:
+            continue
+    return value.strip()
+
+
+def read_bhavcopy(path: str, series: tuple[str, ...] = DEFAULT_SERIES) -> tuple[dict[str, float], str | None]:
+    """
+    Returns ({symbol: close}, trade date) for the rows in `series`. When a
+    symbol is listed in several series, the first one in `series` wins.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        sym_i = _column(header, SYMBOL_COLUMNS, path)
+        close_i = _column(header, CLOSE_COLUMNS, path)
+        series_i = _column(header, SERIES_COLUMNS, path, required=False)
+        date_i = _column(header, DATE_COLUMNS, path, required=False)
+
+        rank = {s: i for i, s in enumerate(series)}
+        best: dict[str, tuple[int, float]] = {}
+        trade_date = None
+        for row in reader:
+            if len(row) <= max(sym_i, close_i):
+                continue
+            row_series = row[series_i].strip() if series_i is not None else series[0]
+            if row_series not in rank:
+                continue
+            try:
+                close = float(row[close_i].replace(",", ""))
+            except ValueError:
+                continue
+            symbol = row[sym_i].strip()
+            if symbol not in best or rank[row_series] < best[symbol][0]:
+                best[symbol] = (rank[row_series], close)
+            if trade_date is None and date_i is not None and len(row) > date_i:
+                trade_date = _iso_date(row[date_i])
+    return {s: close for s, (_, close) in best.items()}, trade_date
+
+
+def revalue(
+    records: list[dict], prices: dict[str, float], price_date: str | None = None
+) -> tuple[dict[str, set[str]], list[str]]:
+    """
+    Moves `records` to the new closes in place. Returns ({symbol: changed
+    fields} as from update_record, symbols without a usable new price).
+    """
+    matched = [r for r in records if prices.get(r["symbol"], 0) > 0 and (r.get("Current Price") or 0) > 0]
+    found = {r["symbol"] for r in matched}
+    missing = [r["symbol"] for r in records if r["symbol"] not in found]
+    if not matched:
+        return {}, missing
+
+    def column(key: str) -> np.ndarray:
+        return np.array([float(r.get(key) or 0) for r in matched])
+
+    new_price = np.array([prices[r["symbol"]] for r in matched])
+    ratio = new_price / column("Current Price")
+    market_cap = np.round(column("Market Cap (Cr)") * ratio, 2)
+    pe = np.round(column("PE") * ratio, 2)
+    pb = np.round(column("PB") * ratio, 2)
+
+    changed: dict[str, set[str]] = {}
+    for r, price, mcap, pe_i, pb_i in zip(
+        matched, new_price.tolist(), market_cap.tolist(), pe.tolist(), pb.tolist()
+    ):
+        updates = {"Current Price": price, "Market Cap (Cr)": mcap}
+        # Ratios the page did not report (absent / 0) stay that way
+        if r.get("PE"):
+            updates["PE"] = pe_i
+        if r.get("PB"):
+            updates["PB"] = pb_i
+        fields = update_record(r, updates)
+        if price_date:
+            r["price_date"] = price_date
+        if fields:
+            changed[r["symbol"]] = fields
+    return changed, missing
@@ -0,0 +1,109 @@
+"""
+priorityScheduler.py
+---------------------
+Orders pipeline work by expected portfolio impact, and detects when the
+portfolio has stopped changing so a daily run can end early.
+
+Priority (higher first):
+    Nifty 500 member (nifty500Stocks.json)     +40
+    currently held (portfolio_weight > 0)       +30
+    prior final_score                           +0.5 × score   (0–50)
+    prior market cap                            +4 × log10(Cr) (≤ 20)
+    staleness since last fetch (fetchCache)     +1 per day     (≤ 10; never fetched = 10)
+
+Early stop: ConvergenceMonitor watches the top-MAX_PORTFOLIO weights after
+each re-scored commit; once `patience` consecutive ones move them by at most
+`tolerance` (one-way turnover), the run is considered converged. Symbols whose
+page came back unchanged (304 / same digest) were never re-scored, so they say
+nothing about convergence and are not counted.
+"""
+
+import json
+import math
+import threading
+import time
+
+from portfolioOptimizer import MAX_PORTFOLIO
+
+NIFTY500_FILE = "nifty500Stocks.json"
+MAX_STALENESS_DAYS = 10
+
+
+def load_nifty500(path: str = NIFTY500_FILE) -> set[str]:
+    try:
+        with open(path) as f:
+            return set(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return set()
+
+
+def _age_days(symbol: str, now: float) -> float:
+    from stockFetch import last_fetched
+
+    stamp = last_fetched(symbol)
+    if not stamp:
+        return MAX_STALENESS_DAYS
+    try:
+        fetched = time.mktime(time.strptime(stamp, "%Y-%m-%dT%H:%M:%S"))
+    except ValueError:
+        return MAX_STALENESS_DAYS
+    return min(MAX_STALENESS_DAYS, max(0.0, (now - fetched) / 86400))
+
+
+def priority(symbol: str, record: dict | None, nifty500: set[str], now: float) -> float:
+    score = 40.0 if symbol in nifty500 else 0.0
+    if record:
+        if (record.get("portfolio_weight") or 0) > 0:
+            score += 30.0
+        score += 0.5 * (record.get("final_score") or 0)
+        mcap = record.get("Market Cap (Cr)") or 0
+        if mcap > 0:
+            score += min(20.0, 4 * math.log10(mcap + 1))
+    return score + _age_days(symbol, now)
+
+
+def order_pending(
+    pending: list[str], previous: dict[str, dict], nifty500_path: str = NIFTY500_FILE
+) -> list[str]:
+    """Sorts symbols by descending priority (ties alphabetical)."""
+    nifty500 = load_nifty500(nifty500_path)
+    now = time.time()
+    ranked = {s: priority(s, previous.get(s), nifty500, now) for s in pending}
+    return sorted(pending, key=lambda s: (-ranked[s], s))
+
+
+class ConvergenceMonitor:
+    """Thread-safe early-stop check on the top-N portfolio weights."""
+
+    def __init__(self, tolerance: float = 0.01, patience: int = 25, top_n: int = MAX_PORTFOLIO):
+        self.tolerance = tolerance
+        self.patience = patience
+        self.top_n = top_n
+        self.stable = 0
+        self.last_change = 1.0
+        self._weights: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.converged = threading.Event()
+
+    def _top(self, records: list[dict]) -> dict[str, float]:
+        held = [r for r in records if (r.get("portfolio_weight") or 0) > 0]
+        held.sort(key=lambda r: r["portfolio_weight"], reverse=True)
+        return {r["symbol"]: r["portfolio_weight"] for r in held[:self.top_n]}
+
+    def observe(self, records: list[dict]) -> bool:
+        """
+        Records one re-scored commit (the rebalanced universe) and returns True
+        once the weights have been stable for `patience` of them in a row.
+        """
+        with self._lock:
+            weights = self._top(records)
+            symbols = weights.keys() | self._weights.keys()
+            change = 0.5 * sum(
+                abs(weights.get(s, 0.0) - self._weights.get(s, 0.0)) for s in symbols
+            )
+            self._weights = weights
+            self.last_change = change
+            self.stable = self.stable + 1 if change <= self.tolerance else 0
+            if self.stable >= self.patience:
+                self.converged.set()
+        return self.converged.is_set()
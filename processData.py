@@ -5,7 +5,7 @@ Transforms raw scraped screener.in data into structured financial metrics
 and quantitative sub-scores for the scoring engine.
 """
 
-from calcEngine import calculate_dcf
+from calcEngine import dcf_score, fii_dii_de_score, intrinsic_value, roce_score
 
 
 def _clean_float(val: str | None, default: float = 0.0) -> float:
@@ -154,21 +154,9 @@ def getRatios(raw: dict) -> dict | None:
     dii = _get_latest_value(shareholding, "DIIs")
 
     # --- Scoring (0–100) ---
-    intrinsic_val = calculate_dcf(
-        max(0, fcf),
-        growth_rate=float(rev_cagr) / 100 if rev_cagr > 0 else 0.05,
-    )
-    if isinstance(intrinsic_val, complex):
-        intrinsic_val = intrinsic_val.real
-
+    intrinsic_val = intrinsic_value(fcf, rev_cagr)
     shares = round(market_cap / current_price, 2)
-
-    dcf_score = min(100.0, max(0.0, (intrinsic_val / market_cap) * 25))
     growth_score = min(100.0, max(0.0, (rev_cagr + profit_cagr) * 2))
-    roce_score = min(100.0, max(0.0, roce * 2))
-    de_score = max(0.0, 100.0 - (de * 50))
-    fii_dii_score = min(100.0, fii + dii)
-    fii_dii_de_score = (de_score + fii_dii_score) / 2
 
     return {
         "symbol": raw.get("symbol", "Unknown"),
@@ -189,9 +177,9 @@ def getRatios(raw: dict) -> dict | None:
         "FII (%)": fii,
         "DII (%)": dii,
         "scores": {
-            "dcf_score": round(float(dcf_score), 4),
+            "dcf_score": round(float(dcf_score(intrinsic_val, market_cap)), 4),
             "growth_score": round(float(growth_score), 4),
-            "roce_score": round(float(roce_score), 4),
-            "fii_dii_de_score": round(float(fii_dii_de_score), 4),
+            "roce_score": round(float(roce_score(roce)), 4),
+            "fii_dii_de_score": round(float(fii_dii_de_score(de, fii, dii)), 4),
         },
     }
\ No newline at end of file
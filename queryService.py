@@ -0,0 +1,266 @@
+"""
+queryService.py
+----------------
+Local JSON query service: loads the universe once, keeps it indexed in memory
+and answers over localhost, so the dashboard and ad-hoc scripts don't each
+re-read and re-parse stockData.json.
+
+Indexes (rebuilt as a whole on reload and swapped in atomically):
+    by symbol          symbol → record
+    by score rank      records sorted by final_score (rank 1 = best)
+    by Broad Sector    sector → records in score order
+
+Endpoints (GET, JSON):
+    /top?n=50&sector=Finance&fields=symbol,final_score
+    /symbol/<SYM>      full record + rank, sector_rank
+    /sector/<name>     every record in one Broad Sector, best first (fields= allowed)
+    /sectors           {sector: count}
+    /portfolio         holdings by weight (fields= allowed)
+    /status            record count, source, load time, reload count
+
+Hot reload: a background thread polls the source (stockData.json, or
+stockData.db + its WAL with --store sqlite, opened read-only: run the
+pipeline with --store sqlite first) every --reload-interval seconds
+and rebuilds the index when the mtime/size changes. The pipeline replaces
+stockData.json atomically, so a reload never sees a half-written file. A
+failed reload (unreadable file, locked or corrupt database) is logged and the
+last good index keeps serving until the next poll succeeds.
+
+Run:
+    python main.py serve                     # 127.0.0.1:8780
+    python main.py serve --store sqlite --port 9000
+    curl -s 'localhost:8780/top?n=10&sector=Finance&fields=symbol,final_score'
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from portfolioOptimizer import OTHER_BROAD_SECTOR
+from resultStore import STORE_FILE, ResultStore
+from stockRecord import load_records, to_json
+
+DATA_FILE = "stockData.json"
+DEFAULT_PORT = 8780
+RELOAD_INTERVAL = 2.0
+MAX_ROWS = 5000
+
+
+# ── Index ───────────────────────────────────────────────────────────────────
+
+class UniverseIndex:
+    """Immutable snapshot of the universe with symbol / rank / sector indexes."""
+
+    def __init__(self, records: list, loaded_at: float, load_seconds: float):
+        ranked = sorted(records, key=lambda r: r.get("final_score") or 0, reverse=True)
+        self.ranked = ranked
+        self.by_symbol = {r["symbol"]: r for r in ranked}
+        self.rank = {r["symbol"]: i for i, r in enumerate(ranked, 1)}
+        self.by_sector: dict[str, list] = {}
+        for r in ranked:
+            self.by_sector.setdefault(r.get("Broad Sector") or OTHER_BROAD_SECTOR, []).append(r)
+        self.sector_rank = {
+            r["symbol"]: i for rows in self.by_sector.values() for i, r in enumerate(rows, 1)
+        }
+        self.holdings = sorted(
+            (r for r in ranked if (r.get("portfolio_weight") or 0) > 0),
+            key=lambda r: r["portfolio_weight"],
+            reverse=True,
+        )
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+
+
+class UniverseSource:
+    """Where the records come from, and a cheap fingerprint to detect commits."""
+
+    def __init__(self, store: str = "json", path: str | None = None):
+        self.store = store
+        self.path = path or (STORE_FILE if store == "sqlite" else DATA_FILE)
+        self._store = ResultStore(self.path, readonly=True) if store == "sqlite" else None
+
+    def fingerprint(self) -> tuple:
+        paths = [self.path, f"{self.path}-wal"] if self._store else [self.path]
+        stamp = []
+        for p in paths:
+            try:
+                st = os.stat(p)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def load(self) -> UniverseIndex:
+        start = time.perf_counter()
+        records = self._store.load_all() if self._store else load_records(self.path)
+        return UniverseIndex(records, time.time(), time.perf_counter() - start)
+
+
+class QueryService:
+    def __init__(self, source: UniverseSource, reload_interval: float = RELOAD_INTERVAL):
+        self.source = source
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self._fingerprint = source.fingerprint()
+        self.index = source.load()
+        self._stop = threading.Event()
+
+    def reload_if_changed(self) -> bool:
+        fingerprint = self.source.fingerprint()
+        if fingerprint == self._fingerprint:
+            return False
+        try:
+            index = self.source.load()
+        except (OSError, ValueError, sqlite3.Error) as e:  # Keep the last index; retried next poll
+            print(f"  [WARN] Reload of {self.source.path} failed: {e}")
+            return False
+        self.index, self._fingerprint = index, fingerprint
+        self.reloads += 1
+        print(
+            f"  [RELOAD] {len(index.ranked)} records from {self.source.path} "
+            f"({index.load_seconds * 1000:.0f} ms)"
+        )
+        return True
+
+    def watch(self) -> threading.Thread:
+        def loop():
+            while not self._stop.wait(self.reload_interval):
+                self.reload_if_changed()
+
+        thread = threading.Thread(target=loop, name="universe-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ── Queries ─────────────────────────────────────────────────────────────
+
+    def query(self, path: str, params: dict[str, str]) -> tuple[int, object]:
+        """Returns (HTTP status, JSON-serializable body)."""
+        index = self.index  # One snapshot per request, even across a reload
+        fields = [f for f in params.get("fields", "").split(",") if f] or None
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        route = parts[0] if parts else ""
+
+        if route == "top" and len(parts) == 1:
+            try:
+                n = min(MAX_ROWS, max(0, int(params.get("n", 50))))
+            except ValueError:
+                return 400, {"error": "n must be an integer"}
+            sector = params.get("sector")
+            rows = index.by_sector.get(sector, []) if sector else index.ranked
+            return 200, _rows(rows[:n], fields)
+        if route == "symbol" and len(parts) == 2:
+            record = index.by_symbol.get(parts[1].upper())
+            if record is None:
+                return 404, {"error": f"unknown symbol {parts[1]}"}
+            sym = record["symbol"]
+            return 200, {
+                "rank": index.rank[sym],
+                "sector_rank": index.sector_rank[sym],
+                "record": _project(record, fields),
+            }
+        if route == "sector" and len(parts) == 2:
+            if parts[1] not in index.by_sector:
+                return 404, {"error": f"unknown sector {parts[1]}"}
+            return 200, _rows(index.by_sector[parts[1]], fields)
+        if route == "sectors" and len(parts) == 1:
+            return 200, {s: len(rows) for s, rows in sorted(index.by_sector.items())}
+        if route == "portfolio" and len(parts) == 1:
+            return 200, _rows(index.holdings, fields)
+        if route == "status" and len(parts) == 1:
+            return 200, {
+                "records": len(index.ranked),
+                "holdings": len(index.holdings),
+                "source": self.source.path,
+                "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(index.loaded_at)),
+                "load_ms": round(index.load_seconds * 1000, 1),
+                "reloads": self.reloads,
+            }
+        return 404, {"error": f"unknown endpoint {path}"}
+
+
+def _project(record, fields: list[str] | None):
+    return record if fields is None else {f: record[f] for f in fields if f in record}
+
+
+def _rows(records: list, fields: list[str] | None) -> list:
+    return [_project(r, fields) for r in records]
+
+
+# ── HTTP ────────────────────────────────────────────────────────────────────
+
+def make_handler(service: QueryService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # one line per request is too chatty
+            pass
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            status, payload = service.query(url.path, params)
+            body = json.dumps(payload, separators=(",", ":"), default=to_json).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")  # dashboard dev server
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    store: str = "json",
+    reload_interval: float = RELOAD_INTERVAL,
+) -> None:
+    try:
+        service = QueryService(UniverseSource(store), reload_interval)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Cannot load results ({e}); run the pipeline first.")
+        return
+    index = service.index
+    print(
+        f"Loaded {len(index.ranked)} records from {service.source.path} "
+        f"in {index.load_seconds * 1000:.0f} ms"
+    )
+    if reload_interval > 0:
+        service.watch()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving on http://{host}:{port}  (/top /symbol/<SYM> /sector/<name> /sectors /portfolio /status)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="In-memory JSON query service over the results")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--store", choices=("json", "sqlite"), default="json", help="Result backend")
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=RELOAD_INTERVAL,
+        help="Seconds between checks for new pipeline commits (0 = never reload)",
+    )
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.store, args.reload_interval)
+
+
+if __name__ == "__main__":
+    main()
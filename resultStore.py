@@ -0,0 +1,210 @@
+"""
+resultStore.py
+---------------
+SQLite-backed store for processed stock records (alternative to rewriting the
+whole stockData.json on every commit).
+
+Schema:
+    stocks(symbol PRIMARY KEY, final_score, broad_sector, portfolio_weight,
+           updated_at, record)         -- record = the full JSON dict
+
+Indexed columns (final_score, broad_sector, portfolio_weight) mirror fields
+of the JSON record so ad-hoc queries don't need to load the universe:
+
+    sqlite3 stockData.db "SELECT symbol, final_score FROM stocks
+                          WHERE broad_sector = 'Finance' ORDER BY final_score DESC LIMIT 20"
+
+The database runs in WAL mode, so readers (dashboards, scripts) never block
+the pipeline's writer; ResultStore(path, readonly=True) opens it without
+creating or writing anything. upsert_many() only writes rows whose JSON
+changed since the last write, and with `dirty` (the symbols the caller
+changed) only serializes those, so a commit after a rebalance touches the new
+record plus the handful of rows whose weights moved. export_json() still
+produces the stockData.json the rest of the tooling expects.
+"""
+
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+
+from stockRecord import StockRecord, iter_records, to_json, write_records
+
+STORE_FILE = "stockData.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stocks (
+    symbol           TEXT PRIMARY KEY,
+    final_score      REAL,
+    broad_sector     TEXT,
+    portfolio_weight REAL,
+    updated_at       TEXT,
+    record           TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stocks_final_score ON stocks(final_score DESC);
+CREATE INDEX IF NOT EXISTS idx_stocks_broad_sector ON stocks(broad_sector, final_score DESC);
+CREATE INDEX IF NOT EXISTS idx_stocks_portfolio_weight ON stocks(portfolio_weight DESC);
+"""
+
+
+class ResultStore:
+    """Thread-safe (one connection per thread) symbol-keyed record store."""
+
+    def __init__(self, path: str = STORE_FILE, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._written: dict[str, str] = {}  # symbol → last JSON written by us
+        conn = self._conn()
+        if readonly:
+            return
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.readonly:  # Fails instead of creating a missing database
+                uri = pathlib.Path(self.path).absolute().as_uri() + "?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, timeout=30)
+            else:
+                conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    # ── Writes ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _row(record: dict, payload: str, now: str) -> tuple:
+        return (
+            record["symbol"],
+            record.get("final_score"),
+            record.get("Broad Sector"),
+            record.get("portfolio_weight", 0.0),
+            now,
+            payload,
+        )
+
+    def upsert_many(self, records: list[dict], dirty: set[str] | None = None) -> int:
+        """
+        Inserts/updates records whose content changed; returns rows written.
+        With `dirty`, only those symbols (and records never written) are
+        serialized and compared; the caller vouches that the rest are unchanged.
+        """
+        now = time.strftime("%Y-%m-%dT%H:%M:%S")
+        rows, payloads = [], {}
+        with self._lock:
+            for r in records:
+                symbol = r["symbol"]
+                if dirty is not None and symbol not in dirty and symbol in self._written:
+                    continue
+                payload = json.dumps(r, separators=(",", ":"), default=to_json)
+                if self._written.get(symbol) != payload:
+                    rows.append(self._row(r, payload, now))
+                    payloads[symbol] = payload
+        if not rows:
+            return 0
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO stocks (symbol, final_score, broad_sector, portfolio_weight, updated_at, record)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    final_score = excluded.final_score,
+                    broad_sector = excluded.broad_sector,
+                    portfolio_weight = excluded.portfolio_weight,
+                    updated_at = excluded.updated_at,
+                    record = excluded.record
+                """,
+                rows,
+            )
+        with self._lock:  # Only once committed: a failed write is retried next save
+            self._written.update(payloads)
+        return len(rows)
+
+    def upsert(self, record: dict) -> bool:
+        return self.upsert_many([record]) == 1
+
+    def delete(self, symbols: list[str]) -> int:
+        conn = self._conn()
+        with conn:
+            cur = conn.executemany("DELETE FROM stocks WHERE symbol = ?", [(s,) for s in symbols])
+        with self._lock:
+            for s in symbols:
+                self._written.pop(s, None)
+        return cur.rowcount
+
+    # ── Reads ───────────────────────────────────────────────────────────────
+
+    def has(self, symbol: str) -> bool:
+        cur = self._conn().execute("SELECT 1 FROM stocks WHERE symbol = ?", (symbol,))
+        return cur.fetchone() is not None
+
+    def get(self, symbol: str) -> dict | None:
+        cur = self._conn().execute("SELECT record FROM stocks WHERE symbol = ?", (symbol,))
+        row = cur.fetchone()
+        return json.loads(row[0]) if row else None
+
+    def symbols(self) -> set[str]:
+        return {s for (s,) in self._conn().execute("SELECT symbol FROM stocks")}
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM stocks").fetchone()[0]
+
+    def top(self, n: int = 50, sector: str | None = None) -> list[dict]:
+        """Highest final_score records, optionally within one Broad Sector."""
+        if sector:
+            cur = self._conn().execute(
+                "SELECT record FROM stocks WHERE broad_sector = ? ORDER BY final_score DESC LIMIT ?",
+                (sector, n),
+            )
+        else:
+            cur = self._conn().execute(
+                "SELECT record FROM stocks ORDER BY final_score DESC LIMIT ?", (n,)
+            )
+        return [json.loads(r) for (r,) in cur]
+
+    def holdings(self) -> list[dict]:
+        cur = self._conn().execute(
+            "SELECT record FROM stocks WHERE portfolio_weight > 0 ORDER BY portfolio_weight DESC"
+        )
+        return [json.loads(r) for (r,) in cur]
+
+    def load_all(self) -> list[StockRecord]:
+        """All records, best first (the order stockData.json is written in)."""
+        cur = self._conn().execute("SELECT symbol, record FROM stocks ORDER BY final_score DESC")
+        records = []
+        with self._lock:
+            for symbol, payload in cur:
+                if not self.readonly:
+                    self._written[symbol] = payload
+                records.append(StockRecord.from_dict(json.loads(payload)))
+        return records
+
+    # ── JSON interop ────────────────────────────────────────────────────────
+
+    def import_json(self, path: str) -> int:
+        try:
+            records = list(iter_records(path))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        return self.upsert_many(records)
+
+    def export_json(self, path: str) -> int:
+        return write_records(path, self.load_all())
+
+
+def open_store(path: str = STORE_FILE, seed_json: str | None = None) -> ResultStore:
+    """Opens the store, importing `seed_json` the first time the DB is empty."""
+    store = ResultStore(path)
+    if seed_json and store.count() == 0:
+        n = store.import_json(seed_json)
+        if n:
+            print(f"  Imported {n} records from {seed_json} into {path}")
+    return store
@@ -0,0 +1,281 @@
+"""
+riskModel.py
+-------------
+Shrinkage covariance risk model over daily log returns, so a rebalance can
+report how concentrated the portfolio's risk is – 150 names that all move
+with one Broad Sector are far less diversified than their count suggests.
+
+Input: priceHistory.csv, one row per (date, symbol, close), rows appended in
+date order. `main.py revalue` appends each bhavcopy it applies, so the file
+grows by one day per revalue; any other source with the same columns works.
+
+State (riskModel.npz) is a set of exponentially weighted sufficient
+statistics, so a new day is one O(N²) outer-product update, and only the
+price-history rows appended since the last update are read:
+    A  = Σ λᵏ r rᵀ            co-moment of returns (mean assumed zero)
+    C  = Σ λᵏ m mᵀ            weighted pairwise observation counts (m = mask)
+    B  = Σ λ²ᵏ r² r²ᵀ          for the shrinkage intensity (r² = squared returns)
+    n  = Σ λᵏ                 effective number of days
+with λ = 0.5 ** (1 / HALFLIFE). Returns beyond ±MAX_MOVE (splits, bonus
+issues) are dropped.
+
+Covariance: the pairwise sample covariance S = A / C shrunk towards μI
+(μ = mean variance) with the Ledoit-Wolf (2004) optimal intensity, computed
+from the same statistics as sklearn's ledoit_wolf(assume_centered=True),
+all restricted to the names with MIN_OBS observations:
+
+    Σ = (1 − δ) S + δ μ I
+
+Usage:
+    from riskModel import load_model
+    model = load_model()                            # + rows appended since last time
+    risk = model.portfolio_risk({"TCS": 0.02, ...})
+    risk["volatility"], risk["contributions"]      # annualized; fraction of variance per name
+"""
+
+import csv
+import math
+import os
+
+import numpy as np
+
+PRICE_HISTORY_FILE = "priceHistory.csv"
+RISK_FILE = "riskModel.npz"
+HALFLIFE = 126          # Trading days (~6 months)
+MAX_MOVE = 0.35         # |log return| above this is treated as a corporate action
+MIN_OBS = 20.0          # Effective observations before a name gets a variance
+TRADING_DAYS = 252
+
+
+class RiskModel:
+    def __init__(self, halflife: float = HALFLIFE):
+        self.halflife = halflife
+        self.decay = 0.5 ** (1 / halflife)
+        self.symbols: list[str] = []
+        self.index: dict[str, int] = {}
+        self.last_close = np.zeros(0)
+        self.A = np.zeros((0, 0))
+        self.C = np.zeros((0, 0))
+        self.B = np.zeros((0, 0))
+        self.n = 0.0
+        self.days = 0
+        self.last_date: str | None = None
+        self.offset = 0          # Bytes of the price-history file already consumed
+        self._cov: tuple | None = None
+
+    # ── Updates ─────────────────────────────────────────────────────────────
+
+    def _grow(self, symbols) -> None:
+        new = [s for s in symbols if s not in self.index]
+        if not new:
+            return
+        for s in new:
+            self.index[s] = len(self.symbols)
+            self.symbols.append(s)
+        size, old = len(self.symbols), len(self.last_close)
+        self.last_close = np.concatenate([self.last_close, np.full(size - old, np.nan)])
+        for name in ("A", "C", "B"):
+            grown = np.zeros((size, size))
+            grown[:old, :old] = getattr(self, name)
+            setattr(self, name, grown)
+
+    def update(self, days: list[tuple[str, dict[str, float]]]) -> int:
+        """
+        Adds days of closes, oldest first, in one rank-k update (A = λᴰA + RᵀWR);
+        a symbol's first close only sets its base. Days not after last_date are
+        ignored. Returns the number of days added.
+        """
+        days = [(d, c) for d, c in days if self.last_date is None or d > self.last_date]
+        if not days:
+            return 0
+        for _, closes in days:
+            self._grow(closes)
+        size = len(self.symbols)
+        R = np.zeros((len(days), size))
+        M = np.zeros((len(days), size))
+        for k, (_, closes) in enumerate(days):
+            idx = np.fromiter((self.index[s] for s in closes), dtype=np.intp, count=len(closes))
+            price = np.fromiter(closes.values(), dtype=np.float64, count=len(closes))
+            valid = price > 0
+            idx, price = idx[valid], price[valid]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r = np.log(price / self.last_close[idx])
+            ok = np.isfinite(r) & (np.abs(r) <= MAX_MOVE)
+            R[k, idx[ok]] = r[ok]
+            M[k, idx[ok]] = 1.0
+            self.last_close[idx] = price
+        self.last_date = days[-1][0]
+
+        if self.days == 0:  # Days before the first return only set base prices
+            observed = np.flatnonzero(M.any(axis=1))
+            start = observed[0] if len(observed) else len(days)
+            R, M = R[start:], M[start:]
+        count = len(R)
+        if count:
+            lam = self.decay
+            w = lam ** np.arange(count - 1, -1, -1, dtype=np.float64)
+            R2 = R * R
+            self.A *= lam ** count
+            self.A += (R.T * w) @ R
+            self.C *= lam ** count
+            self.C += (M.T * w) @ M
+            self.B *= lam ** (2 * count)
+            self.B += (R2.T * (w * w)) @ R2
+            self.n = lam ** count * self.n + float(w.sum())
+            self.days += count
+            self._cov = None
+        return count
+
+    # ── Estimates ───────────────────────────────────────────────────────────
+
+    def covariance(self) -> tuple[np.ndarray, np.ndarray, float]:
+        """(indices of names with MIN_OBS observations, shrunk daily covariance, intensity δ)."""
+        if self._cov is not None:
+            return self._cov
+        active = np.flatnonzero(np.diag(self.C) >= MIN_OBS) if len(self.symbols) else np.zeros(0, int)
+        if len(active) == 0 or self.n <= 0:
+            self._cov = (active, np.zeros((len(active), len(active))), 0.0)
+            return self._cov
+        A = self.A[np.ix_(active, active)]
+        C = self.C[np.ix_(active, active)]
+        b = float(self.B[np.ix_(active, active)].sum())
+        with np.errstate(divide="ignore", invalid="ignore"):
+            S = np.where(C > 0, A / C, 0.0)
+        p, n = len(active), self.n
+
+        # Ledoit-Wolf intensity on the zero-filled sample (sklearn's formulation)
+        S0 = A / n
+        trace = np.trace(S0)
+        mu = trace / p
+        delta_ = float(np.sum(S0 * S0))
+        beta = (b / n - delta_) / (p * n)
+        delta = (delta_ - 2 * mu * trace + p * mu * mu) / p
+        shrink = 0.0 if delta <= 0 else min(max(beta, 0.0), delta) / delta
+
+        target = np.trace(S) / p
+        cov = (1 - shrink) * S
+        cov[np.diag_indices(p)] += shrink * target
+        self._cov = (active, cov, shrink)
+        return self._cov
+
+    def portfolio_risk(self, weights: dict[str, float]) -> dict:
+        """
+        Annualized volatility of `weights` and each name's fraction of the
+        portfolio variance (w_i (Σw)_i / wᵀΣw, summing to 1). Names without
+        enough history are left out and reported as uncovered weight.
+        """
+        active, cov, shrink = self.covariance()
+        pos = {self.symbols[a]: k for k, a in enumerate(active.tolist())}
+        held = [(s, w) for s, w in weights.items() if w > 0]
+        covered = [(s, w, pos[s]) for s, w in held if s in pos]
+        result = {
+            "volatility": 0.0,
+            "contributions": {},
+            "covered_weight": round(sum(w for _, w, _ in covered), 4),
+            "uncovered": sorted(s for s, _ in held if s not in pos),
+            "shrinkage": round(shrink, 4),
+            "days": self.days,
+            "as_of": self.last_date,
+        }
+        if not covered:
+            return result
+        k = np.array([c[2] for c in covered])
+        w = np.array([c[1] for c in covered])
+        sub = cov[np.ix_(k, k)]
+        marginal = sub @ w
+        variance = float(w @ marginal)
+        if variance <= 0:
+            return result
+        result["volatility"] = round(math.sqrt(variance * TRADING_DAYS), 4)
+        result["contributions"] = {
+            s: round(float(c), 4) for (s, _, _), c in zip(covered, w * marginal / variance)
+        }
+        return result
+
+    # ── Persistence ─────────────────────────────────────────────────────────
+
+    def save(self, path: str = RISK_FILE) -> None:
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            symbols=np.array(self.symbols, dtype=str),
+            last_close=self.last_close,
+            A=self.A.astype(np.float32),
+            C=self.C.astype(np.float32),
+            B=self.B.astype(np.float32),
+            meta=np.array([self.halflife, self.n, self.days, self.offset], dtype=np.float64),
+            last_date=np.array(self.last_date or ""),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = RISK_FILE) -> "RiskModel":
+        with np.load(path) as npz:
+            halflife, n, days, offset = npz["meta"].tolist()
+            model = cls(halflife)
+            model.symbols = npz["symbols"].tolist()
+            model.index = {s: i for i, s in enumerate(model.symbols)}
+            model.last_close = npz["last_close"]
+            model.A = npz["A"].astype(np.float64)
+            model.C = npz["C"].astype(np.float64)
+            model.B = npz["B"].astype(np.float64)
+            model.n, model.days, model.offset = n, int(days), int(offset)
+            model.last_date = str(npz["last_date"]) or None
+        return model
+
+
+# ── Price History File ──────────────────────────────────────────────────────
+
+def append_prices(date: str, closes: dict[str, float], path: str = PRICE_HISTORY_FILE) -> int:
+    """Appends one day of closes as (date, symbol, close) rows; returns rows written."""
+    new = not os.path.exists(path)
+    with open(path, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(["date", "symbol", "close"])
+        writer.writerows((date, s, c) for s, c in sorted(closes.items()))
+    return len(closes)
+
+
+def update_from_file(model: RiskModel, path: str = PRICE_HISTORY_FILE) -> int:
+    """Feeds the complete rows appended to `path` since the model's offset; returns days added."""
+    if os.path.getsize(path) < model.offset:  # Rewritten: start over
+        model.__init__(model.halflife)
+    days: list[tuple[str, dict[str, float]]] = []
+    with open(path, "rb") as f:
+        f.seek(model.offset)
+        for line in f:
+            if not line.endswith(b"\n"):  # Row still being written
+                break
+            model.offset += len(line)
+            parts = line.decode().strip().split(",")
+            if len(parts) != 3 or parts[0] == "date":
+                continue
+            date, symbol, close = parts
+            try:
+                price = float(close)
+            except ValueError:
+                continue
+            if not days or days[-1][0] != date:
+                days.append((date, {}))
+            days[-1][1][symbol] = price
+    return model.update(days)
+
+
+def load_model(
+    prices: str = PRICE_HISTORY_FILE, path: str = RISK_FILE, halflife: float = HALFLIFE
+) -> RiskModel | None:
+    """The saved model brought up to date with `prices`; None when there is no price history."""
+    if not os.path.exists(prices):
+        return None
+    try:
+        model = RiskModel.load(path)
+        if model.halflife != halflife:
+            model = RiskModel(halflife)
+    except (FileNotFoundError, KeyError, ValueError):
+        model = RiskModel(halflife)
+    offset = model.offset
+    update_from_file(model, prices)
+    if model.offset != offset:
+        model.save(path)
+    return model
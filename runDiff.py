@@ -0,0 +1,265 @@
+"""
+runDiff.py
+-----------
+What moved between two runs: portfolio entries / exits, weight changes,
+final_score and intrinsic-value jumps, new, removed, delisted and failed
+symbols.
+
+Either side of a diff can be
+    a stockData.json-style file    streamed with stockRecord.iter_records
+    a run date (YYYY-MM-DD)        a scoreHistory partition, history/<date>.npz
+and by default the two latest history runs are compared. Each side is
+reduced to one (final_score, weight, intrinsic price, delisted_on) tuple per
+symbol; the newer side is streamed past a dict of the older one, so the join
+is a single linear pass.
+
+Change kinds (thresholds below):
+    entered / exited      portfolio_weight crossed zero
+    reweighted            held on both sides, weight moved ≥ WEIGHT_CHANGE
+    score_jump            |Δ final_score| ≥ SCORE_JUMP points
+    intrinsic_jump        |Δ intrinsic price| ≥ INTRINSIC_JUMP of the old value
+    added / removed       symbol only on the new / old side
+    delisted              newly marked delisted_on
+    failed                failureCache.json entry recorded since the old side
+
+The report is one JSON object per line (runDiff.jsonl), written as changes
+are found, so alerting can tail or grep it:
+    {"kind": "exited", "symbol": "TCS", "old": 0.0125, "new": 0.0}
+
+fetch, rebalance, rescore and revalue write the report for their own
+changes. Standalone:
+    python main.py diff                              # two latest history runs
+    python main.py diff 2026-10-01 2026-10-19
+    python main.py diff old/stockData.json stockData.json --failures failureCache.json
+"""
+
+import argparse
+import datetime as dt
+import json
+import math
+import os
+import re
+import time
+from collections.abc import Iterable, Iterator
+
+from stockRecord import iter_records
+
+DIFF_FILE = "runDiff.jsonl"
+HISTORY_DIR = "history"  # scoreHistory.HISTORY_DIR, without importing numpy
+
+WEIGHT_CHANGE = 0.0025   # 0.25 percentage points of the portfolio
+SCORE_JUMP = 5.0         # final_score points
+INTRINSIC_JUMP = 0.20    # Relative change in Intrinsic Price Per Share
+
+KINDS = (
+    "entered", "exited", "reweighted", "score_jump", "intrinsic_jump",
+    "added", "removed", "delisted", "failed",
+)
+
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# symbol → (final_score, portfolio_weight, intrinsic price, delisted_on)
+Snapshot = dict[str, tuple[float, float, float, str | None]]
+
+
+# ── Snapshots ───────────────────────────────────────────────────────────────
+
+def _num(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def snapshot_row(record) -> tuple[float, float, float, str | None]:
+    return (
+        _num(record.get("final_score")),
+        _num(record.get("portfolio_weight") or 0),
+        _num(record.get("Intrinsic Price Per Share")),
+        record.get("delisted_on"),
+    )
+
+
+def snapshot_records(records: Iterable) -> Snapshot:
+    return {r["symbol"]: snapshot_row(r) for r in records}
+
+
+def snapshot_history(run_date: str, history_dir: str = HISTORY_DIR) -> Snapshot:
+    from scoreHistory import load_snapshot, load_symbols  # numpy
+
+    symbols = load_symbols(history_dir)
+    snap = load_snapshot(run_date, history_dir)
+    # float32 storage: round away the representation noise (70.91000366 → 70.91)
+    return {
+        symbols[code]: (round(score, 4), round(weight, 6), round(intrinsic, 4), None)
+        for code, score, weight, intrinsic in zip(
+            snap["codes"].tolist(),
+            snap["final_score"].tolist(),
+            snap["portfolio_weight"].tolist(),
+            snap["intrinsic_price"].tolist(),
+        )
+    }
+
+
+def _rows(spec: str, history_dir: str) -> Iterator[tuple[str, tuple]]:
+    if _DATE.match(spec) and not os.path.exists(spec):
+        yield from snapshot_history(spec, history_dir).items()
+    else:
+        for r in iter_records(spec):
+            yield r["symbol"], snapshot_row(r)
+
+
+def _taken_at(spec: str) -> float:
+    """When a side was produced: file mtime, or the start of the run date."""
+    if _DATE.match(spec) and not os.path.exists(spec):
+        return time.mktime(dt.date.fromisoformat(spec).timetuple())
+    return os.path.getmtime(spec)
+
+
+# ── Diff ────────────────────────────────────────────────────────────────────
+
+def _clean(value):
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _change(kind: str, symbol: str, old, new) -> dict:
+    return {"kind": kind, "symbol": symbol, "old": _clean(old), "new": _clean(new)}
+
+
+def _compare(symbol: str, before: tuple, after: tuple) -> Iterator[dict]:
+    s0, w0, i0, d0 = before
+    s1, w1, i1, d1 = after
+    if d1 and not d0:
+        yield _change("delisted", symbol, None, d1)
+    if w0 <= 0 < w1:
+        yield _change("entered", symbol, w0, w1)
+    elif w1 <= 0 < w0:
+        yield _change("exited", symbol, w0, w1)
+    elif w0 > 0 and abs(w1 - w0) >= WEIGHT_CHANGE:
+        yield _change("reweighted", symbol, w0, w1)
+    if abs(s1 - s0) >= SCORE_JUMP:
+        yield _change("score_jump", symbol, s0, s1)
+    if i0 > 0 and abs(i1 - i0) >= INTRINSIC_JUMP * i0:
+        yield _change("intrinsic_jump", symbol, i0, i1)
+
+
+def iter_changes(
+    old: Snapshot, new: Iterable[tuple[str, tuple]], failed: dict[str, str] | None = None
+) -> Iterator[dict]:
+    """
+    Streams changes from `old` (a Snapshot) to `new` ((symbol, row) pairs,
+    consumed once). NaN fields never compare as a jump.
+    """
+    seen = set()
+    for symbol, row in new:
+        seen.add(symbol)
+        before = old.get(symbol)
+        if before is None:
+            yield _change("added", symbol, None, row[0])
+        else:
+            yield from _compare(symbol, before, row)
+    for symbol in old.keys() - seen:
+        yield _change("removed", symbol, old[symbol][0], None)
+    for symbol, reason in sorted((failed or {}).items()):
+        yield _change("failed", symbol, None, reason)
+
+
+def write_report(changes: Iterable[dict], path: str = DIFF_FILE) -> list[dict]:
+    """Writes `changes` as JSON lines while they stream in; returns them."""
+    kept = []
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        for change in changes:
+            f.write(json.dumps(change, allow_nan=False, default=str) + "\n")
+            kept.append(change)
+    os.replace(tmp, path)
+    return kept
+
+
+# ── Report ──────────────────────────────────────────────────────────────────
+
+def _fmt(kind: str, value) -> str:
+    if value is None or isinstance(value, str):
+        return str(value)
+    if kind in ("entered", "exited", "reweighted"):
+        return f"{value:.2%}"
+    return f"{value:g}"
+
+
+def _describe(change: dict) -> str:
+    kind, symbol = change["kind"], change["symbol"]
+    if kind in ("added", "removed"):
+        return symbol
+    if kind in ("failed", "delisted"):
+        return f"{symbol} ({change['new']})"
+    return f"{symbol} {_fmt(kind, change['old'])}→{_fmt(kind, change['new'])}"
+
+
+def _magnitude(change: dict) -> float:
+    old, new = change["old"], change["new"]
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+        return abs(new - old)
+    return 0.0
+
+
+def print_report(changes: list[dict], path: str = DIFF_FILE, limit: int = 10) -> None:
+    """Counts per kind, then the largest `limit` changes of each kind."""
+    by_kind: dict[str, list[dict]] = {}
+    for c in changes:
+        by_kind.setdefault(c["kind"], []).append(c)
+    counts = ", ".join(f"{len(by_kind[k])} {k}" for k in KINDS if k in by_kind)
+    print(f"  Run diff: {counts or 'no changes'} → {path}")
+    for kind in KINDS:
+        rows = sorted(by_kind.get(kind, ()), key=_magnitude, reverse=True)
+        if not rows:
+            continue
+        shown = ", ".join(_describe(c) for c in rows[:limit])
+        more = f" … (+{len(rows) - limit} more)" if len(rows) > limit else ""
+        print(f"    {kind:<15}{shown}{more}")
+
+
+def diff_runs(
+    old_spec: str,
+    new_spec: str,
+    history_dir: str = HISTORY_DIR,
+    failures: str | None = None,
+    path: str = DIFF_FILE,
+) -> list[dict]:
+    """Diffs two sides (file paths or run dates), writes and returns the report."""
+    old = dict(_rows(old_spec, history_dir))
+    failed = None
+    if failures:
+        from negativeCache import NegativeCache
+
+        failed = NegativeCache(failures).failed_since(_taken_at(old_spec))
+    return write_report(iter_changes(old, _rows(new_spec, history_dir), failed), path)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Change report between two runs")
+    parser.add_argument("old", nargs="?", help="stockData.json-style file or history run date")
+    parser.add_argument("new", nargs="?", help="stockData.json-style file or history run date")
+    parser.add_argument("--history-dir", default=HISTORY_DIR)
+    parser.add_argument("--failures", help="failureCache.json to report symbols failed since OLD")
+    parser.add_argument("--out", default=DIFF_FILE, help="JSON-lines report path")
+    parser.add_argument("--limit", type=int, default=10, help="Changes printed per kind")
+    args = parser.parse_args(argv)
+
+    old, new = args.old, args.new
+    if old is None or new is None:
+        from scoreHistory import list_runs  # numpy
+
+        runs = list_runs(args.history_dir)
+        needed = 2 if old is None else 1
+        if len(runs) < needed:
+            parser.error(f"need {needed} run(s) in {args.history_dir}/, found {len(runs)}")
+        old, new = (runs[-2] if old is None else old), runs[-1]
+
+    start = time.perf_counter()
+    changes = diff_runs(old, new, args.history_dir, args.failures, args.out)
+    print(f"{old} → {new}  ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    print_report(changes, args.out, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+scoreHistory.py
+----------------
+Compressed columnar history of per-run scores, so overwriting stockData.json
+no longer loses how scores, intrinsic values and weights evolved.
+
+Layout (one partition per run date):
+    history/symbols.json        append-only symbol dictionary (code = list index)
+    history/<YYYY-MM-DD>.npz    codes (int32, sorted) + one float32 column per field
+
+A 2,000-symbol snapshot is ~60 KB compressed instead of a 2.7 MB JSON copy.
+Rows are sorted by symbol code, so a single-symbol lookup is a binary search
+per partition; universe queries stack whole columns.
+
+Usage:
+    from scoreHistory import append_snapshot, symbol_series, universe_series
+    append_snapshot(records)                         # after each run
+    symbol_series("TCS", ["final_score", "portfolio_weight"])
+    dates, symbols, matrix = universe_series("final_score")
+"""
+
+import datetime as dt
+import glob
+import json
+import os
+import threading
+
+import numpy as np
+
+HISTORY_DIR = "history"
+
+# column name → (record key, key inside record["scores"] or None)
+FIELDS: dict[str, tuple[str, str | None]] = {
+    "final_score": ("final_score", None),
+    "portfolio_weight": ("portfolio_weight", None),
+    "current_price": ("Current Price", None),
+    "intrinsic_price": ("Intrinsic Price Per Share", None),
+    "intrinsic_value_cr": ("Intrinsic Value (Total Cr)", None),
+    "market_cap_cr": ("Market Cap (Cr)", None),
+    "roce": ("ROCE (%)", None),
+    "de": ("D/E", None),
+    "rev_cagr": ("Rev CAGR (%)", None),
+    "fii": ("FII (%)", None),
+    "dii": ("DII (%)", None),
+    "dcf_score": ("scores", "dcf_score"),
+    "growth_score": ("scores", "growth_score"),
+    "roce_score": ("scores", "roce_score"),
+    "moat_score": ("scores", "moat_score"),
+    "fii_dii_de_score": ("scores", "fii_dii_de_score"),
+    "tailwind_score": ("scores", "tailwind_score"),
+    "management_score": ("scores", "management_score"),
+}
+
+_lock = threading.Lock()
+_cache: dict[str, tuple[float, dict]] = {}  # path → (mtime, arrays)
+
+
+# ── Symbol Dictionary ───────────────────────────────────────────────────────
+
+def _dict_path(history_dir: str) -> str:
+    return os.path.join(history_dir, "symbols.json")
+
+
+def load_symbols(history_dir: str = HISTORY_DIR) -> list[str]:
+    try:
+        with open(_dict_path(history_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _encode(symbols: list[str], history_dir: str) -> np.ndarray:
+    """Maps symbols to stable int32 codes, extending the dictionary as needed."""
+    known = load_symbols(history_dir)
+    index = {s: i for i, s in enumerate(known)}
+    added = False
+    for s in symbols:
+        if s not in index:
+            index[s] = len(known)
+            known.append(s)
+            added = True
+    if added:
+        tmp = _dict_path(history_dir) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(known, f)
+        os.replace(tmp, _dict_path(history_dir))
+    return np.fromiter((index[s] for s in symbols), dtype=np.int32, count=len(symbols))
+
+
+def _value(record: dict, key: str, sub: str | None) -> float:
+    v = record.get(key)
+    if sub is not None:
+        v = (v or {}).get(sub)
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# ── Writes ──────────────────────────────────────────────────────────────────
+
+def append_snapshot(
+    records: list[dict], run_date: str | None = None, history_dir: str = HISTORY_DIR
+) -> str:
+    """Writes (or replaces) the partition for `run_date` (default: today)."""
+    run_date = run_date or dt.date.today().isoformat()
+    os.makedirs(history_dir, exist_ok=True)
+    with _lock:
+        codes = _encode([r["symbol"] for r in records], history_dir)
+        order = np.argsort(codes, kind="stable")
+        columns = {
+            name: np.array([_value(r, key, sub) for r in records], dtype=np.float32)[order]
+            for name, (key, sub) in FIELDS.items()
+        }
+        path = os.path.join(history_dir, f"{run_date}.npz")
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, codes=codes[order], **columns)
+        os.replace(tmp, path)
+        _cache.pop(path, None)
+    return path
+
+
+# ── Reads ───────────────────────────────────────────────────────────────────
+
+def list_runs(history_dir: str = HISTORY_DIR) -> list[str]:
+    paths = glob.glob(os.path.join(history_dir, "????-??-??.npz"))
+    return sorted(os.path.basename(p)[:-4] for p in paths)
+
+
+def load_snapshot(run_date: str, history_dir: str = HISTORY_DIR) -> dict[str, np.ndarray]:
+    """Arrays for one run: "codes" plus every FIELDS column (cached by mtime)."""
+    path = os.path.join(history_dir, f"{run_date}.npz")
+    mtime = os.path.getmtime(path)
+    with _lock:
+        hit = _cache.get(path)
+        if hit and hit[0] == mtime:
+            return hit[1]
+    with np.load(path) as npz:
+        arrays = {k: npz[k] for k in npz.files}
+    with _lock:
+        _cache[path] = (mtime, arrays)
+    return arrays
+
+
+def symbol_series(
+    symbol: str, fields: list[str] | None = None, history_dir: str = HISTORY_DIR
+) -> dict[str, list]:
+    """Time series for one symbol: {"dates": [...], field: [...]} (NaN = absent)."""
+    fields = fields or list(FIELDS)
+    known = load_symbols(history_dir)
+    try:
+        code = known.index(symbol)
+    except ValueError:
+        return {"dates": [], **{f: [] for f in fields}}
+
+    out: dict[str, list] = {"dates": [], **{f: [] for f in fields}}
+    for run in list_runs(history_dir):
+        snap = load_snapshot(run, history_dir)
+        codes = snap["codes"]
+        i = int(np.searchsorted(codes, code))
+        present = i < len(codes) and codes[i] == code
+        out["dates"].append(run)
+        for f in fields:
+            # float32 storage: round away the representation noise (70.91000366 → 70.91)
+            out[f].append(round(float(snap[f][i]), 4) if present and f in snap else float("nan"))
+    return out
+
+
+def universe_series(
+    field: str, history_dir: str = HISTORY_DIR
+) -> tuple[list[str], list[str], np.ndarray]:
+    """
+    One field for every symbol and run: (dates, symbols, matrix[dates × symbols]),
+    with NaN where a symbol was not in that run.
+    """
+    symbols = load_symbols(history_dir)
+    runs = list_runs(history_dir)
+    matrix = np.full((len(runs), len(symbols)), np.nan, dtype=np.float32)
+    for row, run in enumerate(runs):
+        snap = load_snapshot(run, history_dir)
+        if field in snap:
+            matrix[row, snap["codes"]] = snap[field]
+    return runs, symbols, matrix
@@ -0,0 +1,156 @@
+"""
+sectorScoring.py
+-----------------
+Optional sector-relative scoring: each quantitative metric is ranked as a
+percentile (0–100) within the record's peer group instead of being mapped
+through getRatios' absolute linear scales (roce * 2, (rev + profit CAGR) * 2,
+...), so banks, IT firms and capital-heavy industrials become comparable.
+
+    sub-score         metric ranked within the peer group
+    dcf_score         Intrinsic Value / Market Cap        (higher is better)
+    growth_score      scores.growth_score                 (profit CAGR is not stored)
+    roce_score        ROCE (%)
+    fii_dii_de_score  mean of the FII+DII percentile and the inverted D/E percentile
+
+Peer group: the record's Sector when it has at least MIN_PEERS scored
+members, otherwise its Broad Sector. Ties share their average rank; a group
+of one scores 50.
+
+Each record gets "sector_scores" (the four percentiles) and
+"sector_final_score" (calculate_weighted_score with the percentile sub-scores
+and the unchanged AI qualitative scores). The absolute scores are untouched;
+main.py --scoring sector allocates on sector_final_score.
+
+Incremental: apply_sector_scores(records, dirty) recomputes only the groups
+named by the changed records' Sector / Broad Sector. Ranking is one
+np.lexsort over (group, value) per metric.
+"""
+
+import numpy as np
+
+from calcEngine import calculate_weighted_score
+from portfolioOptimizer import OTHER_BROAD_SECTOR
+
+MIN_PEERS = 5
+SCORE_KEY = "sector_final_score"
+QUALITATIVE = ("moat_score", "tailwind_score", "management_score")  # AI scores, used as-is
+
+
+def _column(records: list, fn) -> np.ndarray:
+    out = np.empty(len(records), dtype=np.float64)
+    for i, r in enumerate(records):
+        try:
+            out[i] = float(fn(r))
+        except (TypeError, ValueError, ZeroDivisionError):
+            out[i] = np.nan
+    return out
+
+
+def _dcf_ratio(r) -> float:
+    mcap = r.get("Market Cap (Cr)") or 0
+    return (r.get("Intrinsic Value (Total Cr)") or 0) / mcap if mcap > 0 else np.nan
+
+
+# name → (value extractor, higher_is_better)
+METRICS = {
+    "dcf": (_dcf_ratio, True),
+    "growth": (lambda r: (r.get("scores") or {}).get("growth_score"), True),
+    "roce": (lambda r: r.get("ROCE (%)"), True),
+    "inst": (lambda r: (r.get("FII (%)") or 0) + (r.get("DII (%)") or 0), True),
+    "de": (lambda r: r.get("D/E"), False),
+}
+
+
+def group_percentiles(values: np.ndarray, groups: np.ndarray, higher_is_better: bool = True) -> np.ndarray:
+    """
+    Percentile rank (0–100) of each value within its integer group code.
+    Missing values (NaN) rank last; ties get their average rank.
+    """
+    n = len(values)
+    if n == 0:
+        return np.empty(0)
+    v = np.where(np.isnan(values), -np.inf, values if higher_is_better else -values)
+    order = np.lexsort((v, groups))
+    g, sv = groups[order], v[order]
+
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    group_start = np.repeat(starts, sizes)
+    group_size = np.repeat(sizes, sizes)
+
+    run = np.r_[True, (g[1:] != g[:-1]) | (sv[1:] != sv[:-1])]
+    run_starts = np.flatnonzero(run)
+    run_ends = np.r_[run_starts[1:], n]
+    mean_pos = ((run_starts + run_ends - 1) / 2)[np.cumsum(run) - 1]
+
+    pct = np.full(n, 50.0)
+    multi = group_size > 1
+    pct[multi] = 100.0 * (mean_pos[multi] - group_start[multi]) / (group_size[multi] - 1)
+    out = np.empty(n)
+    out[order] = pct
+    return out
+
+
+def peer_groups(records: list) -> list[str]:
+    """Sector when it has MIN_PEERS members in `records`, else Broad Sector."""
+    counts: dict[str, int] = {}
+    for r in records:
+        sector = r.get("Sector") or "Other"
+        counts[sector] = counts.get(sector, 0) + 1
+    return [
+        (r.get("Sector") or "Other") if counts[r.get("Sector") or "Other"] >= MIN_PEERS
+        else f"broad:{r.get('Broad Sector') or OTHER_BROAD_SECTOR}"
+        for r in records
+    ]
+
+
+def dirty_labels(*records) -> set[str]:
+    """Sector and Broad Sector of the given (old/new) records, for apply_sector_scores."""
+    labels = set()
+    for r in records:
+        if r:
+            labels.add(r.get("Sector") or "Other")
+            labels.add(r.get("Broad Sector") or OTHER_BROAD_SECTOR)
+    return labels
+
+
+def apply_sector_scores(records: list, dirty: set[str] | None = None) -> int:
+    """
+    Writes sector_scores / sector_final_score on `records` (the scored
+    universe). With `dirty` (Sector / Broad Sector labels), only records in
+    those sectors are recomputed – every peer group a changed record can
+    belong to. Returns how many records were recomputed.
+    """
+    if dirty is not None:
+        # Group sizes come from the whole universe, ranking only from dirty groups
+        labels = peer_groups(records)
+        keep = [
+            i for i, r in enumerate(records)
+            if (r.get("Sector") or "Other") in dirty or (r.get("Broad Sector") or OTHER_BROAD_SECTOR) in dirty
+        ]
+        subset = [records[i] for i in keep]
+        labels = [labels[i] for i in keep]
+    else:
+        subset, labels = records, peer_groups(records)
+    if not subset:
+        return 0
+
+    _, codes = np.unique(np.array(labels, dtype=object).astype(str), return_inverse=True)
+    pct = {
+        name: group_percentiles(_column(subset, fn), codes, higher)
+        for name, (fn, higher) in METRICS.items()
+    }
+    inst_de = (pct["inst"] + pct["de"]) / 2
+    for i, r in enumerate(subset):
+        sector_scores = {
+            "dcf_score": round(float(pct["dcf"][i]), 2),
+            "growth_score": round(float(pct["growth"][i]), 2),
+            "roce_score": round(float(pct["roce"][i]), 2),
+            "fii_dii_de_score": round(float(inst_de[i]), 2),
+        }
+        scores = r.get("scores") or {}
+        r["sector_scores"] = sector_scores
+        r[SCORE_KEY] = calculate_weighted_score(
+            {**{k: scores.get(k, 0) for k in QUALITATIVE}, **sector_scores}
+        )
+    return len(subset)
@@ -0,0 +1,185 @@
+"""
+stageProfiler.py
+-----------------
+Opt-in cProfile + tracemalloc instrumentation for named pipeline stages
+(fetch, parse, getRatios, ai, rebalance, save, ...).
+
+Disabled by default: PROFILER.stage() then returns a no-op context manager,
+so the hooks stay in the hot path at negligible cost. Enabled via --profile
+on main.py / patch_stockdata.py.
+
+Only one cProfile profiler can be active per process on CPython 3.12+
+(sys.monitoring), so there is a single process-wide profiling slot: a stage
+entered while another thread holds it is still timed and counted, but not
+CPU-profiled ("profiled" < "calls" in the summary). With several workers the
+profiles are therefore a sample of each stage's calls (and on 3.12+ a
+profile also sees what other threads run while it is active). Nested
+stages on the holding thread pause the outer one. If another tool (debugger,
+coverage) already owns the profiler, stages run unprofiled. tracemalloc peaks
+are process-wide: the peak is only reset when no stage is open in any thread,
+so with several workers a stage's peak is an upper bound on what it
+allocates (it includes the other threads', and possibly an earlier peak).
+
+Output (in --profile-dir, default "profiles/"):
+    <stage>.prof     pstats dump, e.g. `python -m pstats profiles/parse.prof`
+    hotspots.txt     top-N functions per stage by cumulative time
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+_NULL = nullcontext()
+
+
+class _StageTotals:
+    __slots__ = ("calls", "profiled", "wall", "peak_bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.profiled = 0
+        self.wall = 0.0
+        self.peak_bytes = 0
+
+
+class StageProfiler:
+    """Per-stage CPU profiles and allocation peaks, merged across threads."""
+
+    def __init__(self):
+        self.enabled = False
+        self.out_dir = "profiles"
+        self.top_n = 25
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles: dict[str, cProfile.Profile] = {}
+        self._owner: int | None = None  # Thread holding the profiling slot
+        self._open = 0  # Stages open across all threads; the peak is reset at 0 → 1
+        self._totals: dict[str, _StageTotals] = {}
+
+    def enable(self, out_dir: str = "profiles", top_n: int = 25) -> None:
+        self.enabled = True
+        self.out_dir = out_dir
+        self.top_n = top_n
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name: str):
+        """Context manager profiling the enclosed block as stage `name`."""
+        if not self.enabled:
+            return _NULL
+        return self._profile_stage(name)
+
+    def _acquire(self, name: str) -> cProfile.Profile | None:
+        """The stage's profiler if this thread holds (or takes) the slot, else None."""
+        me = threading.get_ident()
+        with self._lock:
+            if self._owner not in (None, me):
+                return None
+            self._owner = me
+            prof = self._profiles.get(name)
+            if prof is None:
+                prof = self._profiles[name] = cProfile.Profile()
+        return prof
+
+    def _release(self, stack: list) -> None:
+        """Frees the slot once none of this thread's open stages is profiled."""
+        if any(p is not None for p in stack):
+            return
+        with self._lock:
+            if self._owner == threading.get_ident():
+                self._owner = None
+
+    @contextmanager
+    def _profile_stage(self, name: str):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        if stack and stack[-1] is not None:
+            stack[-1].disable()  # One active profiler per process
+
+        prof = self._acquire(name)
+        if prof is not None:
+            try:
+                prof.enable()
+            except ValueError:  # Another profiling tool is already active
+                prof = None
+                self._release(stack)
+        stack.append(prof)
+        with self._lock:
+            if self._open == 0:  # Never wipe a peak another open stage still needs
+                tracemalloc.reset_peak()
+            self._open += 1
+            mem_start, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if prof is not None:
+                prof.disable()
+            wall = time.perf_counter() - start
+            _, mem_peak = tracemalloc.get_traced_memory()
+            stack.pop()
+            if stack and stack[-1] is not None:
+                stack[-1].enable()
+            self._release(stack)
+            with self._lock:
+                self._open -= 1
+                totals = self._totals.setdefault(name, _StageTotals())
+                totals.calls += 1
+                totals.profiled += prof is not None
+                totals.wall += wall
+                totals.peak_bytes = max(totals.peak_bytes, mem_peak - mem_start)
+
+    # ── Reporting ──────────────────────────────────────────────────────────
+
+    def _stats_for(self, name: str) -> pstats.Stats | None:
+        with self._lock:
+            prof = self._profiles.get(name)
+        if prof is None:
+            return None
+        try:
+            return pstats.Stats(prof, stream=io.StringIO())
+        except TypeError:
+            return None  # Profile never collected any samples
+
+    def report(self) -> str:
+        """Dumps <stage>.prof files + hotspots.txt and returns a short summary."""
+        if not self.enabled:
+            return ""
+        os.makedirs(self.out_dir, exist_ok=True)
+
+        with self._lock:
+            stages = sorted(self._totals.items(), key=lambda kv: kv[1].wall, reverse=True)
+
+        summary = [f"  {'stage':<14}{'calls':>8}{'profiled':>10}{'wall s':>10}{'peak MiB':>10}"]
+        hotspots = []
+        for name, totals in stages:
+            summary.append(
+                f"  {name:<14}{totals.calls:>8}{totals.profiled:>10}{totals.wall:>10.2f}"
+                f"{totals.peak_bytes / 2**20:>10.1f}"
+            )
+            stats = self._stats_for(name)
+            if stats is None:
+                continue
+            stats.dump_stats(os.path.join(self.out_dir, f"{name}.prof"))
+            buf = io.StringIO()
+            stats.stream = buf
+            stats.sort_stats("cumulative").print_stats(self.top_n)
+            hotspots.append(
+                f"==== {name} ({totals.profiled} of {totals.calls} calls profiled, {totals.wall:.2f}s) ===="
+            )
+            hotspots.append(buf.getvalue())
+
+        with open(os.path.join(self.out_dir, "hotspots.txt"), "w") as f:
+            f.write("\n".join(hotspots))
+
+        summary.append(f"  Profiles written to {self.out_dir}/ (hotspots.txt, <stage>.prof)")
+        return "\n".join(summary)
+
+
+PROFILER = StageProfiler()
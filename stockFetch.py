@@ -4,18 +4,88 @@ stockFetch.py
 Scrapes financial data for Indian equities from screener.in.
 Data extracted includes: key ratios, company profile, P&L, balance sheet,
 cash flow, and shareholding tables.
+
+Configuration (environment, e.g. to target the local stand-in server):
+    SCREENER_HOST          default https://www.screener.in
+    SCREENER_FETCH_DELAY   polite jitter range in seconds, default "5,10"
+    SCREENER_PAGE_CACHE    page cache directory, default off (e.g. "pageCache")
+
+Conditional fetching:
+    Each symbol's ETag / Last-Modified validators and a digest of the parsed
+    sections are kept in fetchCache.json. getStockData(symbol, conditional=True)
+    sends If-None-Match / If-Modified-Since and returns NOT_MODIFIED when the
+    server answers 304 or the relevant sections hash to the previous digest.
+    A fetch only stages the new entry: the caller calls commit_fetch(symbol)
+    once the record built from the page is saved, or discard_fetch(symbol)
+    when it is not, so a failed symbol is never later seen as "unchanged".
+
+Page cache and targeted parsing:
+    With SCREENER_PAGE_CACHE set, fetched pages are also kept gzipped in that
+    directory (nothing prunes it, hence opt-in). fetch_cached_page() serves a
+    fresh cached page without any request, or revalidates it with a
+    conditional GET; parse_sections() parses only the named page sections,
+    e.g. ("profile", "balance-sheet").
+
+Failures and the circuit breaker:
+    _fetch_html raises FetchError with a reason code (http_404, timeout,
+    connection, retries_exhausted, ...) for main.py's negative cache. Host-level
+    errors also feed FETCH_BREAKER (circuitBreaker), which pauses all page
+    requests after a burst of them.
+
+Deadlines:
+    Under a timeBudget deadline the polite delay, the limiter / breaker waits,
+    the request timeout and urllib3's retry backoff are all capped at the time
+    left, and a request cut short raises DeadlineExceeded instead of a
+    FetchError (it says nothing about the host).
 """
 
+import gzip
+import hashlib
+import json
+import os
 import random
+import threading
 import time
 
-import pandas as pd
 import requests
 from bs4 import BeautifulSoup
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-BASE_URL = "https://www.screener.in/company/{}/consolidated/"
+from adaptiveConcurrency import FETCH_LIMIT, OVERLOAD_STATUSES, env_range, retry_after_seconds
+from circuitBreaker import FETCH_BREAKER
+from pipelineMetrics import METRICS
+from stageProfiler import PROFILER
+from timeBudget import DeadlineExceeded, bounded, expired, remaining, sleep
+
+
+SCREENER_HOST = os.environ.get("SCREENER_HOST", "https://www.screener.in").rstrip("/")
+BASE_URL = SCREENER_HOST + "/company/{}/consolidated/"
+FETCH_DELAY = env_range("SCREENER_FETCH_DELAY", (5, 10))
+FETCH_CACHE_FILE = "fetchCache.json"
+PAGE_CACHE_DIR = os.environ.get("SCREENER_PAGE_CACHE", "")  # Off unless set
+
+# Page regions as (start marker, end marker) for targeted parsing
+SECTION_MARKERS: dict[str, tuple[str, str]] = {
+    "name": ("<h1", "</h1>"),
+    "ratios": ('<ul id="top-ratios"', "</ul>"),
+    "profile": ('<div class="company-profile', '<section id="'),
+    "peers": ('<section id="peers"', "</section>"),
+    "profit-loss": ('<section id="profit-loss"', "</section>"),
+    "balance-sheet": ('<section id="balance-sheet"', "</section>"),
+    "cash-flow": ('<section id="cash-flow"', "</section>"),
+    "shareholding": ('<section id="shareholding"', "</section>"),
+}
+
+# Page regions that feed getRatios(); everything else (ads, CSRF tokens,
+# timestamps) changes between requests and must not affect the digest.
+_DIGEST_MARKERS = [
+    SECTION_MARKERS[k] for k in (
+        "ratios", "profile", "peers", "profit-loss", "balance-sheet", "cash-flow", "shareholding",
+    )
+]
+
+NOT_MODIFIED = object()  # Sentinel: page unchanged since the previous fetch
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
@@ -24,10 +94,27 @@ USER_AGENTS = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
 ]
 
+class _DeadlineRetry(Retry):
+    """Retry that stops retrying, and shortens its backoff, at the thread's deadline."""
+
+    def is_exhausted(self) -> bool:
+        return super().is_exhausted() or expired()
+
+    def get_backoff_time(self) -> float:
+        backoff, left = super().get_backoff_time(), remaining()
+        return backoff if left is None else max(0.0, min(backoff, left))
+
+    def get_retry_after(self, response) -> float | None:
+        retry_after, left = super().get_retry_after(response), remaining()
+        if retry_after is None or left is None:
+            return retry_after
+        return max(0.0, min(retry_after, left))
+
+
 # Shared session with retry logic
 def _build_session() -> requests.Session:
     session = requests.Session()
-    retry = Retry(
+    retry = _DeadlineRetry(
         total=3,
         backoff_factor=1.5,
         status_forcelist=[429, 500, 502, 503, 504],
@@ -40,8 +127,128 @@ def _build_session() -> requests.Session:
 SESSION = _build_session()
 
 
-def _fetch_page(symbol: str) -> BeautifulSoup:
-    """Fetches and parses the screener.in page for a given symbol."""
+# ── Fetch Cache (validators + section digests) ──────────────────────────────
+
+def _load_fetch_cache() -> dict[str, dict]:
+    try:
+        with open(FETCH_CACHE_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+_FETCH_CACHE = _load_fetch_cache()
+_STAGED: dict[str, dict] = {}  # Fetched, not yet committed by the caller
+_FETCH_CACHE_LOCK = threading.Lock()
+
+
+def use_fetch_cache(path: str) -> None:
+    """Switches to a different validator file (e.g. one per shard) and loads it."""
+    global FETCH_CACHE_FILE
+    with _FETCH_CACHE_LOCK:
+        FETCH_CACHE_FILE = path
+        _FETCH_CACHE.clear()
+        _FETCH_CACHE.update(_load_fetch_cache())
+
+
+def save_fetch_cache() -> None:
+    """Persists validators and digests atomically to fetchCache.json."""
+    with _FETCH_CACHE_LOCK:
+        snapshot = dict(_FETCH_CACHE)
+    tmp = FETCH_CACHE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(snapshot, f, indent=1)
+    os.replace(tmp, FETCH_CACHE_FILE)
+
+
+def commit_fetch(symbol: str) -> None:
+    """Moves the symbol's staged validators / digest into the fetch cache."""
+    with _FETCH_CACHE_LOCK:
+        entry = _STAGED.pop(symbol, None)
+        if entry is not None:
+            _FETCH_CACHE[symbol] = entry
+
+
+def discard_fetch(symbol: str) -> None:
+    """Drops a staged entry whose record was not saved; the old one stays."""
+    with _FETCH_CACHE_LOCK:
+        _STAGED.pop(symbol, None)
+
+
+def last_fetched(symbol: str) -> str | None:
+    """Timestamp of the last successful fetch recorded in fetchCache.json."""
+    with _FETCH_CACHE_LOCK:
+        return (_FETCH_CACHE.get(symbol) or {}).get("fetched_at")
+
+
+# ── Page Cache (gzipped HTML per symbol) ────────────────────────────────────
+
+def _page_path(symbol: str) -> str:
+    return os.path.join(PAGE_CACHE_DIR, f"{symbol}.html.gz")
+
+
+def _store_page(symbol: str, html: str) -> None:
+    if not PAGE_CACHE_DIR:
+        return
+    os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+    path = _page_path(symbol)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+        f.write(html)
+    os.replace(tmp, path)
+
+
+def load_page(symbol: str) -> tuple[str, float] | None:
+    """Returns (html, age_seconds) for a cached page, or None."""
+    if not PAGE_CACHE_DIR:
+        return None
+    path = _page_path(symbol)
+    try:
+        age = time.time() - os.path.getmtime(path)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read(), age
+    except (OSError, EOFError):
+        return None
+
+
+def _section_digest(html: str) -> str:
+    """Hashes only the page regions that getRatios() depends on."""
+    h = hashlib.sha256()
+    for start_tag, end_tag in _DIGEST_MARKERS:
+        start = html.find(start_tag)
+        if start == -1:
+            h.update(b"\0")
+            continue
+        end = html.find(end_tag, start + len(start_tag))
+        h.update(html[start:end if end != -1 else len(html)].encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class FetchError(ConnectionError):
+    """A failed page fetch; `reason` is the negative-cache reason code."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _host_error(reason: str, label: str, symbol: str, exc: Exception) -> FetchError:
+    """Records a request-level failure against the limiter and breaker."""
+    METRICS.inc("fetch_errors_total", reason=reason)
+    FETCH_LIMIT.on_overload(label)
+    FETCH_BREAKER.failure(label)
+    return FetchError(reason, f"{label} for {symbol}: {exc}")
+
+
+def _fetch_html(symbol: str, conditional: bool = False) -> str | None:
+    """
+    Downloads the raw screener.in HTML for a symbol.
+
+    With conditional=True, stored validators are sent and None is returned
+    when the server replies 304 or the relevant sections are unchanged. The
+    new validators are staged for commit_fetch().
+    """
     url = BASE_URL.format(symbol)
     headers = {
         "User-Agent": random.choice(USER_AGENTS),
@@ -51,12 +258,83 @@ def _fetch_page(symbol: str) -> BeautifulSoup:
         "Connection": "keep-alive",
         "Upgrade-Insecure-Requests": "1",
     }
-    # Polite jitter delay to avoid rate limits
-    time.sleep(random.uniform(5, 10))
-    res = SESSION.get(url, headers=headers, timeout=30)
+    with _FETCH_CACHE_LOCK:
+        cached = dict(_FETCH_CACHE.get(symbol, {}))
+    if conditional:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    # Polite jitter delay to avoid rate limits (outside the concurrency slot)
+    sleep(random.uniform(*FETCH_DELAY), "fetch delay")
+    with FETCH_LIMIT.slot():
+        # Checked inside the slot: callers queued on the limiter must not
+        # slip through after the breaker opened
+        FETCH_BREAKER.wait()
+        start = time.perf_counter()
+        try:
+            with METRICS.timer("fetch_seconds"):
+                res = SESSION.get(url, headers=headers, timeout=bounded(30, "fetch"))
+        except DeadlineExceeded:
+            FETCH_BREAKER.abandon()
+            raise
+        except requests.exceptions.RequestException as e:
+            if expired():  # Cut short by the deadline: says nothing about the host
+                FETCH_BREAKER.abandon()
+                raise DeadlineExceeded("fetch") from e
+            if isinstance(e, requests.exceptions.RetryError):
+                raise _host_error("retries_exhausted", "retries exhausted", symbol, e) from e
+            if isinstance(e, requests.exceptions.Timeout):
+                raise _host_error("timeout", "timeout", symbol, e) from e
+            raise _host_error("connection", "connection error", symbol, e) from e
+        retried = _record_response(res)
+        if res.status_code in OVERLOAD_STATUSES:
+            FETCH_LIMIT.on_overload(f"HTTP {res.status_code}", retry_after_seconds(res.headers))
+            FETCH_BREAKER.failure(f"HTTP {res.status_code}")
+        else:
+            if retried:
+                FETCH_LIMIT.on_overload(f"{retried} overload response(s) retried")
+            else:
+                FETCH_LIMIT.on_success(time.perf_counter() - start)
+            FETCH_BREAKER.success()
+
+    if res.status_code == 304 and conditional and cached:
+        METRICS.inc("fetch_not_modified_total", via="304")
+        return None
     if res.status_code != 200:
-        raise ConnectionError(f"HTTP {res.status_code} for {symbol}")
-    return BeautifulSoup(res.text, "html.parser")
+        METRICS.inc("fetch_errors_total", reason=f"http_{res.status_code}")
+        raise FetchError(f"http_{res.status_code}", f"HTTP {res.status_code} for {symbol}")
+
+    html = res.text
+    _store_page(symbol, html)
+    digest = _section_digest(html)
+    with _FETCH_CACHE_LOCK:
+        _STAGED[symbol] = {
+            "etag": res.headers.get("ETag", ""),
+            "last_modified": res.headers.get("Last-Modified", ""),
+            "digest": digest,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+    if conditional and cached.get("digest") == digest:
+        METRICS.inc("fetch_not_modified_total", via="digest")
+        return None
+    return html
+
+
+def _record_response(res: requests.Response) -> int:
+    """
+    Counts the final status plus any urllib3 retries (and 429s) behind it.
+    Returns how many overload responses (429/5xx) were retried away.
+    """
+    METRICS.inc("fetch_http_total", status=res.status_code)
+    retries = getattr(getattr(getattr(res, "raw", None), "retries", None), "history", ()) or ()
+    if retries:
+        METRICS.inc("fetch_retries_total", len(retries))
+    throttled = sum(1 for h in retries if h.status == 429) + (res.status_code == 429)
+    if throttled:
+        METRICS.inc("fetch_rate_limited_total", throttled)
+    return sum(1 for h in retries if h.status in OVERLOAD_STATUSES)
 
 
 def _parse_ratios(soup: BeautifulSoup) -> dict:
@@ -138,34 +416,143 @@ def _parse_company_profile(soup: BeautifulSoup) -> tuple[str, str]:
     return name, about
 
 
-def getStockData(symbol: str) -> dict | None:
-    """
-    Main entry point. Fetches all data for a symbol from screener.in.
+def parse_page(symbol: str, html: str) -> dict:
+    """Parses a screener.in company page into the getStockData() dict."""
+    soup = BeautifulSoup(html, "html.parser")
+    company_name, about = _parse_company_profile(soup)
+    ratios = _parse_ratios(soup)
 
-    Returns a dict with keys:
-        symbol, Company Name, About, ratios, pnl, balance_sheet, cash_flow, shareholding
-    Returns None on failure.
+    return {
+        "symbol": symbol,
+        "Company Name": company_name or symbol,
+        "About": about or "N/A",
+        "ratios": ratios,
+        "pnl": _parse_table(soup, "profit-loss"),
+        "balance_sheet": _parse_table(soup, "balance-sheet"),
+        "cash_flow": _parse_table(soup, "cash-flow"),
+        "shareholding": _parse_table(soup, "shareholding"),
+    }
+
+
+def fetch_page(symbol: str, conditional: bool = False):
+    """
+    Fetch half of getStockData(): returns the page HTML or NOT_MODIFIED, and
+    raises FetchError on failure. Lets callers hand the (CPU-bound) parse to a
+    process pool.
     """
+    with PROFILER.stage("fetch"):
+        html = _fetch_html(symbol, conditional=conditional)
+    return NOT_MODIFIED if html is None else html
+
+
+def fetchStockPage(symbol: str, conditional: bool = False):
+    """fetch_page() that prints the error and returns None on failure."""
     try:
-        soup = _fetch_page(symbol)
+        return fetch_page(symbol, conditional=conditional)
     except Exception as e:
         print(f"  [FETCH ERROR] {symbol}: {e}")
         return None
 
+
+def fetch_cached_page(symbol: str, max_age: float | None = None) -> str | None:
+    """
+    Page HTML via the page cache: a cached copy younger than `max_age` seconds
+    is returned without a request; otherwise the copy is revalidated with a
+    conditional GET (304 → cached copy). Returns None on failure.
+    """
+    cached = load_page(symbol)
+    if cached and max_age is not None and cached[1] <= max_age:
+        METRICS.inc("page_cache_hits_total", via="fresh")
+        return cached[0]
     try:
+        with PROFILER.stage("fetch"):
+            html = _fetch_html(symbol, conditional=cached is not None)
+    except Exception as e:
+        print(f"  [FETCH ERROR] {symbol}: {e}")
+        return None
+    # Only a cached page keeps validators: they can never outlive it
+    if PAGE_CACHE_DIR:
+        commit_fetch(symbol)
+    else:
+        discard_fetch(symbol)
+    if html is None:
+        METRICS.inc("page_cache_hits_total", via="revalidated")
+        os.utime(_page_path(symbol))
+        return cached[0]
+    return html
+
+
+def extract_sections(html: str, sections: tuple[str, ...]) -> str:
+    """Concatenates just the named SECTION_MARKERS regions of a page."""
+    parts = []
+    for name in sections:
+        start_tag, end_tag = SECTION_MARKERS[name]
+        start = html.find(start_tag)
+        if start == -1:
+            continue
+        end = html.find(end_tag, start + len(start_tag))
+        if end == -1:
+            end = len(html)
+        elif end_tag.startswith("</"):
+            end += len(end_tag)  # keep closing tags; opening-tag markers belong to the next region
+        parts.append(html[start:end])
+    return "\n".join(parts)
+
+
+def parse_sections(symbol: str, html: str, sections: tuple[str, ...]) -> dict:
+    """
+    Parses only the requested sections into the matching getStockData() keys:
+        name/profile → Company Name, About     ratios/peers → ratios
+        profit-loss → pnl   balance-sheet → balance_sheet
+        cash-flow → cash_flow   shareholding → shareholding
+    """
+    return parse_fragment(symbol, extract_sections(html, sections), sections)
+
+
+def parse_fragment(symbol: str, fragment: str, sections: tuple[str, ...]) -> dict:
+    """parse_sections() for a fragment extract_sections() already cut out."""
+    soup = BeautifulSoup(fragment, "html.parser")
+    data: dict = {"symbol": symbol}
+    if "name" in sections or "profile" in sections:
         company_name, about = _parse_company_profile(soup)
-        ratios = _parse_ratios(soup)
-
-        return {
-            "symbol": symbol,
-            "Company Name": company_name or symbol,
-            "About": about or "N/A",
-            "ratios": ratios,
-            "pnl": _parse_table(soup, "profit-loss"),
-            "balance_sheet": _parse_table(soup, "balance-sheet"),
-            "cash_flow": _parse_table(soup, "cash-flow"),
-            "shareholding": _parse_table(soup, "shareholding"),
-        }
+        data["Company Name"] = company_name or symbol
+        data["About"] = about or "N/A"
+    if "ratios" in sections or "peers" in sections:
+        data["ratios"] = _parse_ratios(soup)
+    for section, key in (
+        ("profit-loss", "pnl"),
+        ("balance-sheet", "balance_sheet"),
+        ("cash-flow", "cash_flow"),
+        ("shareholding", "shareholding"),
+    ):
+        if section in sections:
+            data[key] = _parse_table(soup, section)
+    return data
+
+
+def getStockData(symbol: str, conditional: bool = False) -> dict | None:
+    """
+    Main entry point. Fetches all data for a symbol from screener.in.
+
+    Returns a dict with keys:
+        symbol, Company Name, About, ratios, pnl, balance_sheet, cash_flow, shareholding
+    Returns None on failure, or NOT_MODIFIED when conditional=True and the
+    page has not changed since the last fetch (parsing is skipped). The new
+    validators are only staged: call commit_fetch(symbol) once the record is
+    saved (NOT_MODIFIED included).
+    """
+    html = fetchStockPage(symbol, conditional=conditional)
+    if html is None or html is NOT_MODIFIED:
+        return html
+
+    try:
+        parse_start = time.perf_counter()
+        with PROFILER.stage("parse"):
+            data = parse_page(symbol, html)
+        METRICS.observe("parse_seconds", time.perf_counter() - parse_start)
+        return data
     except Exception as e:
+        METRICS.inc("parse_errors_total")
         print(f"  [PARSE ERROR] {symbol}: {e}")
+        discard_fetch(symbol)
         return None
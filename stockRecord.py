@@ -0,0 +1,301 @@
+"""
+stockRecord.py
+---------------
+Compact, typed in-memory form of a stockData.json record, plus streaming
+read/write of the stockData.json array.
+
+StockRecord keeps each known field in a __slots__ attribute (no per-record
+dict) and the seven sub-scores in a slotted Scores object; any other key
+(delisted_on, raw tables, future fields) goes to a small overflow dict. Both
+are MutableMappings keyed by the JSON names, so code written against the
+record dicts keeps working unchanged:
+
+    r["Market Cap (Cr)"]        ≡ r.market_cap_cr
+    r.get("scores", {})["dcf_score"]
+    r["delisted_on"] = "2026-01-05"     # overflow key
+
+to_dict() / JSON output reproduce the original schema, with keys in the
+canonical RECORD_FIELDS order followed by overflow keys in insertion order.
+RECORD_FIELDS follows the key order of the existing stockData.json records
+(1,767 of the 1,824 checked in): getRatios' metrics and scores, then
+final_score / ai_notes from main.py, Broad Sector / portfolio_weight from the
+rebalance, and Company Name as patch_stockdata appended it. It is not the
+order getRatios emits (Company Name and About come second there), and the
+older records with portfolio_weight before Broad Sector are rewritten in the
+canonical order, so a load/write round trip reorders those records' keys.
+
+Streaming:
+    iter_records(path)   yields one record dict at a time (incremental decode,
+                         never holds the whole file text)
+    load_records(path)   list[StockRecord] built from iter_records
+    write_records(path, records)
+                         writes the array record by record to a temp file and
+                         renames it over `path`; same layout as
+                         json.dump(records, f, indent=4)
+"""
+
+import json
+import os
+from collections.abc import Iterable, Iterator, MutableMapping
+
+# JSON key → attribute, in the key order of the existing stockData.json records
+RECORD_FIELDS: dict[str, str] = {
+    "symbol": "symbol",
+    "Sector": "sector",
+    "Market Cap (Cr)": "market_cap_cr",
+    "Current Price": "current_price",
+    "Intrinsic Value (Total Cr)": "intrinsic_value_cr",
+    "Shares Outstanding (Cr)": "shares_outstanding_cr",
+    "Intrinsic Price Per Share": "intrinsic_price",
+    "ROCE (%)": "roce",
+    "PE": "pe",
+    "PB": "pb",
+    "D/E": "de",
+    "Rev CAGR (%)": "rev_cagr",
+    "FCF (Cr)": "fcf_cr",
+    "FII (%)": "fii",
+    "DII (%)": "dii",
+    "scores": "scores",
+    "final_score": "final_score",
+    "ai_notes": "ai_notes",
+    "Broad Sector": "broad_sector",
+    "portfolio_weight": "portfolio_weight",
+    "Company Name": "company_name",
+    "sector_scores": "sector_scores",  # --scoring sector (sectorScoring)
+    "sector_final_score": "sector_final_score",
+}
+
+SCORE_FIELDS: dict[str, str] = {
+    name: name for name in (
+        "dcf_score", "growth_score", "roce_score", "fii_dii_de_score",
+        "moat_score", "tailwind_score", "management_score",
+    )
+}
+
+
+_MISSING = object()
+
+
+class _SlotMapping(MutableMapping):
+    """Mapping over __slots__ attributes named by FIELDS, plus an overflow dict."""
+
+    __slots__ = ("_extra",)
+    FIELDS: dict[str, str] = {}
+
+    def __getitem__(self, key: str):
+        attr = self.FIELDS.get(key)
+        if attr is None:
+            extra = getattr(self, "_extra", None)
+            if extra is None:
+                raise KeyError(key)
+            return extra[key]
+        try:
+            return getattr(self, attr)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value) -> None:
+        attr = self.FIELDS.get(key)
+        if attr is None:
+            extra = getattr(self, "_extra", None)
+            if extra is None:
+                self._extra = extra = {}
+            extra[key] = value
+        else:
+            setattr(self, attr, value)
+
+    def __delitem__(self, key: str) -> None:
+        attr = self.FIELDS.get(key)
+        if attr is None:
+            extra = getattr(self, "_extra", None)
+            if extra is None:
+                raise KeyError(key)
+            del extra[key]
+            return
+        try:
+            delattr(self, attr)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    # get / __contains__ are on every hot path (allocation, scoring); skip the
+    # Mapping defaults' try/except KeyError round trip
+    def get(self, key: str, default=None):
+        attr = self.FIELDS.get(key)
+        if attr is None:
+            return (getattr(self, "_extra", None) or {}).get(key, default)
+        return getattr(self, attr, default)
+
+    def __contains__(self, key) -> bool:
+        attr = self.FIELDS.get(key)
+        if attr is None:
+            return key in (getattr(self, "_extra", None) or ())
+        return hasattr(self, attr)
+
+    def __iter__(self) -> Iterator[str]:
+        for key, attr in self.FIELDS.items():
+            if hasattr(self, attr):
+                yield key
+        yield from getattr(self, "_extra", None) or ()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        obj = cls()
+        for key, value in data.items():
+            obj[key] = value
+        return obj
+
+    def to_dict(self) -> dict:
+        out = {}
+        for key, attr in self.FIELDS.items():
+            value = getattr(self, attr, _MISSING)
+            if value is not _MISSING:
+                out[key] = value.to_dict() if isinstance(value, _SlotMapping) else value
+        out.update(getattr(self, "_extra", None) or ())
+        return out
+
+
+class Scores(_SlotMapping):
+    __slots__ = tuple(SCORE_FIELDS.values())
+    FIELDS = SCORE_FIELDS
+
+    dcf_score: float
+    growth_score: float
+    roce_score: float
+    fii_dii_de_score: float
+    moat_score: float
+    tailwind_score: float
+    management_score: float
+
+
+class StockRecord(_SlotMapping):
+    __slots__ = tuple(RECORD_FIELDS.values())
+    FIELDS = RECORD_FIELDS
+
+    symbol: str
+    sector: str
+    market_cap_cr: float
+    current_price: float
+    intrinsic_value_cr: float
+    shares_outstanding_cr: float
+    intrinsic_price: float
+    roce: float
+    pe: float
+    pb: float
+    de: float
+    rev_cagr: float
+    fcf_cr: float
+    fii: float
+    dii: float
+    scores: Scores
+    final_score: float
+    ai_notes: str
+    broad_sector: str
+    portfolio_weight: float
+    company_name: str
+    sector_scores: dict
+    sector_final_score: float
+
+    def __setitem__(self, key: str, value) -> None:
+        if key == "scores" and isinstance(value, dict):
+            value = Scores.from_dict(value)
+        super().__setitem__(key, value)
+
+
+def to_json(obj):
+    """json `default=` hook: serializes StockRecord / Scores as plain dicts."""
+    if isinstance(obj, _SlotMapping):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# ── Streaming I/O ───────────────────────────────────────────────────────────
+
+_CHUNK = 1 << 16
+_WS = " \t\r\n"
+
+
+def iter_records(path: str, chunk_size: int = _CHUNK) -> Iterator[dict]:
+    """
+    Yields the elements of a JSON array file one at a time. Raises
+    json.JSONDecodeError on malformed input (like json.load).
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def more() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            buf, pos = buf[pos:] + chunk, 0
+            eof = not chunk
+            return bool(chunk)
+
+        def skip_ws() -> None:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf) or not more():
+                    return
+
+        skip_ws()
+        if buf[pos:pos + 1] != "[":
+            raise json.JSONDecodeError("Expecting '['", buf, pos)
+        pos += 1
+        first = True
+        while True:
+            skip_ws()
+            if buf[pos:pos + 1] == "]":
+                return
+            if not first:
+                if buf[pos:pos + 1] != ",":
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+                pos += 1
+                skip_ws()
+            first = False
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof or not more():
+                        raise
+                    continue
+                if (
+                    not eof and not isinstance(value, (dict, list, str))
+                    and (end == len(buf) or buf[end] not in _WS + ",]")
+                ):
+                    more()  # A number cut at the buffer edge ("2." of "2.5") may continue
+                    continue
+                break
+            pos = end
+            yield value
+
+
+def load_records(path: str) -> list[StockRecord]:
+    """Streams `path` into StockRecords; a missing file gives []."""
+    try:
+        return [StockRecord.from_dict(r) for r in iter_records(path)]
+    except FileNotFoundError:
+        return []
+
+
+def write_records(path: str, records: Iterable) -> int:
+    """Atomically writes `records` as an indent=4 JSON array; returns the count."""
+    tmp = f"{path}.tmp"
+    count = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        for record in records:
+            if isinstance(record, _SlotMapping):
+                record = record.to_dict()
+            body = json.dumps(record, indent=4).replace("\n", "\n    ")
+            f.write(("[\n    " if count == 0 else ",\n    ") + body)
+            count += 1
+        f.write("\n]" if count else "[]")
+    os.replace(tmp, path)
+    return count
@@ -0,0 +1,104 @@
+"""
+timeBudget.py
+--------------
+Per-symbol deadlines and the run-level time budget.
+
+A deadline is set for the calling thread with `with deadline(seconds):` and
+covers every stage of one symbol: the polite delays, waiting for a limiter
+slot or the circuit breaker, the HTTP request and its urllib3 retries, the
+parse in the process pool and the DeepSeek call. Each blocking point asks
+for its timeout through bounded(), so nothing waits past the deadline, and
+raises DeadlineExceeded once it has passed; main.py turns that into the
+"deadline" failure reason. Work that cannot be interrupted (an in-process
+parse) finishes, and the next check raises.
+
+    with deadline(120):
+        time.sleep(...)                               → sleep(delay, "delay")
+        SESSION.get(url, timeout=30)                  → timeout=bounded(30, "fetch")
+        cond.wait(wait)                               → cond.wait(bounded(wait, "slot"))
+
+RunBudget is the whole-run limit (main.py --time-budget): once it is spent no
+new symbol is started, and symbols in flight get at most what is left.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class DeadlineExceeded(TimeoutError):
+    """The calling thread's deadline passed; `stage` is where it was noticed."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"deadline exceeded during {stage}")
+        self.stage = stage
+
+
+@contextmanager
+def deadline(seconds: float | None):
+    """Sets the thread's deadline `seconds` from now (None = none); nesting only tightens it."""
+    outer = getattr(_local, "at", None)
+    at = None if seconds is None else time.monotonic() + seconds
+    if outer is not None and (at is None or outer < at):
+        at = outer
+    _local.at = at
+    try:
+        yield
+    finally:
+        _local.at = outer
+
+
+def remaining() -> float | None:
+    """Seconds left before the thread's deadline, or None without one."""
+    at = getattr(_local, "at", None)
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(stage: str) -> None:
+    if expired():
+        raise DeadlineExceeded(stage)
+
+
+def bounded(timeout: float | None, stage: str) -> float | None:
+    """`timeout` (None = unbounded) capped at the time left; raises once it is gone."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded(stage)
+    return left if timeout is None else min(timeout, left)
+
+
+def sleep(seconds: float, stage: str) -> None:
+    """time.sleep that stops at the deadline and then raises."""
+    time.sleep(max(0.0, bounded(seconds, stage)))
+    if seconds > 0:
+        check(stage)
+
+
+class RunBudget:
+    """Wall-clock budget for a whole run (None = unlimited)."""
+
+    def __init__(self, seconds: float | None = None):
+        self.seconds = seconds
+        self._end = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> float | None:
+        return None if self._end is None else max(0.0, self._end - time.monotonic())
+
+    def expired(self) -> bool:
+        return self._end is not None and time.monotonic() >= self._end
+
+    def cap(self, seconds: float | None) -> float | None:
+        """A per-symbol deadline that also ends with the budget."""
+        left = self.remaining()
+        if left is None:
+            return seconds
+        return left if seconds is None else min(seconds, left)
@@ -10,6 +10,6 @@ from updateStockList import fetch_nifty500, save
 if __name__ == "__main__":
     print("Downloading Nifty 500 list...")
     symbols = fetch_nifty500()
-    save(symbols)
+    save(symbols, source="nifty500")
     save(symbols, "nifty500Stocks.json")
     print("Done.")
@@ -6,18 +6,38 @@ Downloads and saves the NSE equity list or the Nifty 500 index constituents.
 Usage:
     python updateStockList.py           # Full NSE list → listOfStocks.json
     python updateStockList.py --nifty500  # Nifty 500 only → listOfStocks.json
+
+CSV downloads are cached in csvCache/ with their ETag / Last-Modified
+validators: a copy younger than CSV_MAX_AGE is reused without a request,
+older copies are revalidated (304 → cached copy), and the cached copy is used
+if NSE is unreachable. patch_stockdata.py reads company names through the
+same cache (nse_name_map).
+
+Each update prints which symbols were added / removed versus the previous
+listOfStocks.json and writes the same report to universeDiff.json. main.py
+then only schedules the additions. listOfStocks.meta.json records the list's
+source: only after a full-list update does main.py mark (or with
+--prune-delisted, remove) records for symbols that left the list; a Nifty 500
+list is a filter, not a delisting signal.
 """
 
 import argparse
 import csv
 import io
 import json
+import os
 import sys
+import time
 
 import requests
 
-NSE_ALL_URL = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
-NIFTY500_URL = "https://archives.nseindia.com/content/indices/ind_nifty500list.csv"
+# NSE_ARCHIVE_HOST can point at the local stand-in server for offline runs
+NSE_ARCHIVE_HOST = os.environ.get("NSE_ARCHIVE_HOST", "https://archives.nseindia.com").rstrip("/")
+NSE_ALL_URL = NSE_ARCHIVE_HOST + "/content/equities/EQUITY_L.csv"
+NIFTY500_URL = NSE_ARCHIVE_HOST + "/content/indices/ind_nifty500list.csv"
+CSV_CACHE_DIR = "csvCache"
+CSV_MAX_AGE = 6 * 3600  # Seconds a cached CSV is reused without revalidation
+DIFF_FILE = "universeDiff.json"
 
 HEADERS = {
     "User-Agent": (
@@ -27,11 +47,67 @@ HEADERS = {
 }
 
 
-def _fetch_csv(url: str) -> str:
-    res = requests.get(url, headers=HEADERS, timeout=15)
-    if res.status_code != 200:
+# ── Cached CSV Fetch ────────────────────────────────────────────────────────
+
+def _cache_paths(url: str) -> tuple[str, str]:
+    name = os.path.basename(url.split("?")[0]) or "download.csv"
+    return os.path.join(CSV_CACHE_DIR, name), os.path.join(CSV_CACHE_DIR, name + ".meta.json")
+
+
+def _fetch_csv(url: str, max_age: float | None = None) -> str:
+    """Returns the CSV body, from csvCache/ when fresh or unchanged upstream."""
+    max_age = CSV_MAX_AGE if max_age is None else max_age
+    body_path, meta_path = _cache_paths(url)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(body_path, encoding="utf-8") as f:
+            cached = f.read()
+    except (FileNotFoundError, json.JSONDecodeError):
+        meta, cached = {}, None
+
+    if cached is not None and time.time() - meta.get("checked_at", 0) <= max_age:
+        return cached
+
+    headers = dict(HEADERS)
+    if cached is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        res = requests.get(url, headers=headers, timeout=15)
+    except requests.exceptions.RequestException as e:
+        if cached is None:
+            raise
+        print(f"  [WARN] {url} unreachable ({e}); using cached copy.")
+        return cached
+
+    if res.status_code == 304 and cached is not None:
+        body = cached
+    elif res.status_code == 200:
+        body = res.content.decode("utf-8")
+        meta = {
+            "etag": res.headers.get("ETag", ""),
+            "last_modified": res.headers.get("Last-Modified", ""),
+        }
+        os.makedirs(CSV_CACHE_DIR, exist_ok=True)
+        with open(body_path, "w", encoding="utf-8") as f:
+            f.write(body)
+    elif cached is not None:
+        print(f"  [WARN] HTTP {res.status_code} fetching {url}; using cached copy.")
+        return cached
+    else:
         raise ConnectionError(f"HTTP {res.status_code} fetching {url}")
-    return res.content.decode("utf-8")
+
+    meta["checked_at"] = time.time()
+    os.makedirs(CSV_CACHE_DIR, exist_ok=True)
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    return body
+
+
+# ── Lists ───────────────────────────────────────────────────────────────────
 
 
 def fetch_all_nse() -> list[str]:
@@ -47,6 +123,16 @@ def fetch_all_nse() -> list[str]:
     return sorted(symbols)
 
 
+def nse_name_map() -> dict[str, str]:
+    """Symbol → full company name from the (cached) NSE equity list."""
+    reader = csv.DictReader(io.StringIO(_fetch_csv(NSE_ALL_URL)))
+    return {
+        row["SYMBOL"].strip(): row["NAME OF COMPANY"].strip()
+        for row in reader
+        if row.get("SYMBOL")
+    }
+
+
 def fetch_nifty500() -> list[str]:
     """Returns Nifty 500 constituent symbols."""
     content = _fetch_csv(NIFTY500_URL)
@@ -55,31 +141,95 @@ def fetch_nifty500() -> list[str]:
     return sorted(s for s in symbols if s)
 
 
-def save(symbols: list[str], path: str = "listOfStocks.json") -> None:
+def save(symbols: list[str], path: str = "listOfStocks.json", source: str | None = None) -> None:
+    """
+    Writes the list and <name>.meta.json recording where it came from, so
+    main.py only treats symbols missing from a full list ("nse_all") as
+    delisted. Without `source` the list's provenance is unknown: a stale meta
+    file is removed rather than left vouching for the new list.
+    """
     with open(path, "w") as f:
         json.dump(symbols, f, indent=4)
+    meta_path = path.removesuffix(".json") + ".meta.json"
+    if source:
+        with open(meta_path, "w") as f:
+            json.dump(
+                {"source": source, "count": len(symbols), "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                f,
+                indent=4,
+            )
+    elif os.path.exists(meta_path):
+        os.remove(meta_path)
     print(f"  Saved {len(symbols)} symbols to {path}")
 
 
+# ── Universe Diff ───────────────────────────────────────────────────────────
+
+def _load_list(path: str) -> list[str]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def diff_universe(old: list[str], new: list[str]) -> tuple[list[str], list[str]]:
+    """Returns (added, removed) symbols, each sorted."""
+    before, after = set(old), set(new)
+    return sorted(after - before), sorted(before - after)
+
+
+def report_diff(old: list[str], new: list[str], source: str, path: str = DIFF_FILE) -> None:
+    """Prints the added/removed symbols and writes them to universeDiff.json."""
+    added, removed = diff_universe(old, new)
+    print(f"  {len(new)} symbols ({len(added)} added, {len(removed)} removed vs previous list)")
+    for label, syms in (("+", added), ("-", removed)):
+        if syms:
+            shown = ", ".join(syms[:20]) + (f" … (+{len(syms) - 20} more)" if len(syms) > 20 else "")
+            print(f"    {label} {shown}")
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "source": source,
+                "added": added,
+                "removed": removed,
+            },
+            f,
+            indent=4,
+        )
+
+
 def main() -> None:
+    global CSV_MAX_AGE
     parser = argparse.ArgumentParser(description="Update NSE stock list.")
     parser.add_argument(
         "--nifty500",
         action="store_true",
         help="Download Nifty 500 only (default: full NSE list)",
     )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=CSV_MAX_AGE / 3600,
+        help="Hours a cached CSV is reused without revalidation (0 = always revalidate)",
+    )
     args = parser.parse_args()
+    CSV_MAX_AGE = args.max_age * 3600
+    previous = _load_list("listOfStocks.json")
 
     try:
         if args.nifty500:
             print("Downloading Nifty 500 list...")
             symbols = fetch_nifty500()
-            save(symbols)
+            report_diff(previous, symbols, "nifty500")
+            save(symbols, source="nifty500")
             save(symbols, "nifty500Stocks.json")
         else:
             print("Downloading full NSE equity list...")
             symbols = fetch_all_nse()
-            save(symbols)
+            report_diff(previous, symbols, "nse_all")
+            save(symbols, source="nse_all")
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,111 @@
+"""
+webExport.py
+-------------
+Writes per-view data slices for the Next.js dashboard instead of one large
+stockData.json mirror:
+
+    website/data/rankings.json          compact table: identity, headline sub-scores, value, weight
+    website/data/portfolio.json         holdings only (portfolio_weight > 0)
+    website/public/insights/<SYM>.json  full record per symbol, fetched on demand
+
+Slices are minified. Insight files exclude portfolio_weight (shown elsewhere),
+so a rebalance does not rewrite them; a file is only rewritten when its
+content changes, and files for symbols that left the universe are removed.
+"""
+
+import json
+import os
+
+from stockRecord import to_json
+
+WEBSITE_DIR = "website"
+DATA_DIR = os.path.join(WEBSITE_DIR, "data")
+INSIGHT_DIR = os.path.join(WEBSITE_DIR, "public", "insights")
+
+RANKING_FIELDS = (
+    "symbol", "Company Name", "Broad Sector", "final_score", "scores",
+    "Current Price", "Intrinsic Price Per Share", "portfolio_weight",
+)
+PORTFOLIO_FIELDS = (
+    "symbol", "Company Name", "Broad Sector", "final_score", "portfolio_weight",
+    "Current Price", "Intrinsic Price Per Share", "PE", "PB", "Rev CAGR (%)",
+)
+RANKING_SCORES = ("dcf_score", "growth_score", "roce_score", "moat_score")
+_INSIGHT_EXCLUDE = {"portfolio_weight"}
+
+_written: dict[str, str] = {}  # symbol → last serialized insight payload
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=to_json)
+
+
+def _write(path: str, payload: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+def _pick(record: dict, fields: tuple) -> dict:
+    return {k: record[k] for k in fields if k in record}
+
+
+def _ranking_row(record: dict) -> dict:
+    row = _pick(record, RANKING_FIELDS)
+    scores = record.get("scores") or {}
+    row["scores"] = {k: round(scores[k], 1) for k in RANKING_SCORES if k in scores}
+    return row
+
+
+def build_rankings(results: list[dict]) -> list[dict]:
+    return [_ranking_row(r) for r in results]
+
+
+def build_portfolio(results: list[dict]) -> list[dict]:
+    held = [r for r in results if (r.get("portfolio_weight") or 0) > 0]
+    held.sort(key=lambda r: r["portfolio_weight"], reverse=True)
+    return [_pick(r, PORTFOLIO_FIELDS) for r in held]
+
+
+def _sync_insights(results: list[dict]) -> int:
+    """Writes changed per-symbol insight files; returns how many were written."""
+    os.makedirs(INSIGHT_DIR, exist_ok=True)
+    if not _written:
+        # First call in this process: seed from disk so unchanged files are kept
+        for name in os.listdir(INSIGHT_DIR):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(INSIGHT_DIR, name), encoding="utf-8") as f:
+                        _written[name[:-5]] = f.read()
+                except OSError:
+                    pass
+
+    written = 0
+    current = set()
+    for r in results:
+        sym = r["symbol"]
+        current.add(sym)
+        payload = _dumps({k: v for k, v in r.items() if k not in _INSIGHT_EXCLUDE})
+        if _written.get(sym) != payload:
+            _write(os.path.join(INSIGHT_DIR, f"{sym}.json"), payload)
+            _written[sym] = payload
+            written += 1
+
+    for sym in set(_written) - current:
+        try:
+            os.remove(os.path.join(INSIGHT_DIR, f"{sym}.json"))
+        except FileNotFoundError:
+            pass
+        del _written[sym]
+    return written
+
+
+def export_views(results: list[dict]) -> None:
+    """Writes all dashboard slices. No-op when the website/ directory is absent."""
+    if not os.path.isdir(WEBSITE_DIR):
+        return
+    os.makedirs(DATA_DIR, exist_ok=True)
+    _write(os.path.join(DATA_DIR, "rankings.json"), _dumps(build_rankings(results)))
+    _write(os.path.join(DATA_DIR, "portfolio.json"), _dumps(build_portfolio(results)))
+    _sync_insights(results)
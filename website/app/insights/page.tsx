@@ -1,9 +1,9 @@
-import { getStockData } from '@/lib/data';
+import { getRankings } from '@/lib/data';
 import InsightView from '@/components/InsightView';
 import Navbar from '@/components/Navbar';
 
 export default function InsightsPage() {
-    const data = getStockData();
+    const data = getRankings();
 
     return (
         <div className="min-h-screen bg-slate-50 text-slate-900">
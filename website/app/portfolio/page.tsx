@@ -1,9 +1,9 @@
-import { getStockData } from '@/lib/data';
+import { getPortfolio } from '@/lib/data';
 import PortfolioView from '@/components/PortfolioView';
 import Navbar from '@/components/Navbar';
 
 export default function PortfolioPage() {
-    const data = getStockData();
+    const data = getPortfolio();
 
     return (
         <div className="min-h-screen bg-slate-50 text-slate-900">
@@ -1,9 +1,9 @@
-import { getStockData } from '@/lib/data';
+import { getRankings } from '@/lib/data';
 import RankingView from '@/components/RankingView';
 import Navbar from '@/components/Navbar';
 
 export default function RankingsPage() {
-    const data = getStockData();
+    const data = getRankings();
 
     return (
         <div className="min-h-screen bg-slate-50 text-slate-900">
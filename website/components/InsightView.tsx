@@ -10,16 +10,32 @@ import { motion, AnimatePresence } from 'framer-motion';
 
 function InsightContent({ data }: { data: any[] }) {
     const searchParams = useSearchParams();
-    const [selectedStock, setSelectedStock] = useState(data[0]);
+    const [selectedRow, setSelectedRow] = useState(data[0]);
+    const [detail, setDetail] = useState<any>(null);
 
     useEffect(() => {
         const symbol = searchParams.get('symbol');
         if (symbol) {
             const match = data.find(s => s.symbol === symbol);
-            if (match) setSelectedStock(match);
+            if (match) setSelectedRow(match);
         }
     }, [searchParams, data]);
 
+    // The list only carries ranking fields; the full record is loaded on demand.
+    useEffect(() => {
+        if (!selectedRow?.symbol) return;
+        let cancelled = false;
+        fetch(`/insights/${encodeURIComponent(selectedRow.symbol)}.json`)
+            .then(res => (res.ok ? res.json() : null))
+            .then(json => { if (!cancelled) setDetail(json); })
+            .catch(() => { if (!cancelled) setDetail(null); });
+        return () => { cancelled = true; };
+    }, [selectedRow?.symbol]);
+
+    const selectedStock = detail && detail.symbol === selectedRow?.symbol
+        ? { ...selectedRow, ...detail }
+        : selectedRow;
+
     const radarData = useMemo(() => [
         { subject: 'DCF', value: selectedStock?.scores?.dcf_score || 0 },
         { subject: 'Growth', value: selectedStock?.scores?.growth_score || 0 },
@@ -47,7 +63,7 @@ function InsightContent({ data }: { data: any[] }) {
                     {data.map((s) => (
                         <div
                             key={s.symbol}
-                            onClick={() => setSelectedStock(s)}
+                            onClick={() => setSelectedRow(s)}
                             className={`p-5 rounded-xl border transition-all cursor-pointer group ${selectedStock.symbol === s.symbol
                                 ? 'bg-blue-50 border-blue-200 shadow-sm'
                                 : 'bg-white border-slate-200 hover:border-slate-300'
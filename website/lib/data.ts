@@ -1,9 +1,24 @@
 import fs from 'fs';
 import path from 'path';
 
+// Per-view slices written by the Python exporter (webExport.py).
+// Falls back to the legacy full stockData.json when a slice is missing.
+
+function readJson(name: string): any[] | null {
+    const filePath = path.join(process.cwd(), 'data', name);
+    if (!fs.existsSync(filePath)) return null;
+    return JSON.parse(fs.readFileSync(filePath, 'utf-8'));
+}
+
 export function getStockData() {
-    const filePath = path.join(process.cwd(), 'data', 'stockData.json');
-    if (!fs.existsSync(filePath)) return [];
-    const fileData = fs.readFileSync(filePath, 'utf-8');
-    return JSON.parse(fileData);
+    return readJson('stockData.json') ?? [];
+}
+
+export function getRankings() {
+    return readJson('rankings.json') ?? getStockData();
+}
+
+export function getPortfolio() {
+    return readJson('portfolio.json')
+        ?? getStockData().filter((s: any) => (s.portfolio_weight || 0) > 0);
 }